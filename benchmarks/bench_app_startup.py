@@ -0,0 +1,145 @@
+# bench_app_startup.py
+"""
+Streamlit App Startup Benchmark
+-------------------------------
+Cold-start cost of each Streamlit entry point, each measured in a fresh
+Python process (several repeats, median reported):
+
+    import_s          time to execute the app's top-level import statements
+    first_render_s    process start -> first script run finished, via
+                      streamlit.testing's AppTest (no browser / server)
+    heavy_modules     which of matplotlib / seaborn / sklearn / joblib /
+                      prophet / pmdarima were loaded by the first render
+
+The apps read prebuilt artifacts, so build them first (python
+notebooks/app_artifacts.py, or point RETAIL_ARTIFACT_DIR at a built copy);
+an app whose data is missing is reported with its error.
+
+Results go to benchmarks/results/startup_<timestamp>.json; --compare flags
+apps whose first render got slower than a previous results file (exit 1).
+
+    python benchmarks/bench_app_startup.py
+    python benchmarks/bench_app_startup.py --apps promotion_recommender.py --repeat 5
+    python benchmarks/bench_app_startup.py --compare benchmarks/results/startup_baseline.json
+"""
+
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCH_DIR.parent / "notebooks"
+RESULTS_DIR = BENCH_DIR / "results"
+
+APPS = ['promotion_recommender.py', 'clearance_planner.py', 'top_products_gui.py',
+        'promotion_trigger_gui.py', 'festival_promo_gui.py', 'diagnostics_gui.py']
+HEAVY_MODULES = ['matplotlib', 'seaborn', 'sklearn', 'joblib', 'prophet', 'pmdarima']
+RENDER_TIMEOUT = 60
+
+
+def _import_source(app_path):
+    """The app's top-level import statements as one block of source."""
+    tree = ast.parse(Path(app_path).read_text(encoding='utf-8'))
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def _child(app_path, result_file):
+    """Child-process entry point: time the imports, then a first AppTest run, of one app."""
+    start = time.perf_counter()
+    exec(compile(_import_source(app_path), app_path, 'exec'), {'__name__': '__bench__'})
+    import_s = time.perf_counter() - start
+
+    from streamlit.testing.v1 import AppTest
+    render_start = time.perf_counter()
+    app = AppTest.from_file(str(app_path), default_timeout=RENDER_TIMEOUT).run()
+    now = time.perf_counter()
+    errors = [str(e.value) for e in app.exception]
+    Path(result_file).write_text(json.dumps({
+        'import_s': import_s,
+        'render_s': now - render_start,
+        'first_render_s': now - start,
+        'heavy_modules': sorted(m for m in HEAVY_MODULES if m in sys.modules),
+        'error': errors[0] if errors else None,
+    }))
+
+
+def measure(app, repeat=3):
+    app_path = APP_DIR / app
+    runs, error = [], None
+    for _ in range(repeat):
+        fd, result_file = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        Path(result_file).unlink()
+        proc = subprocess.run([sys.executable, __file__, '--child', str(app_path), result_file],
+                              cwd=APP_DIR, capture_output=True, text=True)
+        if proc.returncode != 0 or not Path(result_file).exists():
+            error = (proc.stderr.strip().splitlines() or ['failed'])[-1]
+            break
+        run = json.loads(Path(result_file).read_text())
+        Path(result_file).unlink()
+        runs.append(run)
+        error = run['error']
+    if not runs:
+        return {'stage': app, 'status': 'failed', 'error': error}
+    return {
+        'stage': app,
+        'status': 'ok' if error is None else 'error',
+        'import_s': round(statistics.median(r['import_s'] for r in runs), 3),
+        'first_render_s': round(statistics.median(r['first_render_s'] for r in runs), 3),
+        'wall_s': round(statistics.median(r['first_render_s'] for r in runs), 3),   # what --compare checks
+        'heavy_modules': runs[-1]['heavy_modules'],
+        'repeats': len(runs),
+        'error': error,
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == '--child':
+        sys.path.insert(0, str(APP_DIR))
+        _child(sys.argv[2], sys.argv[3])
+        sys.exit(0)
+
+    # Only the parent loads the pipeline benchmark helpers (and pandas); children start clean
+    sys.path.insert(0, str(BENCH_DIR))
+    from bench_pipeline import REGRESSION_RATIO, compare, machine_info
+
+    parser = argparse.ArgumentParser(description="Benchmark Streamlit app import and first-render time.")
+    parser.add_argument("--apps", nargs="+", default=APPS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--compare", help="previous results JSON to check for regressions")
+    parser.add_argument("--output", help="results file (default: results/startup_<timestamp>.json)")
+    args = parser.parse_args()
+
+    results = []
+    for app in args.apps:
+        result = measure(app, args.repeat)
+        results.append(result)
+        if result['status'] == 'failed':
+            print(f"{app:<28} FAILED ({result['error']})")
+            continue
+        heavy = ', '.join(result['heavy_modules']) or '-'
+        note = f"  ⚠️ {result['error']}" if result['error'] else ''
+        print(f"{app:<28} import {result['import_s']:>6.2f}s  first render {result['first_render_s']:>6.2f}s  "
+              f"heavy: {heavy}{note}")
+
+    regressions = compare(results, args.compare) if args.compare else []
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    output = Path(args.output) if args.output else RESULTS_DIR / f"startup_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    output.write_text(json.dumps({
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'machine': machine_info(),
+        'results': results,
+        'regressions': regressions,
+    }, indent=2))
+    print(f"✅ Results: {output}")
+    if regressions:
+        print(f"❌ Slower than {REGRESSION_RATIO}x baseline: {', '.join(regressions)}")
+        sys.exit(1)
@@ -0,0 +1,97 @@
+# bench_group_agg.py
+"""
+Groupby Lambda vs Native Aggregation Benchmark
+----------------------------------------------
+Times the per-customer / per-product lambdas that messaging_schedule.ipynb,
+behavioral_clustering.ipynb and clearance_planner.build_features used, against
+their group_agg.py replacements, on synthetic data of increasing group counts.
+Both sides are checked to return the same values.
+
+    python benchmarks/bench_group_agg.py
+    python benchmarks/bench_group_agg.py --groups 1000 10000 50000 --rows-per-group 40
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "notebooks"))
+from group_agg import group_mode, group_count_if, group_ratio_if
+
+
+def synthetic_lines(n_groups, rows_per_group, seed=0):
+    rng = np.random.default_rng(seed)
+    n = n_groups * rows_per_group
+    return pd.DataFrame({
+        'Key': rng.integers(0, n_groups, n),
+        'Hour': rng.integers(7, 21, n),
+        'Weekday': rng.integers(0, 7, n),
+        'Month_Quantity': rng.poisson(0.8, n),
+    })
+
+
+def _time(fn, repeat=3):
+    best, result = np.inf, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+CASES = {
+    'mode (value_counts().idxmax())': (
+        lambda df: df.groupby('Key')['Hour'].agg(lambda x: x.value_counts().idxmax()),
+        lambda df: group_mode(df['Key'], df['Hour'], ties='first'),
+    ),
+    'mode (mode()[0])': (
+        lambda df: df.groupby('Key')['Weekday'].agg(lambda x: x.mode()[0]),
+        lambda df: group_mode(df['Key'], df['Weekday'], ties='smallest'),
+    ),
+    'count (x > 0).sum()': (
+        lambda df: df.groupby('Key')['Month_Quantity'].agg(lambda x: (x > 0).sum()),
+        lambda df: group_count_if(df['Key'], df['Month_Quantity'] > 0),
+    ),
+    'ratio (x == 0).sum() / len(x)': (
+        lambda df: df.groupby('Key')['Month_Quantity'].apply(lambda x: (x == 0).sum() / len(x)),
+        lambda df: group_ratio_if(df['Key'], df['Month_Quantity'] == 0),
+    ),
+}
+
+
+def run(group_counts, rows_per_group, repeat=3):
+    rows = []
+    for n_groups in group_counts:
+        df = synthetic_lines(n_groups, rows_per_group)
+        n_keys = df['Key'].nunique()
+        for name, (before, after) in CASES.items():
+            t_before, expected = _time(lambda: before(df), repeat)
+            t_after, got = _time(lambda: after(df), repeat)
+            if not np.allclose(expected.to_numpy(dtype=float), got.to_numpy(dtype=float)):
+                raise AssertionError(f"{name}: results differ at {n_groups} groups")
+            rows.append({
+                'aggregation': name,
+                'groups': n_keys,
+                'rows': len(df),
+                'lambda_s': round(t_before, 4),
+                'native_s': round(t_after, 4),
+                'lambda_us_per_group': round(t_before / n_keys * 1e6, 2),
+                'native_us_per_group': round(t_after / n_keys * 1e6, 2),
+                'speedup': round(t_before / t_after, 1),
+            })
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark groupby lambdas against group_agg.py.")
+    parser.add_argument("--groups", type=int, nargs="+", default=[1_000, 5_000, 20_000])
+    parser.add_argument("--rows-per-group", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    results = run(args.groups, args.rows_per_group, args.repeat)
+    print(results.to_string(index=False))
@@ -0,0 +1,309 @@
+# bench_pipeline.py
+"""
+Pipeline Benchmark Suite
+------------------------
+Times the key stages on a synthetic online_retail_II-shaped store
+(synthetic_retail.py) at a chosen scale:
+
+    validation           raw-line checks and quarantine (retail_store.validate_transactions)
+    promotion_dataset    RFM feature store + promotion rules (build_promotion_dataset.py)
+    clearance_features   monthly product series + clearance features and rules
+    festival_tagging     festival keyword/month tagging and quantity sums
+    seasonal_index       product x week index build + top-N per calendar festival
+    hourly_triggers      orders / revenue per (CLTV segment, hour)
+    trigger_cube         segment x hour x weekday x country x month cube (trigger_cube.py)
+    item_similarity      sparse top-K item-item cosine index
+    transition_counting  next-item transition counts
+    model_scoring        churn / CLTV / promotion batch scoring
+
+Every stage runs in a fresh process, so each gets its own wall time, peak
+RSS and throughput (input lines per second). Results are written as JSON to
+benchmarks/results/; --compare flags stages that got slower than a previous
+results file (exit code 1).
+
+    python benchmarks/bench_pipeline.py --scale 1m
+    python benchmarks/bench_pipeline.py --scale 10m --stages festival_tagging hourly_triggers
+    python benchmarks/bench_pipeline.py --scale 1m --compare benchmarks/results/1m_baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(REPO_DIR / "notebooks"))
+sys.path.insert(0, str(BENCH_DIR))
+from synthetic_retail import SCALES, generate_store
+
+DATA_DIR = BENCH_DIR / "data"
+RESULTS_DIR = BENCH_DIR / "results"
+MODEL_DIR = REPO_DIR / "models"
+REGRESSION_RATIO = 1.25   # --compare: slower than this x baseline is a regression
+
+
+# ---------------- Stages ---------------- #
+# Each returns (rows_in, rows_out); imports happen inside so a stage's
+# process only loads what it uses.
+
+def _total_lines(store_dir):
+    from retail_store import MANIFEST
+    return json.loads((Path(store_dir) / MANIFEST).read_text())['clean_rows']
+
+
+def _segments(customer_ids, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'Customer_ID': customer_ids,
+                         'CLTV_Segment_Label': rng.choice(list('ABCD'), len(customer_ids))})
+
+
+def stage_validation(store_dir):
+    from retail_store import load_transactions, validate_transactions
+    raw = load_transactions(store_dir=store_dir).astype({'Invoice': object, 'Description': object})
+    # Re-inject the defects the real workbook has: cancellations, returns, zero prices,
+    # untrimmed descriptions and repeated lines
+    rng = np.random.default_rng(0)
+    pick = lambda share: rng.random(len(raw)) < share
+    cancelled = pick(0.02)
+    raw.loc[cancelled, 'Invoice'] = 'C' + raw.loc[cancelled, 'Invoice']
+    raw.loc[cancelled, 'Quantity'] *= -1
+    raw.loc[pick(0.005), 'Price'] = 0.0
+    untrimmed = pick(0.01)
+    raw.loc[untrimmed, 'Description'] = ' ' + raw.loc[untrimmed, 'Description'] + '  '
+    raw = pd.concat([raw, raw[pick(0.01)]], ignore_index=True)
+    clean, _, _ = validate_transactions(raw)
+    return len(raw), len(clean)
+
+
+def stage_promotion_dataset(store_dir):
+    from feature_store import refresh_features, cltv_dataset
+    from promo_rules import value_tier, promotion_class, suggested_offer_text
+
+    with tempfile.TemporaryDirectory() as feature_dir:
+        features = refresh_features(feature_dir=feature_dir, store_dir=store_dir)
+    dataset = cltv_dataset(features).merge(
+        features[['Customer_ID', 'Last_Purchase_Date', 'Last_Product', 'Days_Since_Last_Purchase']],
+        on='Customer_ID', how='left')
+    dataset['Churn_Prob'] = np.random.default_rng(0).random(len(dataset))
+    dataset['Value_Tier'] = value_tier(dataset)
+    dataset['At_Risk'] = ((dataset['Churn_Prob'] >= 0.5) | (dataset['Recency'] > 90)).astype(int)
+    dataset['Promotion_Class'] = promotion_class(dataset)
+    dataset['Suggested_Offer_Text'] = suggested_offer_text(dataset['Promotion_Class'])
+    return _total_lines(store_dir), len(dataset)
+
+
+def stage_clearance_features(store_dir):
+    from streaming import monthly_product_series
+    from app_artifacts import build_clearance_features
+    from promo_rules import clearance_discount, project_revenue, clearance_strategy
+
+    monthly = monthly_product_series(store_dir=store_dir)
+    feat = build_clearance_features(monthly)
+    feat['Adj_Discount'] = clearance_discount(feat)
+    feat = pd.concat([feat, project_revenue(feat)], axis=1)
+    feat['Strategy'] = clearance_strategy(feat)
+    return _total_lines(store_dir), len(feat)
+
+
+def stage_festival_tagging(store_dir):
+    from streaming import festival_quantities
+    totals = festival_quantities(store_dir=store_dir)
+    return _total_lines(store_dir), len(totals)
+
+
+def stage_seasonal_index(store_dir):
+    from seasonal_index import refresh_index
+    with tempfile.TemporaryDirectory() as index_dir:
+        index = refresh_index(Path(index_dir) / "seasonal_index.npz", store_dir=store_dir)
+        table = index.top_table()
+    return _total_lines(store_dir), len(table)
+
+
+def stage_hourly_triggers(store_dir):
+    from retail_store import load_transactions
+    from streaming import hourly_orders
+    customers = load_transactions(columns=['Customer ID'], require_customer=True,
+                                  store_dir=store_dir)['Customer ID'].unique()
+    hourly = hourly_orders(_segments(customers), store_dir=store_dir)
+    return _total_lines(store_dir), len(hourly)
+
+
+def stage_trigger_cube(store_dir):
+    from retail_store import load_transactions
+    from trigger_cube import build_cube
+    customers = load_transactions(columns=['Customer ID'], require_customer=True,
+                                  store_dir=store_dir)['Customer ID'].unique()
+    cube = build_cube(_segments(customers), store_dir=store_dir)
+    return _total_lines(store_dir), int((cube.measures['Total_Orders'] > 0).sum())
+
+
+def stage_item_similarity(store_dir):
+    from retail_store import load_transactions
+    from item_similarity import ItemSimilarityIndex
+    df = load_transactions(columns=['Customer ID', 'Description', 'InvoiceDate', 'Quantity', 'Price'],
+                           require_customer=True, store_dir=store_dir)
+    df['TotalPrice'] = df['Quantity'] * df['Price']
+    index = ItemSimilarityIndex.build(df, n_jobs=-1)
+    return len(df), len(index.items)
+
+
+def stage_transition_counting(store_dir):
+    from retail_store import load_transactions
+    from transition_index import TransitionIndex
+    df = load_transactions(columns=['Customer ID', 'InvoiceDate', 'Description'], require_customer=True,
+                           store_dir=store_dir)
+    index = TransitionIndex.build(df)
+    return len(df), int(index.counts.nnz)
+
+
+def stage_model_scoring(store_dir):
+    from scoring import BatchScorer
+    from retail_store import load_transactions
+    n = load_transactions(columns=['Customer ID'], require_customer=True,
+                          store_dir=store_dir)['Customer ID'].nunique()
+    rng = np.random.default_rng(0)
+    table = pd.DataFrame({
+        'Customer_ID': np.arange(n),
+        'Frequency': rng.integers(1, 50, n),
+        'Recency': rng.integers(1, 700, n),
+        'Monetary': rng.gamma(2.0, 500.0, n),
+        'ProfitMargin': 0.10,
+    })
+    table['AOV'] = table['Monetary'] / table['Frequency']
+    table['PF'] = table['Frequency'] / table['Recency']
+    table['CLTV'] = table['AOV'] * table['PF'] * 365 * table['ProfitMargin']
+    table['Value_Tier'] = rng.choice(['Top', 'High', 'Medium', 'Low'], n)
+    table['At_Risk'] = rng.integers(0, 2, n)
+    scored = BatchScorer(MODEL_DIR).score_table(table, n_jobs=os.cpu_count() or 1)
+    return n, len(scored)
+
+
+STAGES = {name[len('stage_'):]: fn for name, fn in globals().items() if name.startswith('stage_')}
+
+
+# ---------------- Harness ---------------- #
+
+def _run_stage_in_process(name, store_dir, result_file):
+    """Child-process entry point."""
+    import resource
+    start = time.perf_counter()
+    rows_in, rows_out = STAGES[name](store_dir)
+    wall = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+    Path(result_file).write_text(json.dumps({
+        'stage': name, 'status': 'ok', 'wall_s': round(wall, 3), 'peak_rss_mb': round(peak_mb, 1),
+        'rows_in': int(rows_in), 'rows_out': int(rows_out),
+        'throughput_rows_s': round(rows_in / wall, 1) if wall > 0 else None,
+    }))
+
+
+def run_stage(name, store_dir, timeout=None):
+    fd, result_file = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    env = dict(os.environ, RETAIL_STORE_DIR=str(store_dir),
+               # never let a stage re-ingest the real workbook over the synthetic store
+               RETAIL_RAW_FILE=str(Path(store_dir) / "_no_workbook.xlsx"))
+    start = time.perf_counter()
+    try:
+        proc = subprocess.run([sys.executable, __file__, '--run-stage', name, str(store_dir), result_file],
+                              env=env, capture_output=True, text=True, timeout=timeout)
+        returncode, error = proc.returncode, proc.stderr.strip().splitlines()[-1:] or ['']
+    except subprocess.TimeoutExpired:
+        returncode, error = None, ['timeout']
+    try:
+        result = json.loads(Path(result_file).read_text()) if returncode == 0 else None
+    finally:
+        os.remove(result_file)
+    if result is None:
+        result = {'stage': name, 'status': 'failed', 'returncode': returncode, 'error': error[0],
+                  'wall_s': round(time.perf_counter() - start, 3)}
+    return result
+
+
+def machine_info():
+    return {
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+    }
+
+
+def compare(results, baseline_file, ratio=REGRESSION_RATIO):
+    """Stages slower than ratio x the baseline wall time."""
+    baseline = {r['stage']: r for r in json.loads(Path(baseline_file).read_text())['results']}
+    regressions = []
+    for r in results:
+        base = baseline.get(r['stage'])
+        if not base or r['status'] != 'ok' or base.get('status') != 'ok':
+            continue
+        slowdown = r['wall_s'] / base['wall_s'] if base['wall_s'] else 1.0
+        r['baseline_wall_s'] = base['wall_s']
+        r['slowdown'] = round(slowdown, 2)
+        if slowdown > ratio:
+            regressions.append(r['stage'])
+    return regressions
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 5 and sys.argv[1] == '--run-stage':
+        _run_stage_in_process(*sys.argv[2:])
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages on synthetic data.")
+    parser.add_argument("--scale", choices=list(SCALES), default='1m')
+    parser.add_argument("--lines", type=int)
+    parser.add_argument("--customers", type=int)
+    parser.add_argument("--skus", type=int)
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--data-dir", default=str(DATA_DIR))
+    parser.add_argument("--timeout", type=float, default=None, help="seconds per stage")
+    parser.add_argument("--compare", help="previous results JSON to check for regressions")
+    parser.add_argument("--output", help="results file (default: results/<scale>_<timestamp>.json)")
+    args = parser.parse_args()
+
+    lines, customers, skus = SCALES[args.scale]
+    lines, customers, skus = args.lines or lines, args.customers or customers, args.skus or skus
+    label = args.scale if not (args.lines or args.customers or args.skus) else f"{lines}l_{customers}c_{skus}s"
+    store_dir = Path(args.data_dir) / label
+
+    start = time.perf_counter()
+    manifest = generate_store(store_dir, lines, customers, skus)
+    print(f"Synthetic store ready in {time.perf_counter() - start:.1f}s: {store_dir}")
+
+    results = []
+    for name in args.stages:
+        result = run_stage(name, store_dir, args.timeout)
+        results.append(result)
+        if result['status'] == 'ok':
+            print(f"{name:<22}{result['wall_s']:>9.2f}s {result['peak_rss_mb']:>9.0f} MB "
+                  f"{result['throughput_rows_s']:>14,.0f} rows/s")
+        else:
+            print(f"{name:<22} FAILED ({result['error']})")
+
+    regressions = compare(results, args.compare) if args.compare else []
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{label}_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    output.write_text(json.dumps({
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'dataset': manifest['synthetic'],
+        'machine': machine_info(),
+        'results': results,
+        'regressions': regressions,
+    }, indent=2))
+    print(f"✅ Results: {output}")
+    if regressions:
+        print(f"❌ Slower than {REGRESSION_RATIO}x baseline: {', '.join(regressions)}")
+        sys.exit(1)
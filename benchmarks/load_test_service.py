@@ -0,0 +1,179 @@
+# load_test_service.py
+"""
+Prediction Service Load Test
+----------------------------
+Drives a local prediction_service.py instance with --concurrency keep-alive
+clients (asyncio, standard library only), each sending single-customer
+GET /predict requests back to back, for --duration seconds or --requests
+requests in total. Customer ids are drawn at random from the service's
+customer table, so repeat ids exercise the LRU cache; --unique sends every
+id at most once (cold cache, batching only).
+
+Reports latency p50 / p90 / p99 / max, requests per second, errors and the
+service's own /stats (mean micro-batch size, cache hit rate). Results go to
+benchmarks/results/loadtest_<timestamp>.json.
+
+    python notebooks/prediction_service.py --port 8765 &
+    python benchmarks/load_test_service.py --url http://127.0.0.1:8765 --concurrency 64 --duration 20
+
+--spawn starts (and afterwards stops) a service instance itself, with the
+remaining service options passed through:
+
+    python benchmarks/load_test_service.py --spawn --concurrency 64 -- --max-batch 128 --cache-size 0
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import numpy as np
+
+BENCH_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCH_DIR.parent / "notebooks"
+RESULTS_DIR = BENCH_DIR / "results"
+
+sys.path.insert(0, str(BENCH_DIR))
+from bench_pipeline import machine_info   # noqa: E402
+
+DEFAULT_URL = "http://127.0.0.1:8765"
+STARTUP_TIMEOUT = 120
+
+
+async def request(reader, writer, host, path):
+    """One keep-alive GET; (status, JSON body)."""
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n\r\n".encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def get(url, path):
+    parts = urlsplit(url)
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port)
+    try:
+        return await request(reader, writer, parts.netloc, path)
+    finally:
+        writer.close()
+
+
+async def client(url, ids, deadline, budget, latencies, errors, unique=False):
+    parts = urlsplit(url)
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port)
+    try:
+        while time.perf_counter() < deadline and budget[0] > 0:
+            budget[0] -= 1
+            customer_id = ids.pop() if unique else random.choice(ids)
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, parts.netloc, f"/predict?customer_id={customer_id}")
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run(url, ids, concurrency, duration, total, unique):
+    latencies, errors = [], []
+    if unique:
+        ids = random.sample(list(ids), len(ids))
+        total = min(total or len(ids), len(ids))
+    budget = [total or float('inf')]
+    start = time.perf_counter()
+    await asyncio.gather(*(client(url, ids, start + duration, budget, latencies, errors, unique)
+                           for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return np.array(latencies), errors, elapsed
+
+
+def wait_for(url, proc, timeout=STARTUP_TIMEOUT):
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Service exited with code {proc.returncode}")
+        try:
+            if asyncio.run(get(url, '/health'))[0] == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Service not up after {timeout}s")
+
+
+if __name__ == "__main__":
+    argv, service_args = sys.argv[1:], []
+    if '--' in argv:
+        argv, service_args = argv[:argv.index('--')], argv[argv.index('--') + 1:]
+
+    parser = argparse.ArgumentParser(description="Load-test the micro-batching prediction service.")
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--requests", type=int, default=0, help="stop after this many requests (0: duration only)")
+    parser.add_argument("--customers", default=str(APP_DIR / "promotion_dataset.csv"),
+                        help="table to draw Customer_ID values from")
+    parser.add_argument("--unique", action="store_true", help="each customer id at most once (no cache hits)")
+    parser.add_argument("--spawn", action="store_true", help="start a service instance for the test")
+    parser.add_argument("--output", help="results file (default: results/loadtest_<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    import pandas as pd
+    ids = pd.read_csv(args.customers, usecols=['Customer_ID'])['Customer_ID'].dropna().astype(int).unique().tolist()
+
+    proc = None
+    if args.spawn:
+        port = urlsplit(args.url).port
+        proc = subprocess.Popen([sys.executable, str(APP_DIR / "prediction_service.py"), '--port', str(port),
+                                 '--customers', args.customers, *service_args], cwd=APP_DIR)
+    try:
+        if proc is not None:
+            wait_for(args.url, proc)
+        latencies, errors, elapsed = asyncio.run(run(args.url, ids, args.concurrency, args.duration,
+                                                     args.requests, args.unique))
+        stats = asyncio.run(get(args.url, '/stats'))[1]
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    if not len(latencies):
+        sys.exit("❌ No requests completed")
+    ms = latencies * 1000
+    result = {
+        'requests': int(len(latencies)),
+        'errors': len(errors),
+        'concurrency': args.concurrency,
+        'elapsed_s': round(elapsed, 3),
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(float(np.percentile(ms, 50)), 3),
+        'p90_ms': round(float(np.percentile(ms, 90)), 3),
+        'p99_ms': round(float(np.percentile(ms, 99)), 3),
+        'max_ms': round(float(ms.max()), 3),
+        'service': stats,
+    }
+    print(f"{result['requests']:,} requests in {result['elapsed_s']}s at concurrency {args.concurrency}: "
+          f"{result['rps']:,} req/s, p50 {result['p50_ms']}ms, p99 {result['p99_ms']}ms, "
+          f"errors {result['errors']}")
+    print(f"Service: mean batch {stats['mean_batch_size']}, cache hit rate {stats['cache_hit_rate']:.1%}")
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    output = Path(args.output) if args.output else RESULTS_DIR / f"loadtest_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    output.write_text(json.dumps({
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'machine': machine_info(),
+        'service_args': service_args,
+        'result': result,
+    }, indent=2))
+    print(f"✅ Results: {output}")
@@ -0,0 +1,148 @@
+# synthetic_retail.py
+"""
+Synthetic online_retail_II Transactions
+---------------------------------------
+Writes a transaction store in the same layout retail_store.py produces
+(cleaned lines, one Parquet file per InvoiceMonth partition, _manifest.json),
+so every stage reads it through load_transactions / iter_transactions
+exactly as it reads the real data.
+
+Shape follows the real workbook: ~20 lines per invoice, one date and customer
+per invoice, ~20% of lines without a Customer ID, power-law customer and SKU
+popularity, a few percent of SKUs with CHRISTMAS / XMAS in the description,
+trading hours 7-20. Months are generated and written one at a time, so
+memory stays bounded by one month of lines at any scale.
+
+    python benchmarks/synthetic_retail.py ./bench_store --lines 1000000 --customers 10000 --skus 5000
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "notebooks"))
+from retail_store import DTYPES, MANIFEST, PARTITION_COL, SHEETS, STORE_ORDER
+
+# name -> (lines, customers, skus)
+SCALES = {
+    'small': (100_000, 2_000, 1_000),
+    '1m': (1_000_000, 10_000, 5_000),
+    '10m': (10_000_000, 500_000, 50_000),
+    '100m': (100_000_000, 5_000_000, 500_000),
+}
+
+START_MONTH = "2009-12"
+MONTHS = 25                  # Dec-2009 .. Dec-2011, like the two workbook sheets
+LINES_PER_INVOICE = 20
+MISSING_CUSTOMER_SHARE = 0.2
+FESTIVE_SKU_SHARE = 0.03
+COUNTRIES = np.array(['United Kingdom'] * 9 + ['Germany', 'France', 'EIRE', 'Netherlands', 'Spain'])
+SECOND_SHEET_START = pd.Timestamp("2010-12-10")
+
+
+def _popularity(n, exponent, rng):
+    """Power-law weights over n ids, in random id order."""
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return rng.permutation(weights / weights.sum())
+
+
+def _catalogue(n_skus, rng):
+    festive = rng.random(n_skus) < FESTIVE_SKU_SHARE
+    keyword = np.where(rng.random(n_skus) < 0.7, 'CHRISTMAS', 'XMAS')
+    ids = np.char.zfill(np.arange(n_skus).astype(str), 6)
+    names = np.where(festive, np.char.add(np.char.add(keyword, ' PRODUCT '), ids), np.char.add('PRODUCT ', ids))
+    prices = np.round(rng.lognormal(mean=1.0, sigma=0.8, size=n_skus), 2).clip(0.01)
+    return names, np.char.add('S', ids), prices
+
+
+def _month_lines(month, n_lines, first_invoice, customers_p, skus_p, catalogue, rng):
+    names, codes, prices = catalogue
+    n_invoices = max(1, n_lines // LINES_PER_INVOICE)
+    start = month.to_timestamp()
+    days = (month + 1).to_timestamp() - start
+
+    # Invoice-level attributes
+    inv_day = rng.integers(0, days.days, n_invoices)
+    inv_minute = rng.integers(7 * 60, 20 * 60, n_invoices)
+    inv_date = start + pd.to_timedelta(inv_day, unit='D') + pd.to_timedelta(inv_minute, unit='min')
+    inv_customer = (12000 + rng.choice(len(customers_p), n_invoices, p=customers_p)).astype(float)
+    inv_customer[rng.random(n_invoices) < MISSING_CUSTOMER_SHARE] = np.nan
+    inv_country = rng.choice(COUNTRIES, n_invoices)
+
+    # Lines
+    invoice_of_line = np.sort(rng.integers(0, n_invoices, n_lines))
+    sku = rng.choice(len(skus_p), n_lines, p=skus_p)
+    lines = pd.DataFrame({
+        'Invoice': (first_invoice + invoice_of_line).astype(str),
+        'StockCode': codes[sku],
+        'Description': names[sku],
+        'Quantity': rng.geometric(0.15, n_lines).astype(np.int32),
+        'InvoiceDate': inv_date.to_numpy()[invoice_of_line],
+        'Price': prices[sku],
+        'Customer ID': inv_customer[invoice_of_line],
+        'Country': inv_country[invoice_of_line],
+    })
+    lines['Sheet'] = np.where(lines['InvoiceDate'] < SECOND_SHEET_START, SHEETS[0], SHEETS[1])
+    # One timestamp per invoice, so (InvoiceDate, Invoice) order is retail_store.STORE_ORDER
+    lines = lines.sort_values(['InvoiceDate', 'Invoice'], kind='stable')
+    return lines.astype(DTYPES).reset_index(drop=True), first_invoice + n_invoices
+
+
+def generate_store(store_dir, lines, customers, skus, months=MONTHS, seed=42):
+    """Write a synthetic store; returns its manifest."""
+    store_dir = Path(store_dir)
+    params = {'lines': int(lines), 'customers': int(customers), 'skus': int(skus),
+              'months': int(months), 'seed': int(seed)}
+    manifest_path = store_dir / MANIFEST
+    if manifest_path.exists():
+        manifest = json.loads(manifest_path.read_text())
+        if manifest.get('synthetic') == params:
+            return manifest
+
+    rng = np.random.default_rng(seed)
+    customers_p = _popularity(customers, 0.6, rng)
+    skus_p = _popularity(skus, 0.9, rng)
+    catalogue = _catalogue(skus, rng)
+
+    for old in store_dir.glob(f"{PARTITION_COL}=*/*.parquet"):
+        old.unlink()
+    periods = pd.period_range(START_MONTH, periods=months, freq='M')
+    per_month = np.full(months, lines // months)
+    per_month[: lines % months] += 1
+    next_invoice = 489434   # first invoice number in the real workbook
+    for month, n_lines in zip(periods, per_month):
+        part, next_invoice = _month_lines(month, int(n_lines), next_invoice, customers_p, skus_p, catalogue, rng)
+        part_dir = store_dir / f"{PARTITION_COL}={month.strftime('%Y-%m')}"
+        part_dir.mkdir(parents=True, exist_ok=True)
+        part.to_parquet(part_dir / "part-0.parquet", engine='pyarrow', index=False)
+
+    manifest = {
+        'signature': {'source': 'synthetic', **params},
+        'raw_rows': int(lines),
+        'clean_rows': int(lines),
+        'months': [p.strftime('%Y-%m') for p in periods],
+        'sort_order': STORE_ORDER,
+        'synthetic': params,
+    }
+    manifest_path.write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic online_retail_II-shaped transaction store.")
+    parser.add_argument("store_dir")
+    parser.add_argument("--scale", choices=list(SCALES), default='1m')
+    parser.add_argument("--lines", type=int)
+    parser.add_argument("--customers", type=int)
+    parser.add_argument("--skus", type=int)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    lines, customers, skus = SCALES[args.scale]
+    manifest = generate_store(args.store_dir, args.lines or lines, args.customers or customers,
+                              args.skus or skus, seed=args.seed)
+    print(f"✅ Synthetic store: {manifest['clean_rows']:,} lines in {len(manifest['months'])} months -> {args.store_dir}")
@@ -1,18 +1,26 @@
-import pickle
+import sys
+from pathlib import Path
 import pandas as pd
 
-# Example: Load the model
-with open(r"E:\c drive\project\models\churn_model.pkl", "rb") as file:
-    churn_model = pickle.load(file)
+# Shared batch scorer lives with the pipeline scripts in notebooks/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "notebooks"))
+from scoring import BatchScorer
+
+# Example: Load the models once (promotion, churn and CLTV) from this folder
+scorer = BatchScorer(Path(__file__).resolve().parent)
 
 # Load some test data
 data = pd.DataFrame({
     'Recency': [10],
     'Frequency': [5],
     'Monetary': [200],
+    'AOV': [40],
+    'PF': [0.5],
+    'CLTV': [730],
     # Add other features required by your model
 })
 
-# Make predictions
-prediction = churn_model.predict(data)
-print("Churn Prediction:", prediction)
+# Make predictions (whole tables are scored the same way, see scoring.score_table;
+# online single-customer requests go to notebooks/prediction_service.py instead)
+prediction = scorer.score(data, models=['churn'])
+print("Churn Probability:", prediction["Churn_Prob"].tolist())
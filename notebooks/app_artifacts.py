@@ -0,0 +1,267 @@
+# app_artifacts.py
+"""
+Indexed Lookup Artifacts for the Streamlit Apps
+-----------------------------------------------
+promotion_recommender.py, clearance_planner.py, top_products_gui.py and
+promotion_trigger_gui.py used to read their CSVs on every load and find the
+selected customer / product with a full boolean scan (festival_promo_gui.py
+queries seasonal_index.py instead).
+
+The build step converts each source table into:
+
+    <ARTIFACT_DIR>/<name>.arrow        uncompressed Arrow IPC (Feather v2) file,
+                                       rows sorted by the lookup key
+    <ARTIFACT_DIR>/<name>.index.npz    sorted keys + [start, stop) row offsets
+    <ARTIFACT_DIR>/<name>.json         key column and source file signature
+
+Apps call open_table(name) inside st.cache_resource: the Arrow file is
+memory-mapped once per server process (no parse, no copy) and a key -> row
+range dict gives O(1) lookups; only the selected rows are materialised as
+pandas. A table is rebuilt automatically when its source file changes.
+
+Everything expensive happens in the build step, not in the apps: clearance
+features / discounts / strategies, the promotion model's predictions
+(Predicted_Promotion_Class, so the recommender never unpickles sklearn
+models) and the hourly trigger segment labels are all precomputed into the
+artifacts. APP_TABLES lists every app table with its source, key and builder.
+
+Build every artifact whose source exists (the pipeline's app_artifacts stage):
+    python app_artifacts.py
+"""
+
+import json
+import os
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+
+from group_agg import group_count_if, group_ratio_if
+from instrument import instrumented, stage
+from promo_rules import BASE_MARGIN, ELASTICITY, clearance_discount, project_revenue, clearance_strategy
+from schema import apply_schema, read_table, validate
+
+ARTIFACT_DIR = Path(os.environ.get("RETAIL_ARTIFACT_DIR", "./app_artifacts"))
+BUILD_FILE = "_build.json"   # written by the build step: which tables were built from what
+
+
+# ---------------- Build ---------------- #
+
+def _signature(path):
+    stat = Path(path).stat()
+    return {'source': str(path), 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def _paths(name, artifact_dir):
+    artifact_dir = Path(artifact_dir)
+    return (artifact_dir / f"{name}.arrow", artifact_dir / f"{name}.index.npz",
+            artifact_dir / f"{name}.json")
+
+
+@instrumented()
+def build_table(df, name, key, source=None, artifact_dir=ARTIFACT_DIR):
+    """Write df (sorted by key) as a memory-mappable Arrow file plus its key -> row range index."""
+    data_path, index_path, meta_path = _paths(name, artifact_dir)
+    data_path.parent.mkdir(parents=True, exist_ok=True)
+
+    df = df.sort_values(key, kind='stable').reset_index(drop=True)
+    keys = df[key].to_numpy()
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.array([], dtype=np.int64)
+    stops = np.r_[starts[1:], len(keys)]
+
+    feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), data_path,
+                          compression='uncompressed')
+    unique_keys = keys[starts]
+    if unique_keys.dtype == object:
+        unique_keys = unique_keys.astype(str)
+    np.savez(index_path, keys=unique_keys, starts=starts, stops=stops)
+    meta = {'key': key, 'rows': int(len(df)), 'signature': _signature(source) if source else None}
+    meta_path.write_text(json.dumps(meta, indent=2))
+    return data_path
+
+
+def is_current(name, source=None, artifact_dir=ARTIFACT_DIR):
+    data_path, index_path, meta_path = _paths(name, artifact_dir)
+    if not (data_path.exists() and index_path.exists() and meta_path.exists()):
+        return False
+    if source is None or not Path(source).exists():
+        # Source not available on this machine: trust the existing artifact
+        return True
+    return json.loads(meta_path.read_text()).get('signature') == _signature(source)
+
+
+# ---------------- Lookup ---------------- #
+
+class LookupTable:
+    """Memory-mapped Arrow table with O(1) key -> rows lookups."""
+
+    def __init__(self, name, artifact_dir=ARTIFACT_DIR):
+        data_path, index_path, meta_path = _paths(name, artifact_dir)
+        self.name = name
+        self.key = json.loads(meta_path.read_text())['key']
+        self.table = pa.ipc.open_file(pa.memory_map(str(data_path), 'r')).read_all()
+        with np.load(index_path, allow_pickle=False) as index:
+            self.keys = index['keys']
+            self._ranges = dict(zip(self.keys.tolist(), zip(index['starts'].tolist(), index['stops'].tolist())))
+        self._frame = None
+
+    def __len__(self):
+        return self.table.num_rows
+
+    def __contains__(self, key):
+        return key in self._ranges
+
+    def rows(self, key):
+        """All rows for key as a DataFrame (empty if the key is unknown)."""
+        start, stop = self._ranges.get(key, (0, 0))
+        return self.table.slice(start, stop - start).to_pandas()
+
+    def row(self, key):
+        """First row for key as a Series (KeyError if the key is unknown)."""
+        if key not in self._ranges:
+            raise KeyError(key)
+        return self.rows(key).iloc[0]
+
+    def frame(self):
+        """Whole table as pandas (converted once, for full-table views and exports)."""
+        if self._frame is None:
+            self._frame = self.table.to_pandas()
+        return self._frame
+
+    def unique(self, column):
+        """Sorted distinct non-null values of a column, computed in Arrow (no pandas conversion)."""
+        values = pc.unique(self.table[column].combine_chunks())
+        if pa.types.is_dictionary(values.type):
+            values = values.dictionary_decode()
+        return sorted(v for v in values.to_pylist() if v is not None)
+
+
+def open_table(name, source=None, key=None, transform=None, artifact_dir=ARTIFACT_DIR):
+    """
+    Open artifact `name`, (re)building it first from `source` if it is missing
+    or the source changed. transform(path) -> DataFrame builds the table
+    (default: pd.read_csv). Without a source, the APP_TABLES entry for name is used.
+    """
+    if source is None and name in APP_TABLES:
+        source, key, transform = APP_TABLES[name]
+    if not is_current(name, source, artifact_dir):
+        with stage(f"load_source:{name}") as s:
+            df = s.output(transform(source) if transform else pd.read_csv(source))
+        build_table(df, name, key, source, artifact_dir)
+    with stage(f"open_table:{name}") as s:
+        return s.output(LookupTable(name, artifact_dir))
+
+
+# ---------------- Table builders ---------------- #
+
+def load_clearance_monthly(file_path):
+    df = read_table(file_path, 'products_monthly')
+    bad_months = df['YearMonth'].isna()
+    if bad_months.any():
+        raise ValueError(f"{file_path}: {bad_months.sum()} rows with a missing or invalid YearMonth")
+    df['Month_Quantity'] = df['Month_Quantity'].fillna(0)
+    return df
+
+
+@instrumented()
+def build_clearance_features(df):
+    """Per-product clearance features (bottom10_products_monthly layout in)."""
+    feat = (
+        df.groupby('Description')
+        .agg(
+            Avg_Monthly_Quantity=('Month_Quantity', 'mean'),
+            Std_Monthly_Quantity=('Month_Quantity', 'std'),
+            Total_Value=('Month_Value', 'sum')
+        ).reset_index()
+    )
+    # Per-group counts via bincount on encoded keys (no Python call per product)
+    feat['Months_Active'] = group_count_if(df['Description'], df['Month_Quantity'] > 0).to_numpy()
+    total_months = df['YearMonth'].nunique()
+    zero_sales = (
+        group_ratio_if(df['Description'], df['Month_Quantity'] == 0)
+        .rename_axis('Description')
+        .reset_index(name='Zero_Sales_Ratio')
+    )
+    feat = feat.merge(zero_sales, on='Description')
+    last_sale = (
+        df[df['Month_Quantity'] > 0]
+        .groupby('Description')['YearMonth']
+        .max()
+        .reset_index(name='Last_Sale_Date')
+    )
+    max_month = df['YearMonth'].max()
+    last_sale['Last_Sale_Months_Ago'] = ((max_month - last_sale['Last_Sale_Date']).dt.days // 30)
+    feat = feat.merge(last_sale[['Description', 'Last_Sale_Months_Ago']], on='Description', how='left')
+    feat['Last_Sale_Months_Ago'] = feat['Last_Sale_Months_Ago'].fillna(total_months)
+    feat['CV_Monthly_Quantity'] = feat['Std_Monthly_Quantity'] / feat['Avg_Monthly_Quantity'].replace(0, np.nan)
+    return feat
+
+
+def clearance_recommendations(file_path, elasticity=ELASTICITY, base_margin=BASE_MARGIN):
+    """Clearance table: features, discount, revenue projection and strategy per product."""
+    feat = build_clearance_features(load_clearance_monthly(file_path))
+    # Discount, revenue projection and strategy rules are evaluated column-wise
+    feat['Adj_Discount'] = clearance_discount(feat)
+    feat = pd.concat([feat, project_revenue(feat, elasticity=elasticity, base_margin=base_margin)], axis=1)
+    feat['Strategy'] = clearance_strategy(feat)
+    return feat
+
+
+def promotion_table(file_path, model_dir=None):
+    """promotion_dataset with the promotion model's Predicted_Promotion_Class precomputed (if the model exists)."""
+    from scoring import MODEL_DIR, PROMOTION_MODEL, BatchScorer
+
+    df = read_table(file_path, 'promotion_dataset')
+    model_dir = Path(model_dir or MODEL_DIR)
+    if (model_dir / PROMOTION_MODEL).exists():
+        df = BatchScorer(model_dir).score_table(df, models=['promotion'])
+    return df
+
+
+SEGMENT_TIERS = {'A': 'Top', 'B': 'High', 'C': 'Medium', 'D': 'Low'}
+
+
+def hourly_trigger_table(file_path):
+    """promotion_hourly_triggers with A/B/C/D segment codes shown as Top/High/Medium/Low."""
+    df = pd.read_csv(file_path)
+    if 'CLTV_Segment_Label' not in df.columns and 'CLTV_Segment' in df.columns:
+        df['CLTV_Segment_Label'] = df['CLTV_Segment']
+    df['CLTV_Segment_Label'] = df['CLTV_Segment_Label'].astype(str).replace(SEGMENT_TIERS)
+    return validate(apply_schema(df), 'promotion_hourly_triggers')
+
+
+# Sources the apps open: name -> (source, key, transform). Paths are relative to notebooks/ (the
+# apps' and the pipeline's working directory) and identical to the outputs of the pipeline
+# stages that write them, so the app_artifacts stage depends on those stages.
+APP_TABLES = {
+    'promotion': ("promotion_dataset.csv", 'Customer_ID', promotion_table),
+    'clearance': ("outputs_low_sellers/bottom10_products_monthly.csv", 'Description', clearance_recommendations),
+    'top_products_plan': ("outputs_top_items_forecast/top10_forecast_action_plan.csv", 'Description', read_table),
+    'top_products_monthly': ("outputs_top_items/top10_products_monthly.csv", 'Description',
+                             partial(read_table, table='products_monthly')),
+    'hourly_triggers': ("promotion_hourly_triggers.csv", 'CLTV_Segment_Label', hourly_trigger_table),
+}
+
+
+def build_all(artifact_dir=ARTIFACT_DIR):
+    """Build every APP_TABLES artifact whose source exists; returns {name: rows}."""
+    built = {}
+    for name, (source, key, transform) in APP_TABLES.items():
+        if not Path(source).exists():
+            print(f"Skipping {name}: {source} not found")
+            continue
+        df = transform(source) if transform else pd.read_csv(source)
+        build_table(df, name, key, source, artifact_dir)
+        built[name] = len(df)
+        print(f"✅ {name}: {len(df):,} rows -> {Path(artifact_dir) / (name + '.arrow')}")
+    Path(artifact_dir).mkdir(parents=True, exist_ok=True)
+    (Path(artifact_dir) / BUILD_FILE).write_text(json.dumps({'tables': built}, indent=2))
+    return built
+
+
+if __name__ == "__main__":
+    build_all()
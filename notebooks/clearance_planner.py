@@ -1,113 +1,39 @@
-# clearance_planner.py  (no chart version)
-import pandas as pd
-import numpy as np
+# clearance_planner.py
 import streamlit as st
 from pathlib import Path
+from app_artifacts import open_table
+from clearance_simulator import simulate
+from instrument import stage
+from promo_rules import BASE_MARGIN, ELASTICITY
 
-DATA_FILE = r"E:\c drive\project\notebooks\outputs_top_items\outputs_low_sellers\bottom10_products_monthly.csv"
 OUT_DIR = Path(r"E:\c drive\project\notebooks\outputs_low_sellers")
-OUT_DIR.mkdir(exist_ok=True)
 OUT_FILE = OUT_DIR / r"E:\c drive\project\notebooks\outputs_low_sellers\clearance_recommendations.csv"
 
-BASE_MARGIN = 0.30
-ELASTICITY = -1.2
-
-def load_data(file_path):
-    df = pd.read_csv(file_path)
-    df['YearMonth'] = pd.to_datetime(df['YearMonth'], errors='coerce')
-    df['Month_Quantity'] = df['Month_Quantity'].fillna(0)
-    return df
-
-full_df = load_data(DATA_FILE)
-
-def build_features(df):
-    feat = (
-        df.groupby('Description')
-        .agg(
-            Avg_Monthly_Quantity=('Month_Quantity', 'mean'),
-            Std_Monthly_Quantity=('Month_Quantity', 'std'),
-            Total_Value=('Month_Value', 'sum'),
-            Months_Active=('Month_Quantity', lambda x: (x > 0).sum())
-        ).reset_index()
-    )
-    total_months = df['YearMonth'].nunique()
-    zero_sales = (
-        df.groupby('Description')['Month_Quantity']
-        .apply(lambda x: (x == 0).sum() / len(x))
-        .reset_index(name='Zero_Sales_Ratio')
-    )
-    feat = feat.merge(zero_sales, on='Description')
-    last_sale = (
-        df[df['Month_Quantity'] > 0]
-        .groupby('Description')['YearMonth']
-        .max()
-        .reset_index(name='Last_Sale_Date')
-    )
-    max_month = df['YearMonth'].max()
-    last_sale['Last_Sale_Months_Ago'] = ((max_month - last_sale['Last_Sale_Date']).dt.days // 30)
-    feat = feat.merge(last_sale[['Description', 'Last_Sale_Months_Ago']], on='Description', how='left')
-    feat['Last_Sale_Months_Ago'] = feat['Last_Sale_Months_Ago'].fillna(total_months)
-    feat['CV_Monthly_Quantity'] = feat['Std_Monthly_Quantity'] / feat['Avg_Monthly_Quantity'].replace(0, np.nan)
-    return feat
-
-feat = build_features(full_df)
-
-def discount_logic(row):
-    if row['Zero_Sales_Ratio'] > 0.9:
-        base_discount = 0.50
-    elif row['Zero_Sales_Ratio'] > 0.7:
-        base_discount = 0.40
-    else:
-        base_discount = 0.30
-    adj = base_discount
-    if row['Last_Sale_Months_Ago'] > 6:
-        adj += 0.05
-    if pd.notnull(row['CV_Monthly_Quantity']) and row['CV_Monthly_Quantity'] > 1.0:
-        adj += 0.05
-    return min(adj, 0.60)
-
-feat['Adj_Discount'] = feat.apply(discount_logic, axis=1)
-
-def compute_rev(row):
-    avg_price_est = (row['Total_Value'] / max(row['Months_Active'], 1)) / max(row['Avg_Monthly_Quantity'], 1)
-    discounted_price = avg_price_est * (1 - row['Adj_Discount'])
-    demand_mult = 1 + abs(ELASTICITY) * row['Adj_Discount']
-    projected_units = max(row['Avg_Monthly_Quantity'] * demand_mult,
-                          row['Avg_Monthly_Quantity'] + 1)
-    current_rev = row['Avg_Monthly_Quantity'] * avg_price_est
-    proj_rev = projected_units * discounted_price
-    current_gp = current_rev * BASE_MARGIN
-    proj_gp = proj_rev * BASE_MARGIN
-    return pd.Series({
-        'Avg_Price_Est': round(avg_price_est, 2),
-        'Discounted_Price': round(discounted_price, 2),
-        'Projected_Units': round(projected_units, 2),
-        'Current_Revenue': round(current_rev, 2),
-        'Projected_Revenue': round(proj_rev, 2),
-        'Revenue_Lift': round(proj_rev - current_rev, 2),
-        'Current_Gross_Profit': round(current_gp, 2),
-        'Projected_Gross_Profit': round(proj_gp, 2),
-        'Gross_Profit_Delta': round(proj_gp - current_gp, 2)
-    })
+# -------------- STREAMLIT UI --------------
+# set_page_config must be the first Streamlit call, before the cached loaders run
+st.set_page_config(page_title="Clearance Sale Planner", layout="wide")
 
-feat = pd.concat([feat, feat.apply(compute_rev, axis=1)], axis=1)
+@st.cache_resource
+def load_table():
+    # Features, discounts and strategies are computed by the build step
+    # (python app_artifacts.py) into a memory-mapped artifact indexed by Description
+    return open_table("clearance")
 
-def strategy(row):
-    if row['Zero_Sales_Ratio'] > 0.9 and row['Last_Sale_Months_Ago'] >= 9:
-        return "Discontinue"
-    if row['Revenue_Lift'] < 0 and row['Gross_Profit_Delta'] < 0:
-        return "Bundle / Placement Test"
-    return "Clearance Discount"
+@st.cache_resource
+def load_simulation():
+    # Whole catalogue x elasticity x margin x 0-60% discount grid, computed once per
+    # process; widget changes below only index into it. Cost-based margins (gross profit
+    # = units x price x (margin - discount)) so the Base Margin slider moves the optimum
+    with stage("clearance_whatif"):
+        return simulate(load_table().frame(), cost_based=True)
 
-feat['Strategy'] = feat.apply(strategy, axis=1)
-feat.to_csv(OUT_FILE, index=False)
+table = load_table()
 
-# -------------- STREAMLIT UI --------------
-st.set_page_config(page_title="Clearance Sale Planner", layout="wide")
 st.title("🛒 Clearance Sale Planner ")
 
-product = st.selectbox("Select a Product", feat['Description'].tolist())
-row = feat[feat['Description'] == product].iloc[0]
+product = st.selectbox("Select a Product", table.keys.tolist())
+with stage("lookup_product"):
+    row = table.row(product)
 
 col1, col2, col3, col4 = st.columns(4)
 col1.metric("Discount", f"{row['Adj_Discount']*100:.0f}%")
@@ -121,9 +47,34 @@ col6.metric("Zero-Sales %", f"{row['Zero_Sales_Ratio']*100:.0f}%")
 col7.metric("Months Since Sale", f"{row['Last_Sale_Months_Ago']}")
 col8.metric("Projected Units", f"{row['Projected_Units']}")
 
+st.subheader("What-If: Discount vs Gross Profit (cost-based margin)")
+st.caption("Gross profit here = units × price × (margin − discount), with a fixed unit cost. "
+           "The metrics above use the build step's revenue-share profit (revenue × margin), "
+           "so the two Gross Profit Delta figures differ.")
+grid = load_simulation()
+col9, col10 = st.columns(2)
+elasticity = col9.select_slider("Price Elasticity", options=grid.elasticities.tolist(), value=ELASTICITY)
+margin = col10.select_slider("Base Margin", options=grid.margins.tolist(), value=BASE_MARGIN)
+curve = grid.curve(product, elasticity, margin)
+best = curve.loc[curve['Gross_Profit_Delta'].idxmax()]
+
+col11, col12, col13 = st.columns(3)
+col11.metric("Optimal Discount", f"{best['Discount']*100:.0f}%")
+col12.metric("Max GP Delta", f"{best['Gross_Profit_Delta']:.2f}")
+col13.metric("Rev Lift @ Optimal", f"{best['Revenue_Lift']:.2f}")
+st.line_chart(curve.set_index('Discount')[['Gross_Profit_Delta', 'Revenue_Lift']])
+
+with st.expander("Optimal Discount per Product (this scenario)"):
+    st.dataframe(grid.optimal(elasticity, margin).sort_values('Max_Gross_Profit_Delta', ascending=False))
+
 with st.expander("Show Full Clearance Table"):
-    st.dataframe(feat.sort_values('Adj_Discount', ascending=False))
+    # Sorted in Arrow; no pandas copy of the whole table on render
+    st.dataframe(table.table.sort_by([('Adj_Discount', 'descending')]))
 
 if st.button("Export CSV"):
+    feat = table.frame()
+    with stage("export_csv", inputs=feat):
+        OUT_DIR.mkdir(exist_ok=True)
+        feat.to_csv(OUT_FILE, index=False)
     st.success(f"Saved: {OUT_FILE}")
 #python -m streamlit run "notebooks/clearance_planner.py"
@@ -0,0 +1,143 @@
+# clearance_simulator.py
+"""
+Clearance What-If Simulator
+---------------------------
+clearance_planner.py shows one rule-based discount per product under a single
+ELASTICITY / BASE_MARGIN. This module sweeps every low-seller over a whole
+scenario grid at once:
+
+    products x elasticities x margins x discounts (0-60% in 1% steps)
+
+as one broadcasted NumPy computation (no Python loop over products or
+scenarios), using the same projection as promo_rules.project_revenue:
+
+    units(d)   = max(Avg_Monthly_Quantity * (1 + |elasticity| * d), Avg_Monthly_Quantity + 1)
+    revenue(d) = units(d) * Avg_Price_Est * (1 - d)
+    GP(d)      = revenue(d) * margin                        (revenue-share margin, as project_revenue)
+               = units(d) * Avg_Price_Est * (margin - d)    (cost_based=True: unit cost fixed)
+    Gross_Profit_Delta(d) = GP(d) - Avg_Monthly_Quantity * Avg_Price_Est * margin
+
+With the default revenue-share margin the curve at a product's Adj_Discount
+reproduces promo_rules.project_revenue's Gross_Profit_Delta (the planner's
+headline metrics), but the margin only scales the curve, so the optimum never
+depends on it. clearance_planner.py's what-if therefore uses cost_based=True,
+whose numbers differ from the headline metrics (the page labels it as such).
+
+ScenarioGrid.optimal() picks the profit-maximising discount per product and
+scenario (lowest discount on ties); curve() returns one product's
+Gross_Profit_Delta / Revenue_Lift by discount.
+
+    python clearance_simulator.py bottom10_features.csv --out clearance_optimal.csv
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from promo_rules import BASE_MARGIN, ELASTICITY, MAX_DISCOUNT, price_estimate
+
+DISCOUNTS = np.round(np.arange(0, round(MAX_DISCOUNT * 100) + 1) / 100, 2)    # 0.00 .. 0.60
+ELASTICITIES = (-0.8, ELASTICITY, -1.6, -2.0, -3.0)
+MARGINS = (0.20, BASE_MARGIN, 0.40)
+
+
+class ScenarioGrid:
+    """Simulated Gross_Profit_Delta / Revenue_Lift for products x elasticities x margins x discounts."""
+
+    def __init__(self, products, discounts, elasticities, margins, gp_delta, revenue_lift, units):
+        self.products = np.asarray(products)
+        self.discounts = np.asarray(discounts, dtype=float)
+        self.elasticities = np.asarray(elasticities, dtype=float)
+        self.margins = np.asarray(margins, dtype=float)
+        self.gp_delta = gp_delta          # (products, elasticities, margins, discounts)
+        self.revenue_lift = revenue_lift  # (products, elasticities, 1, discounts)
+        self.units = units                # (products, elasticities, 1, discounts)
+        self._rows = {p: i for i, p in enumerate(self.products.tolist())}
+        self._best = None
+
+    @property
+    def best_index(self):
+        """Index of the profit-maximising discount per (product, elasticity, margin)."""
+        if self._best is None:
+            self._best = self.gp_delta.argmax(axis=-1)
+        return self._best
+
+    def _scenario(self, elasticity, margin):
+        e = int(np.abs(self.elasticities - elasticity).argmin())
+        m = int(np.abs(self.margins - margin).argmin())
+        return e, m
+
+    def optimal(self, elasticity=None, margin=None):
+        """
+        Optimal_Discount, Max_Gross_Profit_Delta, Revenue_Lift and Projected_Units per
+        product; for one scenario if elasticity / margin are given, else for all of them.
+        """
+        best = self.best_index
+        p, e, m = np.indices(best.shape)
+        if elasticity is not None or margin is not None:
+            e0, m0 = self._scenario(ELASTICITY if elasticity is None else elasticity,
+                                    BASE_MARGIN if margin is None else margin)
+            best, p, e, m = best[:, e0, m0], p[:, e0, m0], e[:, e0, m0], m[:, e0, m0]
+        return pd.DataFrame({
+            'Description': self.products[p.ravel()],
+            'Elasticity': self.elasticities[e.ravel()],
+            'Margin': self.margins[m.ravel()],
+            'Optimal_Discount': self.discounts[best.ravel()],
+            'Max_Gross_Profit_Delta': self.gp_delta[p, e, m, best].ravel(),
+            'Revenue_Lift': self.revenue_lift[p, e, 0, best].ravel(),
+            'Projected_Units': self.units[p, e, 0, best].ravel(),
+        })
+
+    def curve(self, product, elasticity=ELASTICITY, margin=BASE_MARGIN):
+        """Gross_Profit_Delta and Revenue_Lift by discount for one product and scenario."""
+        i = self._rows[product]
+        e, m = self._scenario(elasticity, margin)
+        return pd.DataFrame({
+            'Discount': self.discounts,
+            'Gross_Profit_Delta': self.gp_delta[i, e, m],
+            'Revenue_Lift': self.revenue_lift[i, e, 0],
+            'Projected_Units': self.units[i, e, 0],
+        })
+
+
+def simulate(feat, discounts=DISCOUNTS, elasticities=ELASTICITIES, margins=MARGINS, cost_based=False):
+    """Sweep every product in feat (clearance features layout) over the full scenario grid."""
+    qty, price = price_estimate(feat)
+    q = qty[:, None, None, None]                                               # (P, 1, 1, 1)
+    p = price[:, None, None, None]
+    e = np.abs(np.asarray(elasticities, dtype=float))[None, :, None, None]     # (1, E, 1, 1)
+    m = np.asarray(margins, dtype=float)[None, None, :, None]                  # (1, 1, M, 1)
+    d = np.asarray(discounts, dtype=float)[None, None, None, :]                # (1, 1, 1, D)
+
+    units = np.maximum(q * (1 + e * d), q + 1)                                 # (P, E, 1, D)
+    revenue = units * p * (1 - d)
+    current_rev = q * p
+    if cost_based:
+        gp = units * p * (m - d)
+    else:
+        gp = revenue * m                                                       # (P, E, M, D)
+    gp_delta = gp - current_rev * m
+    return ScenarioGrid(feat['Description'].to_numpy(), discounts, elasticities, margins,
+                        gp_delta, revenue - current_rev, units)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep clearance discounts x elasticities x margins.")
+    parser.add_argument("features_csv", help="clearance features (Description, Avg_Monthly_Quantity, "
+                                             "Months_Active, Total_Value)")
+    parser.add_argument("--out", default="clearance_optimal.csv")
+    parser.add_argument("--elasticities", type=float, nargs="+", default=list(ELASTICITIES))
+    parser.add_argument("--margins", type=float, nargs="+", default=list(MARGINS))
+    parser.add_argument("--cost-based", action="store_true", help="fixed unit cost instead of revenue-share margin")
+    args = parser.parse_args()
+
+    feat = pd.read_csv(args.features_csv)
+    start = time.perf_counter()
+    grid = simulate(feat, elasticities=args.elasticities, margins=args.margins, cost_based=args.cost_based)
+    optimal = grid.optimal()
+    elapsed = time.perf_counter() - start
+    optimal.to_csv(args.out, index=False)
+    print(f"✅ {grid.gp_delta.size:,} scenarios ({len(feat):,} products x {len(args.elasticities)} elasticities x "
+          f"{len(args.margins)} margins x {len(DISCOUNTS)} discounts) in {elapsed:.3f}s -> {args.out}")
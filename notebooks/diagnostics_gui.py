@@ -0,0 +1,52 @@
+# diagnostics_gui.py
+import pandas as pd
+import streamlit as st
+from instrument import LOG_FILE, load_log, run_summary, stage_summary
+
+st.set_page_config(page_title="Pipeline Diagnostics", layout="wide")
+st.title("🩺 Pipeline Diagnostics")
+
+log_path = st.text_input("Profile log", str(LOG_FILE))
+log = load_log(log_path)
+if log.empty:
+    st.info("No profile records yet. Run a script or app with RETAIL_PROFILE=1 "
+            "(or RETAIL_PROFILE=cprofile,tracemalloc) to collect them.")
+    st.stop()
+
+# Run selection (latest first)
+runs = (
+    log.groupby('run_id', sort=False)
+    .agg(Script=('script', 'first'), Started=('ts', 'min'), Stages=('stage', 'size'))
+    .iloc[::-1]
+)
+run_id = st.selectbox("Run", runs.index.tolist(),
+                      format_func=lambda r: f"{runs.at[r, 'Started']}  {runs.at[r, 'Script']}  ({r})")
+
+st.subheader("⏱️ Stages in this run")
+summary = run_summary(log, run_id)
+c1, c2, c3 = st.columns(3)
+top_level = summary['parent'].isna()
+c1.metric("Wall time (s)", f"{summary.loc[top_level, 'wall_s'].sum():.2f}")
+c2.metric("Stages", len(summary))
+c3.metric("Peak RSS (MB)", f"{summary['rss_peak_mb'].max():.0f}" if summary['rss_peak_mb'].notna().any() else "n/a")
+st.dataframe(summary, use_container_width=True)
+st.bar_chart(summary.set_index('stage')['wall_s'])
+
+# Optional cProfile / tracemalloc details of one stage
+run = log[log['run_id'] == run_id].reset_index(drop=True)
+detail_cols = [c for c in ('top_functions', 'top_allocations') if c in run.columns]
+if detail_cols:
+    selected = st.selectbox("Stage details", run['stage'].tolist())
+    record = run[run['stage'] == selected].iloc[-1]
+    for col in detail_cols:
+        if isinstance(record[col], list):
+            st.write(f"**{col.replace('_', ' ').title()}**")
+            st.dataframe(pd.DataFrame(record[col]), use_container_width=True)
+    if isinstance(record.get('profile_file'), str):
+        st.caption(f"cProfile dump: {record['profile_file']} (open with snakeviz or pstats)")
+
+st.subheader("📊 All runs")
+st.dataframe(stage_summary(log), use_container_width=True)
+
+st.download_button("Download profile log", open(log_path).read(), file_name="profile_log.jsonl")
+#python -m streamlit run "notebooks/diagnostics_gui.py"
@@ -0,0 +1,198 @@
+# feature_store.py
+"""
+Incremental Customer Feature Store
+----------------------------------
+cltv_modeling.ipynb, eda_segmentation.ipynb and build_promotion_dataset.py
+each rebuilt per-customer Frequency / Recency / Monetary / last purchase
+from the full transaction history.
+
+This store keeps running aggregates per customer:
+
+    Customer_ID, First_Purchase_Date, Last_Purchase_Date,
+    Invoices, Monetary, Last_Product
+
+and folds in only invoice-month partitions (see retail_store.py) it has not
+seen yet. The newest month may still be receiving lines, so it is
+recomputed on every refresh and never persisted; all older months are folded
+in exactly once. A daily refresh therefore reads one month of lines, not
+years of history, and months are streamed in bounded-size chunks
+(streaming.fold), so even a first build over many years keeps memory flat.
+
+Refresh features and write cltv_dataset.csv / cltv_with_predictions.csv:
+    python feature_store.py
+    python feature_store.py --rebuild     # drop the saved state first
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from instrument import instrumented
+from retail_store import CHUNK_ROWS, STORE_DIR, iter_transactions, list_months
+from schema import write_table
+from streaming import fold
+
+FEATURE_DIR = Path("./outputs_features")
+STATE_FILE = "customer_state.parquet"
+META_FILE = "customer_state.json"
+
+LINE_COLUMNS = ['Invoice', 'InvoiceDate', 'Description', 'Quantity', 'Price', 'Customer ID']
+STATE_COLUMNS = ['Customer_ID', 'First_Purchase_Date', 'Last_Purchase_Date',
+                 'Invoices', 'Monetary', 'Last_Product']
+
+PROFIT_MARGIN = 0.10   # same assumption as cltv_modeling.ipynb
+LIFETIME_DAYS = 365
+
+
+# ---------------- Running aggregates ---------------- #
+
+def month_aggregates(lines):
+    """Per-customer partial aggregates for a batch of cleaned transaction lines."""
+    if lines.empty:
+        return pd.DataFrame(columns=STATE_COLUMNS)
+    lines = lines.sort_values('InvoiceDate', kind='stable')
+    lines = lines.assign(TotalPrice=lines['Quantity'] * lines['Price'])
+    agg = (
+        lines.groupby('Customer ID')
+        .agg(First_Purchase_Date=('InvoiceDate', 'min'),
+             Last_Purchase_Date=('InvoiceDate', 'max'),
+             Invoices=('Invoice', 'nunique'),
+             Monetary=('TotalPrice', 'sum'),
+             Last_Product=('Description', 'last'))
+        .reset_index()
+        .rename(columns={'Customer ID': 'Customer_ID'})
+    )
+    return agg[STATE_COLUMNS]
+
+
+def merge_aggregates(*parts):
+    """
+    Combine partial aggregates (oldest first). An invoice has a single date, so it
+    never spans two month partitions (nor two iter_transactions chunks) and
+    invoice counts can simply be summed.
+    """
+    parts = [p for p in parts if p is not None and len(p)]
+    if not parts:
+        return pd.DataFrame(columns=STATE_COLUMNS)
+    if len(parts) == 1:
+        return parts[0].sort_values('Customer_ID').reset_index(drop=True)
+    both = pd.concat(parts, ignore_index=True).sort_values('Last_Purchase_Date', kind='stable')
+    merged = (
+        both.groupby('Customer_ID')
+        .agg(First_Purchase_Date=('First_Purchase_Date', 'min'),
+             Last_Purchase_Date=('Last_Purchase_Date', 'max'),
+             Invoices=('Invoices', 'sum'),
+             Monetary=('Monetary', 'sum'),
+             Last_Product=('Last_Product', 'last'))
+        .reset_index()
+    )
+    return merged[STATE_COLUMNS]
+
+
+# ---------------- Persistence ---------------- #
+
+def load_state(feature_dir=FEATURE_DIR):
+    """(state, folded_months); empty if nothing has been folded in yet."""
+    feature_dir = Path(feature_dir)
+    if not (feature_dir / META_FILE).exists():
+        return pd.DataFrame(columns=STATE_COLUMNS), []
+    months = json.loads((feature_dir / META_FILE).read_text())['months']
+    return pd.read_parquet(feature_dir / STATE_FILE), months
+
+
+def save_state(state, months, feature_dir=FEATURE_DIR):
+    feature_dir = Path(feature_dir)
+    feature_dir.mkdir(parents=True, exist_ok=True)
+    state.to_parquet(feature_dir / STATE_FILE, index=False)
+    (feature_dir / META_FILE).write_text(json.dumps({'months': sorted(months)}, indent=2))
+
+
+def _stream_aggregates(months, store_dir, chunk_rows):
+    """(aggregates, line count) for the given months, read chunk by chunk."""
+    n_lines = 0
+
+    def partial(lines):
+        nonlocal n_lines
+        n_lines += len(lines)
+        return month_aggregates(lines)
+
+    chunks = iter_transactions(columns=LINE_COLUMNS, chunk_rows=chunk_rows, months=months,
+                               require_customer=True, store_dir=store_dir)
+    return fold(partial, merge_aggregates, chunks), n_lines
+
+
+@instrumented()
+def refresh_features(feature_dir=FEATURE_DIR, store_dir=STORE_DIR, rebuild=False, chunk_rows=CHUNK_ROWS):
+    """Fold new closed months into the saved state and return up-to-date customer features."""
+    months = list_months(store_dir)
+    state, folded = (pd.DataFrame(columns=STATE_COLUMNS), []) if rebuild else load_state(feature_dir)
+
+    closed, open_month = months[:-1], months[-1:]
+    new_months = [m for m in closed if m not in set(folded)]
+    if new_months:
+        fresh, n_lines = _stream_aggregates(new_months, store_dir, chunk_rows)
+        state = merge_aggregates(state, fresh)
+        folded = sorted(set(folded) | set(new_months))
+        save_state(state, folded, feature_dir)
+        print(f"Folded {len(new_months)} new month(s), {n_lines:,} lines into {len(state):,} customers")
+
+    current, _ = _stream_aggregates(open_month, store_dir, chunk_rows)
+    return customer_features(merge_aggregates(state, current))
+
+
+# ---------------- Derived features ---------------- #
+
+def customer_features(state, snapshot_date=None):
+    """Running aggregates plus tenure and days since last purchase."""
+    features = state.copy()
+    if snapshot_date is None:
+        snapshot_date = features['Last_Purchase_Date'].max() + pd.Timedelta(days=1)
+    features['Tenure_Days'] = (features['Last_Purchase_Date'] - features['First_Purchase_Date']).dt.days
+    features['Days_Since_Last_Purchase'] = (snapshot_date - features['Last_Purchase_Date']).dt.days
+    return features
+
+
+def cltv_dataset(features, profit_margin=PROFIT_MARGIN):
+    """cltv_dataset.csv layout: Frequency / Recency (active period) / Monetary, AOV, PF, CLTV, CLTV_Segment."""
+    cltv = pd.DataFrame({
+        'Customer_ID': features['Customer_ID'],
+        'Frequency': features['Invoices'].astype(int),
+        'Recency': features['Tenure_Days'],
+        'Monetary': features['Monetary'],
+    })
+    cltv['AOV'] = cltv['Monetary'] / cltv['Frequency']
+    cltv['PF'] = cltv['Frequency'] / cltv['Recency']
+    cltv['ProfitMargin'] = profit_margin
+    cltv['CLTV'] = cltv['AOV'] * cltv['PF'] * LIFETIME_DAYS * cltv['ProfitMargin']
+
+    cltv = cltv.replace([np.inf, -np.inf], np.nan)
+    cltv = cltv.dropna(subset=['CLTV'])
+
+    # Quartile segments D (lowest) .. A (highest); fewer labels if bins collapse
+    _, bin_edges = pd.qcut(cltv['CLTV'], q=4, labels=False, retbins=True, duplicates='drop')
+    n_bins = len(bin_edges) - 1
+    labels = list('DCBA')[-n_bins:]
+    cltv['CLTV_Segment'] = pd.qcut(cltv['CLTV'], q=n_bins, labels=labels, duplicates='drop')
+    return cltv.reset_index(drop=True)
+
+
+def write_cltv_outputs(features, out_dir=".", model_dir=None):
+    """Write cltv_dataset.csv and cltv_with_predictions.csv (Predicted_CLTV from models/cltv_model.pkl)."""
+    from scoring import BatchScorer, MODEL_DIR
+
+    out_dir = Path(out_dir)
+    cltv = cltv_dataset(features)
+    write_table(cltv, out_dir / "cltv_dataset.csv", 'cltv_dataset')
+
+    scored = BatchScorer(model_dir or MODEL_DIR).score_table(cltv, models=['cltv'])
+    scored = write_table(scored, out_dir / "cltv_with_predictions.csv", 'cltv_with_predictions')
+    print(f"✅ Saved cltv_dataset.csv and cltv_with_predictions.csv ({len(cltv):,} customers)")
+    return scored
+
+
+if __name__ == "__main__":
+    features = refresh_features(rebuild='--rebuild' in sys.argv[1:])
+    write_cltv_outputs(features)
@@ -1,36 +1,42 @@
+from pathlib import Path
+
 import pandas as pd
 import streamlit as st
+from instrument import stage
+from seasonal_index import INDEX_FILE, SeasonalIndex, load_calendar, promotion_period, refresh_index
 
-# Load data
-DATA_PATH = r"E:\c drive\project\festival_top_products.csv"
+# Streamlit Config (first Streamlit call, before the index is loaded)
+st.set_page_config(page_title="🎁 Festival Product Promotion Planner", layout="wide")
 
-@st.cache_data
-def load_data():
-    return pd.read_csv(DATA_PATH)
+@st.cache_resource
+def load_index():
+    # Per-product x week seasonal index built offline (festival_product_insight.py /
+    # seasonal_index.py); festival queries are answered from it, never from transactions
+    return SeasonalIndex.load(INDEX_FILE) if Path(INDEX_FILE).exists() else refresh_index()
 
-df = load_data()
+index = load_index()
+calendar = load_calendar()
 
-# Streamlit Config
-st.set_page_config(page_title="🎁 Festival Product Promotion Planner", layout="wide")
 st.title("🎉 Festival-Based Product Promotion Planner")
 
-# Festival Selection
-festival_options = df['Festival'].unique().tolist()
+# Festival Selection (festival calendar: promo_rules.FESTIVAL_CALENDAR + festival_calendar.json)
+festival_options = sorted(calendar)
 selected_festival = st.selectbox("Select a Festival", festival_options)
+years = sorted({week.year for week in pd.DatetimeIndex(index.weeks)})
+selected_years = st.multiselect("Sales Years (empty = all)", years)
+top_n = st.slider("Products", min_value=5, max_value=50, value=10, step=5)
 
-# Promotion Period Info
-promotion_month = ""
-if selected_festival.lower() == "christmas":
-    promotion_month = "🎄 1st December to 1st January"
-elif selected_festival.lower() == "diwali":
-    promotion_month = "🪔 1st October to 31st October"
-else:
-    promotion_month = "🗓️ 1st of previous month to the festival day"
+# Promotion Period Info (from the calendar)
+promotion_month = f"🗓️ {promotion_period(calendar[selected_festival])}"
 
 st.markdown(f"📅 **Recommended Promotion Period for {selected_festival}:** `{promotion_month}`")
 
-# Filter data for selected festival
-filtered = df[df['Festival'] == selected_festival].copy()
+# Top products for the selected festival, answered from the index
+with stage("lookup_festival") as s:
+    filtered = s.output(index.top_n(selected_festival, top_n, selected_years or None, calendar))
+
+st.subheader("📈 Weekly Demand of the Top Products")
+st.line_chart(index.weekly(filtered['Description'].head(5)))
 
 st.subheader("🛍️ Set Promotion Discount (%) for Each Product")
 
@@ -0,0 +1,399 @@
+# forecasting.py
+"""
+Parallel Per-Product Forecasting
+--------------------------------
+top_items_forecast.ipynb fitted Prophet / auto_arima / a statistical fallback
+one product at a time, so only the top-10 union was ever forecast.
+
+This module fans the per-SKU fits out over a process pool:
+
+  - Series are grouped once and sent to workers in batches.
+  - Each series runs the fallback cascade Prophet -> ARIMA -> statistical
+    (3M_Average / Last_Value / Zero_Fallback), with a per-series time budget
+    (SERIES_TIMEOUT). Where SIGALRM exists (Linux/macOS) a model fit that
+    overruns is interrupted and the next method is tried; elsewhere the budget
+    is checked between methods. The statistical fallback always answers.
+  - Fitted Prophet / ARIMA models are cached on disk keyed by a hash of the
+    series (dates, quantities, horizon, available methods), so unchanged
+    series are never refit on the next run.
+  - Every method attempt is timed; method_timings() summarises them.
+
+Outputs keep the top10_forecast.csv / top10_forecast_action_plan.csv layout.
+
+Forecast the full catalogue (last 12 months from the transaction store):
+    python forecasting.py --jobs 8
+    python forecasting.py --monthly outputs_top_items/top10_products_monthly.csv --prefix top10
+"""
+
+import argparse
+import calendar
+import hashlib
+import os
+import signal
+import threading
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# Optional model libraries (same fallbacks as top_items_forecast.ipynb)
+try:
+    from prophet import Prophet
+    PROPHET_AVAILABLE = True
+except Exception:
+    PROPHET_AVAILABLE = False
+
+try:
+    from pmdarima import auto_arima
+    ARIMA_AVAILABLE = True
+except Exception:
+    ARIMA_AVAILABLE = False
+
+# ---------------- Configuration ---------------- #
+OUTPUT_DIR = Path("./outputs_top_items_forecast")
+CACHE_DIR = OUTPUT_DIR / "model_cache"
+
+SAFETY_MULTIPLIER = 1.0   # e.g. 1.28 for ~80% service level
+FORECAST_PERIODS = 1      # forecast next 1 month
+SERIES_TIMEOUT = 60.0     # seconds per series across all model attempts
+MIN_MODEL_POINTS = 4      # Prophet / ARIMA need at least this many months
+BATCH_SIZE = 32           # series per worker task
+ROLLING_MONTHS = 12
+
+FORECAST_COLUMNS = ['Description', 'History_Months', 'Forecast_Quantity', 'Forecast_Method',
+                    'Safety_Stock', 'Suggested_Stock']
+
+
+class SeriesTimeout(Exception):
+    pass
+
+
+# ---------------- Methods ---------------- #
+
+def forecast_prophet(dates, qty, periods=1):
+    """Forecast with Prophet; returns (yhat for last period, model)."""
+    ts = pd.DataFrame({'ds': dates, 'y': qty})
+    model = Prophet(
+        yearly_seasonality=True,
+        weekly_seasonality=False,
+        daily_seasonality=False,
+        seasonality_mode="additive"
+    )
+    model.fit(ts)
+    future = model.make_future_dataframe(periods=periods, freq='M')
+    fc = model.predict(future)
+    return float(fc['yhat'].iloc[-1]), model
+
+
+def forecast_arima(dates, qty, periods=1):
+    """Forecast with auto_arima; returns (forecast value, model)."""
+    model = auto_arima(qty.astype(float), seasonal=True, m=12, suppress_warnings=True, error_action='ignore')
+    fc = model.predict(n_periods=periods)
+    return float(fc[-1]), model
+
+
+def forecast_statistical(qty):
+    """
+    Statistical fallback:
+      - If >=3 months: mean of last 3
+      - Else if >=1 month: last value
+      - Else 0
+    """
+    if len(qty) >= 3:
+        return float(np.mean(qty[-3:])), "3M_Average"
+    elif len(qty) >= 1:
+        return float(qty[-1]), "Last_Value"
+    return 0.0, "Zero_Fallback"
+
+
+def compute_safety_stock(qty, multiplier=SAFETY_MULTIPLIER):
+    """Std dev of last up to 3 months * multiplier (fallback 0)."""
+    last = np.asarray(qty[-3:], dtype=float)
+    if last.shape[0] >= 2:
+        return float(last.std(ddof=0) * multiplier)
+    return 0.0
+
+
+def available_methods():
+    return tuple(name for name, ok in (('Prophet', PROPHET_AVAILABLE), ('ARIMA', ARIMA_AVAILABLE)) if ok)
+
+
+MODEL_METHODS = {'Prophet': forecast_prophet, 'ARIMA': forecast_arima}
+
+
+# ---------------- Model cache ---------------- #
+
+def series_key(dates, qty, periods, methods):
+    """Stable hash of one series and everything that affects its forecast."""
+    h = hashlib.sha1()
+    h.update(np.asarray(dates, dtype='datetime64[ns]').astype(np.int64).tobytes())
+    h.update(np.asarray(qty, dtype=np.float64).tobytes())
+    h.update(repr((periods, methods)).encode())
+    return h.hexdigest()
+
+
+class ModelCache:
+    """One joblib file per series hash: {'forecast', 'method', 'model'}."""
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+
+    def _path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.pkl"
+
+    def get(self, key):
+        if self.cache_dir is None:
+            return None
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            return joblib.load(path)
+        except Exception:
+            return None
+
+    def put(self, key, entry):
+        if self.cache_dir is None:
+            return
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        joblib.dump(entry, tmp, compress=3)
+        os.replace(tmp, path)
+
+
+# ---------------- Per-series cascade ---------------- #
+
+def _alarm(seconds):
+    signal.setitimer(signal.ITIMER_REAL, max(seconds, 0.001) if seconds else 0)
+
+
+def _raise_timeout(signum, frame):
+    raise SeriesTimeout()
+
+
+def forecast_series(description, dates, qty, periods=FORECAST_PERIODS, timeout=SERIES_TIMEOUT,
+                    cache=None, safety_multiplier=SAFETY_MULTIPLIER, interrupt=False):
+    """
+    (forecast row, [timing records]) for one product's monthly quantities (oldest first).
+
+    interrupt=True arms SIGALRM so an overrunning fit raises SeriesTimeout
+    (the caller must have installed _raise_timeout as the SIGALRM handler).
+    """
+    methods = available_methods()
+    timings = []
+    row = {'Description': description, 'History_Months': len(qty)}
+
+    fit_models = bool(methods) and len(qty) >= MIN_MODEL_POINTS
+    key = series_key(dates, qty, periods, methods) if fit_models and cache is not None else None
+    cached = cache.get(key) if key is not None else None
+    if cached is not None:
+        forecast_value, method_used = cached['forecast'], cached['method']
+        timings.append({'Method': method_used, 'Seconds': 0.0, 'Outcome': 'cached'})
+    else:
+        forecast_value, method_used, model = None, None, None
+        deadline = time.perf_counter() + timeout
+        if fit_models:
+            for name in methods:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    timings.append({'Method': name, 'Seconds': 0.0, 'Outcome': 'skipped'})
+                    continue
+                start = time.perf_counter()
+                try:
+                    if interrupt:
+                        _alarm(remaining)
+                    forecast_value, model = MODEL_METHODS[name](dates, qty, periods)
+                    method_used, outcome = name, 'ok'
+                except SeriesTimeout:
+                    outcome = 'timeout'
+                except Exception:
+                    outcome = 'failed'
+                finally:
+                    if interrupt:
+                        _alarm(0)
+                timings.append({'Method': name, 'Seconds': time.perf_counter() - start, 'Outcome': outcome})
+                if method_used is not None:
+                    break
+
+        if forecast_value is None:
+            start = time.perf_counter()
+            forecast_value, method_used = forecast_statistical(qty)
+            timings.append({'Method': method_used, 'Seconds': time.perf_counter() - start, 'Outcome': 'ok'})
+        if key is not None and model is not None:
+            cache.put(key, {'forecast': forecast_value, 'method': method_used, 'model': model})
+
+    # Clean negative forecasts
+    forecast_value = max(0, forecast_value)
+    safety_stock = compute_safety_stock(qty, safety_multiplier)
+    row.update({
+        'Forecast_Quantity': round(forecast_value, 2),
+        'Forecast_Method': method_used,
+        'Safety_Stock': round(safety_stock, 2),
+        'Suggested_Stock': round(forecast_value + safety_stock, 2),
+    })
+    for record in timings:
+        record['Description'] = description
+    return row, timings
+
+
+def _forecast_batch(batch, periods, timeout, cache_dir, safety_multiplier):
+    """Worker entry point: forecast a list of (description, dates, qty) series."""
+    warnings.filterwarnings("ignore")
+    interrupt = hasattr(signal, 'SIGALRM') and threading.current_thread() is threading.main_thread()
+    previous = signal.signal(signal.SIGALRM, _raise_timeout) if interrupt else None
+    cache = ModelCache(cache_dir)
+    rows, timings = [], []
+    try:
+        for description, dates, qty in batch:
+            row, records = forecast_series(description, dates, qty, periods, timeout, cache,
+                                           safety_multiplier, interrupt)
+            rows.append(row)
+            timings.extend(records)
+    finally:
+        if interrupt:
+            signal.signal(signal.SIGALRM, previous)
+    return rows, timings
+
+
+# ---------------- Catalogue ---------------- #
+
+def _series(monthly):
+    """[(description, dates, qty), ...] sorted by month; series with < 2 points are skipped."""
+    monthly = monthly.sort_values(['Description', 'YearMonth'], kind='stable')
+    descriptions = monthly['Description'].to_numpy()
+    dates = monthly['YearMonth'].to_numpy(dtype='datetime64[ns]')
+    qty = monthly['Month_Quantity'].to_numpy(dtype=float)
+    bounds = np.flatnonzero(np.r_[True, descriptions[1:] != descriptions[:-1], True])
+    return [(descriptions[a], dates[a:b], qty[a:b]) for a, b in zip(bounds[:-1], bounds[1:]) if b - a >= 2]
+
+
+def forecast_catalogue(monthly, n_jobs=None, periods=FORECAST_PERIODS, timeout=SERIES_TIMEOUT,
+                       cache_dir=CACHE_DIR, batch_size=BATCH_SIZE, safety_multiplier=SAFETY_MULTIPLIER):
+    """
+    Forecast every product in a monthly series table
+    (YearMonth, Description, Month_Quantity).
+
+    Returns (forecast_df in top10_forecast.csv layout, timing_df with one row per method attempt).
+    n_jobs=1 runs in-process; None uses all cores.
+    """
+    series = _series(monthly)
+    batches = [series[i:i + batch_size] for i in range(0, len(series), batch_size)]
+    args = (periods, timeout, str(cache_dir) if cache_dir else None, safety_multiplier)
+
+    if n_jobs == 1 or len(batches) <= 1:
+        results = [_forecast_batch(batch, *args) for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            futures = [pool.submit(_forecast_batch, batch, *args) for batch in batches]
+            results = [future.result() for future in futures]
+
+    rows = [row for batch_rows, _ in results for row in batch_rows]
+    timings = [record for _, batch_timings in results for record in batch_timings]
+    forecast_df = pd.DataFrame(rows, columns=FORECAST_COLUMNS).sort_values('Forecast_Quantity', ascending=False)
+    timing_df = pd.DataFrame(timings, columns=['Description', 'Method', 'Seconds', 'Outcome'])
+    return forecast_df.reset_index(drop=True), timing_df
+
+
+def method_timings(timing_df):
+    """Attempts, outcomes and fit time per forecasting method."""
+    by_method = timing_df.groupby('Method')['Seconds']
+    stats = by_method.agg(Attempts='size', Total_Seconds='sum', Mean_Seconds='mean')
+    stats['P95_Seconds'] = by_method.quantile(0.95)
+    outcomes = pd.crosstab(timing_df['Method'], timing_df['Outcome'])
+    return stats.join(outcomes).fillna(0).reset_index()
+
+
+# ---------------- Action plan ---------------- #
+
+def action_base_from_monthly(monthly):
+    """top10_action_plan_base.csv layout (peak month, last month, averages) for every product."""
+    monthly = monthly.sort_values(['YearMonth', 'Description'], kind='stable').reset_index(drop=True)
+    peak = monthly.loc[monthly.groupby('Description')['Month_Quantity'].idxmax()]
+    peak_month = peak['YearMonth'].dt.month.to_numpy()
+    promo_month = np.where(peak_month > 1, peak_month - 1, 12)
+    peak_df = pd.DataFrame({
+        'Description': peak['Description'].to_numpy(),
+        'Peak_Month_Number': peak_month,
+        'Peak_Month_Name': np.asarray(calendar.month_name)[peak_month],
+        'Promo_Preparation_Month_Number': promo_month,
+        'Promo_Preparation_Month_Name': np.asarray(calendar.month_name)[promo_month],
+    })
+
+    latest_month = monthly['YearMonth'].max()
+    recent_snapshot = (
+        monthly[monthly['YearMonth'] == latest_month]
+        .rename(columns={'Month_Quantity': 'Last_Month_Quantity',
+                         'Month_Value': 'Last_Month_Value'})
+        [['Description', 'Last_Month_Quantity', 'Last_Month_Value']]
+    )
+    avg_snapshot = (
+        monthly.groupby('Description')
+        .agg(Avg_Monthly_Quantity=('Month_Quantity', 'mean'),
+             Avg_Monthly_Value=('Month_Value', 'mean'),
+             Months_Available=('Month_Quantity', 'count'))
+        .reset_index()
+    )
+    return (peak_df
+            .merge(recent_snapshot, on='Description', how='left')
+            .merge(avg_snapshot, on='Description', how='left'))
+
+
+def build_action_plan(action_base, forecast_df):
+    """top10_forecast_action_plan.csv layout: base plan + forecast, reorder flag and priority rank."""
+    action_plan = action_base.merge(forecast_df, on='Description', how='left')
+
+    # Reorder signal: reorder if Suggested_Stock > Last_Month_Quantity
+    if 'Last_Month_Quantity' in action_plan.columns:
+        action_plan['Reorder_Flag'] = np.where(
+            (action_plan['Suggested_Stock'] > action_plan['Last_Month_Quantity'].fillna(0)),
+            1, 0
+        )
+    else:
+        action_plan['Reorder_Flag'] = 1  # default
+
+    # Rank by Forecast or Value (if available)
+    if 'Avg_Monthly_Value' in action_plan.columns:
+        action_plan['Priority_Rank'] = action_plan['Avg_Monthly_Value'].rank(method='dense', ascending=False)
+    else:
+        action_plan['Priority_Rank'] = action_plan['Forecast_Quantity'].rank(method='dense', ascending=False)
+
+    return action_plan.sort_values('Priority_Rank')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Forecast next-month demand for every product.")
+    parser.add_argument("--monthly", help="monthly series CSV (default: last 12 months from the store)")
+    parser.add_argument("--action-base", help="base action plan CSV (default: derived from the series)")
+    parser.add_argument("--prefix", default="catalogue", help="output file prefix, e.g. top10")
+    parser.add_argument("--jobs", type=int, default=None)
+    parser.add_argument("--timeout", type=float, default=SERIES_TIMEOUT)
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args()
+
+    if args.monthly:
+        monthly = pd.read_csv(args.monthly, parse_dates=['YearMonth'])
+    else:
+        from retail_store import latest_invoice_date
+        from streaming import monthly_product_series
+        monthly = monthly_product_series(start=latest_invoice_date() - pd.DateOffset(months=ROLLING_MONTHS))
+
+    start = time.perf_counter()
+    forecast_df, timing_df = forecast_catalogue(monthly, n_jobs=args.jobs, timeout=args.timeout,
+                                                cache_dir=None if args.no_cache else CACHE_DIR)
+    elapsed = time.perf_counter() - start
+
+    action_base = pd.read_csv(args.action_base) if args.action_base else action_base_from_monthly(monthly)
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    forecast_df.to_csv(OUTPUT_DIR / f"{args.prefix}_forecast.csv", index=False)
+    build_action_plan(action_base, forecast_df).to_csv(
+        OUTPUT_DIR / f"{args.prefix}_forecast_action_plan.csv", index=False)
+    stats = method_timings(timing_df)
+    stats.to_csv(OUTPUT_DIR / f"{args.prefix}_forecast_timing.csv", index=False)
+
+    print(stats.to_string(index=False))
+    print(f"✅ Forecast {len(forecast_df):,} products in {elapsed:.1f}s -> {OUTPUT_DIR}")
@@ -0,0 +1,116 @@
+# group_agg.py
+"""
+Fast Groupwise Aggregations
+---------------------------
+Native replacements for groupby().agg(lambda ...) patterns that call Python
+once per group:
+
+    lambda x: x.value_counts().idxmax()   -> group_mode(keys, values, ties='first')
+    lambda x: x.mode()[0]                 -> group_mode(keys, values, ties='smallest')
+    lambda x: (x > 0).sum()               -> group_count_if(keys, values > 0)
+    lambda x: (x == 0).sum() / len(x)     -> group_ratio_if(keys, values == 0)
+    sort_values(v).groupby(k).head(n)     -> group_top_k(keys, values, n)
+
+Keys and values are integer-encoded with pd.factorize and counted with
+np.bincount (or one np.unique pass when the key x value grid is too large).
+Results are Series indexed by the sorted group keys, like groupby(); rows
+with a missing key are ignored, as groupby() does.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Use a dense (n_keys x n_values) bincount grid up to this many cells
+MAX_DENSE_CELLS = 50_000_000
+
+
+def encode(keys):
+    """(codes, uniques) with uniques sorted; missing keys get code -1."""
+    codes, uniques = pd.factorize(keys, sort=True)
+    return codes, uniques
+
+
+def _index(uniques, keys):
+    return pd.Index(uniques, name=getattr(keys, 'name', None))
+
+
+def group_mode(keys, values, ties='smallest'):
+    """
+    Most frequent value per group.
+
+    ties='smallest' : smallest of the tied values (Series.mode()[0])
+    ties='first'    : tied value seen first within the group (value_counts().idxmax())
+    """
+    key_codes, key_uniques = encode(keys)
+    val_codes, val_uniques = encode(values)
+    valid = (key_codes >= 0) & (val_codes >= 0)
+    n_keys, n_vals = len(key_uniques), len(val_uniques)
+
+    if ties == 'smallest' and n_keys * n_vals <= MAX_DENSE_CELLS:
+        counts = np.bincount(key_codes[valid] * n_vals + val_codes[valid], minlength=n_keys * n_vals)
+        best = counts.reshape(n_keys, n_vals).argmax(axis=1)   # argmax keeps the lowest code on ties
+        return pd.Series(np.asarray(val_uniques)[best], index=_index(key_uniques, keys))
+
+    pairs = key_codes[valid].astype(np.int64) * n_vals + val_codes[valid]
+    uniq, first_pos, counts = np.unique(pairs, return_index=True, return_counts=True)
+    pair_keys, pair_vals = uniq // n_vals, uniq % n_vals
+    tie_order = pair_vals if ties == 'smallest' else first_pos
+    order = np.lexsort((tie_order, -counts, pair_keys))
+    pair_keys, pair_vals = pair_keys[order], pair_vals[order]
+    is_first = np.r_[True, pair_keys[1:] != pair_keys[:-1]]
+
+    result = pd.Series(np.asarray(val_uniques)[pair_vals[is_first]],
+                       index=_index(key_uniques[pair_keys[is_first]], keys))
+    return result.reindex(_index(key_uniques, keys))
+
+
+def group_count_if(keys, mask):
+    """Number of rows per group where mask is True."""
+    key_codes, key_uniques = encode(keys)
+    valid = key_codes >= 0
+    counts = np.bincount(key_codes[valid], weights=np.asarray(mask)[valid], minlength=len(key_uniques))
+    return pd.Series(counts.astype(np.int64), index=_index(key_uniques, keys))
+
+
+def group_ratio_if(keys, mask):
+    """Share of rows per group where mask is True."""
+    key_codes, key_uniques = encode(keys)
+    valid = key_codes >= 0
+    hits = np.bincount(key_codes[valid], weights=np.asarray(mask)[valid], minlength=len(key_uniques))
+    sizes = np.bincount(key_codes[valid], minlength=len(key_uniques))
+    return pd.Series(hits / sizes, index=_index(key_uniques, keys))
+
+
+def _top_k(rows, values, k):
+    """rows of the k largest values, largest first; earlier rows win ties (also at the k-th value)."""
+    if len(rows) > k:
+        kth = values[np.argpartition(-values, k - 1)[k - 1]]
+        above = values > kth
+        ties = np.flatnonzero(values == kth)[:k - int(above.sum())]
+        keep = np.flatnonzero(above)
+        keep = np.concatenate([keep, ties])
+        rows, values = rows[keep], values[keep]
+    order = np.lexsort((rows, -values))
+    return rows[order]
+
+
+def group_top_k(keys, values, k):
+    """
+    Positions of the k largest values per group, groups in sorted key order and
+    largest first within a group (NaN counts as smallest). Rows are grouped by
+    one stable sort of the key codes, then one argpartition per group instead of
+    a full sort of the values; keys=None treats all rows as one group.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    values = np.where(np.isnan(values), -np.inf, values)
+    if keys is None:
+        return _top_k(np.arange(len(values)), values, k)
+    key_codes, key_uniques = encode(keys)
+    # Stable: each group's run keeps its rows in order, so earlier rows still win ties
+    order = np.argsort(key_codes, kind='stable')
+    bounds = np.searchsorted(key_codes[order], np.arange(len(key_uniques) + 1))
+    parts = []
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        rows = order[start:stop]
+        parts.append(_top_k(rows, values[rows], k))
+    return np.concatenate(parts) if parts else np.array([], dtype=np.int64)
@@ -0,0 +1,308 @@
+# instrument.py
+"""
+Stage Instrumentation
+---------------------
+Lightweight timing / row-count / memory hooks for the pipeline scripts and
+Streamlit apps. Off by default; switched on with an environment variable:
+
+    RETAIL_PROFILE=1                       wall + CPU time, rows in/out, DataFrame memory
+    RETAIL_PROFILE=tracemalloc             ... plus Python allocation peak and top allocation sites
+    RETAIL_PROFILE=cprofile                ... plus a cProfile dump and top functions per stage
+    RETAIL_PROFILE=cprofile,tracemalloc    both
+
+    RETAIL_PROFILE_LOG   JSON-lines log file (default ./profile_log.jsonl)
+    RETAIL_PROFILE_DIR   where .prof dumps go (default ./profiles)
+
+Usage:
+
+    from instrument import stage, instrumented
+
+    with stage("load_cltv") as s:
+        cltv = pd.read_csv(CLTV_FILE)
+        s.output(cltv)
+
+    @instrumented("build_features")       # rows in = first DataFrame argument,
+    def build_features(df): ...           # rows out = returned DataFrame
+
+Every finished stage appends one JSON record (run id, script, stage, parent
+stage, timings, rows, memory, ...) to the log. When profiling is off, stage()
+yields a no-op recorder and instrumented() returns the function unchanged.
+
+Summarise the log (diagnostics_gui.py shows the same tables in Streamlit):
+    python instrument.py [profile_log.jsonl]
+"""
+
+import cProfile
+import functools
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+LOG_FILE = Path(os.environ.get("RETAIL_PROFILE_LOG", "profile_log.jsonl"))
+PROFILE_DIR = Path(os.environ.get("RETAIL_PROFILE_DIR", "profiles"))
+TOP_N = 10          # functions / allocation sites kept per stage
+
+_OFF = {'', '0', 'off', 'false', 'no'}
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def _parse_modes(value):
+    """'1' / 'on' -> {'time'}; 'cprofile,tracemalloc' -> {'time', 'cprofile', 'tracemalloc'}; '' / '0' -> off."""
+    value = (value or '').strip().lower()
+    if value in _OFF:
+        return frozenset()
+    extras = {m.strip() for m in value.split(',')} - {'', '1', 'on', 'true', 'time'}
+    return frozenset({'time'} | extras)
+
+
+MODES = _parse_modes(os.environ.get("RETAIL_PROFILE"))
+RUN_ID = os.environ.get("RETAIL_PROFILE_RUN", f"{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}")
+SCRIPT = Path(sys.argv[0]).name if sys.argv and sys.argv[0] else 'interactive'
+
+
+def enabled():
+    return bool(MODES)
+
+
+def enable(modes='time'):
+    """Switch instrumentation on (or off with modes='') for this process."""
+    global MODES
+    MODES = _parse_modes(modes)
+
+
+# ---------------- Measurements ---------------- #
+
+def _size(obj):
+    """(rows, MB) of a DataFrame / Series / Arrow table; (len, None) for other sized objects."""
+    if obj is None:
+        return None, None
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        nbytes = obj.memory_usage(deep=True)
+        nbytes = nbytes.sum() if isinstance(obj, pd.DataFrame) else nbytes
+        return len(obj), round(float(nbytes) / 2**20, 3)
+    nbytes = getattr(obj, 'nbytes', None)
+    rows = getattr(obj, 'num_rows', None)
+    if rows is None and hasattr(obj, '__len__'):
+        rows = len(obj)
+    return rows, round(nbytes / 2**20, 3) if isinstance(nbytes, int) else None
+
+
+def _rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / 2**20 if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+def _top_functions(profiler):
+    stats = pstats.Stats(profiler)
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_N]
+    return [{'function': f"{Path(file).name}:{line}({func})", 'calls': nc, 'cum_s': round(ct, 4)}
+            for (file, line, func), (cc, nc, tt, ct, callers) in rows]
+
+
+def _top_allocations(snapshot):
+    return [{'site': str(stat.traceback[0]), 'mb': round(stat.size / 2**20, 3), 'blocks': stat.count}
+            for stat in snapshot.statistics('lineno')[:TOP_N]]
+
+
+class StageRecord:
+    """Collects one stage's measurements; output()/input() attach the frames it consumed / produced."""
+
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.parent = parent
+        self.data = {}
+        self.py_peak = 0
+        self.profiled = False
+
+    def input(self, obj):
+        self.data['rows_in'], self.data['mem_in_mb'] = _size(obj)
+        return obj
+
+    def output(self, obj):
+        self.data['rows_out'], self.data['mem_out_mb'] = _size(obj)
+        return obj
+
+    def note(self, **fields):
+        """Extra JSON-serialisable fields for this stage's record."""
+        self.data.update(fields)
+
+
+class _NullRecord:
+    def input(self, obj):
+        return obj
+
+    def output(self, obj):
+        return obj
+
+    def note(self, **fields):
+        pass
+
+
+_NULL = _NullRecord()
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+def write_record(record, log_file=None):
+    line = json.dumps(record, default=str)
+    path = Path(log_file or LOG_FILE)
+    with _lock:
+        if path.parent != Path('.'):
+            path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'a') as log:
+            log.write(line + "\n")
+
+
+# ---------------- Hooks ---------------- #
+
+@contextmanager
+def stage(name, inputs=None, **fields):
+    """Time the enclosed block as stage `name` and append its record to the log."""
+    if not MODES:
+        yield _NULL
+        return
+
+    stack = _stack()
+    parent = stack[-1] if stack else None
+    rec = StageRecord(name, parent.name if parent else None)
+    rec.note(**fields)
+    if inputs is not None:
+        rec.input(inputs)
+
+    trace = 'tracemalloc' in MODES
+    if trace:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if parent is not None:
+            # Keep the enclosing stage's peak before resetting it for this one
+            parent.py_peak = max(parent.py_peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+    # cProfile allows one active profiler, so only the outermost profiled stage gets one
+    profiler = None
+    if 'cprofile' in MODES and not any(s.profiled for s in stack):
+        profiler = cProfile.Profile()
+        rec.profiled = True
+
+    stack.append(rec)
+    error = None
+    wall, cpu = time.perf_counter(), time.process_time()
+    if profiler:
+        profiler.enable()
+    try:
+        yield rec
+    except BaseException as exc:
+        error = type(exc).__name__
+        raise
+    finally:
+        if profiler:
+            profiler.disable()
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        stack.pop()
+
+        record = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S'), 'run_id': RUN_ID, 'script': SCRIPT,
+            'stage': name, 'parent': rec.parent, 'wall_s': round(wall, 4), 'cpu_s': round(cpu, 4),
+            'rows_in': None, 'rows_out': None, 'mem_in_mb': None, 'mem_out_mb': None,
+            'rss_peak_mb': _rss_mb(), 'error': error,
+        }
+        record.update(rec.data)
+        if trace:
+            rec.py_peak = max(rec.py_peak, tracemalloc.get_traced_memory()[1])
+            record['py_peak_mb'] = round(rec.py_peak / 2**20, 3)
+            record['top_allocations'] = _top_allocations(tracemalloc.take_snapshot())
+            if parent is not None:
+                parent.py_peak = max(parent.py_peak, rec.py_peak)
+        if profiler:
+            PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+            prof_file = PROFILE_DIR / f"{RUN_ID}_{SCRIPT}_{name}.prof".replace(' ', '_')
+            profiler.dump_stats(prof_file)
+            record['profile_file'] = str(prof_file)
+            record['top_functions'] = _top_functions(profiler)
+        write_record(record)
+
+
+def instrumented(name=None):
+    """Decorator form of stage(): rows in from the first DataFrame argument, rows out from the result."""
+    def decorate(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not MODES:
+                return func(*args, **kwargs)
+            first = next((a for a in (*args, *kwargs.values()) if isinstance(a, pd.DataFrame)), None)
+            with stage(stage_name, inputs=first) as rec:
+                result = func(*args, **kwargs)
+                if isinstance(result, (pd.DataFrame, pd.Series)):
+                    rec.output(result)
+                return result
+        return wrapper
+    return decorate
+
+
+# ---------------- Reading the log ---------------- #
+
+def load_log(log_file=None):
+    """Profile log as a DataFrame (empty if there is none yet)."""
+    path = Path(log_file or LOG_FILE)
+    if not path.exists():
+        return pd.DataFrame()
+    with open(path) as log:
+        records = [json.loads(line) for line in log if line.strip()]
+    return pd.DataFrame.from_records(records)
+
+
+def run_summary(log, run_id=None):
+    """Stages of one run (default: the latest) in execution order with their share of the run's time."""
+    if log.empty:
+        return log
+    run_id = run_id or log['run_id'].iloc[-1]
+    run = log[log['run_id'] == run_id].copy()
+    top_level = run['parent'].isna()
+    run['share_pct'] = (100 * run['wall_s'] / run.loc[top_level, 'wall_s'].sum()).round(1)
+    columns = ['script', 'stage', 'parent', 'wall_s', 'cpu_s', 'share_pct', 'rows_in', 'rows_out',
+               'mem_in_mb', 'mem_out_mb', 'py_peak_mb', 'rss_peak_mb', 'error']
+    return run[[c for c in columns if c in run.columns]].reset_index(drop=True)
+
+
+def stage_summary(log):
+    """Per (script, stage) statistics across all logged runs."""
+    if log.empty:
+        return log
+    return (
+        log.groupby(['script', 'stage'], sort=False)
+        .agg(Runs=('wall_s', 'size'), Mean_Wall_s=('wall_s', 'mean'), Max_Wall_s=('wall_s', 'max'),
+             Last_Wall_s=('wall_s', 'last'), Last_Rows_In=('rows_in', 'last'), Last_Rows_Out=('rows_out', 'last'),
+             Max_Mem_Out_MB=('mem_out_mb', 'max'), Max_RSS_MB=('rss_peak_mb', 'max'))
+        .round(4)
+        .reset_index()
+    )
+
+
+if __name__ == "__main__":
+    log = load_log(sys.argv[1] if len(sys.argv) > 1 else None)
+    if log.empty:
+        print("No profile records yet (run a script with RETAIL_PROFILE=1)")
+        sys.exit(0)
+    with pd.option_context('display.width', 200, 'display.max_columns', 20):
+        print(f"Latest run ({log['run_id'].iloc[-1]}):")
+        print(run_summary(log).to_string(index=False))
+        print("\nAll runs:")
+        print(stage_summary(log).to_string(index=False))
@@ -0,0 +1,166 @@
+# item_similarity.py
+"""
+Sparse Item-Item Similarity Index
+---------------------------------
+Replaces the dense customer x Description pivot_table + cosine_similarity(pivot.T)
+used by recommendation_system.ipynb and the testingfinal GUI.
+
+  1. Build a scipy.sparse CSR customer x item matrix of summed TotalPrice
+     (same values as the pivot, but only non-zero cells are stored).
+  2. L2-normalise each item column and compute cosine similarities block by
+     block (sparse dot products), keeping only the top-K neighbours per item.
+     Blocks can be spread over several processes with n_jobs.
+  3. Save item labels, neighbour codes/scores and each customer's last item
+     to a single .npz file.
+
+Recommending for a customer is then two array lookups plus K labels,
+and memory grows with the number of non-zero interactions instead of items².
+
+Build the index:
+    python item_similarity.py
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+INDEX_FILE = Path("./outputs_recommendations/item_similarity_index.npz")
+TOP_K = 20
+BLOCK_SIZE = 2048
+
+
+# ---------------- Build ---------------- #
+
+def build_interaction_matrix(df, user_col='Customer ID', item_col='Description', value_col='TotalPrice'):
+    """CSR users x items matrix of summed values (the sparse equivalent of pivot_table(aggfunc='sum'))."""
+    user_codes, users = pd.factorize(df[user_col], sort=True)
+    item_codes, items = pd.factorize(df[item_col], sort=True)
+    matrix = sparse.coo_matrix(
+        (df[value_col].to_numpy(dtype=np.float64), (user_codes, item_codes)),
+        shape=(len(users), len(items))
+    ).tocsr()  # duplicate (user, item) entries are summed here
+    matrix.eliminate_zeros()
+    return matrix, np.asarray(users), np.asarray(items)
+
+
+def _normalised_item_rows(matrix):
+    """Items x users CSR with unit-length rows (zero rows stay zero, as in cosine_similarity)."""
+    items = matrix.T.tocsr()
+    norms = np.sqrt(np.asarray(items.multiply(items).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms).dot(items).tocsr()
+
+
+def _top_k_block(items, start, stop, k):
+    """Top-k neighbours (excluding the item itself) for item rows [start, stop)."""
+    sims = items[start:stop].dot(items.T).tocoo()
+    keep = (sims.row + start != sims.col) & (sims.data > 0)
+    row, col, data = sims.row[keep], sims.col[keep], sims.data[keep]
+
+    # Sort by row, then by descending similarity (ties broken by item code)
+    order = np.lexsort((col, -data, row))
+    row, col, data = row[order], col[order], data[order]
+    row_start = np.searchsorted(row, np.arange(stop - start))
+    rank = np.arange(len(row)) - row_start[row]
+    top = rank < k
+
+    neighbours = np.full((stop - start, k), -1, dtype=np.int32)
+    scores = np.zeros((stop - start, k), dtype=np.float32)
+    neighbours[row[top], rank[top]] = col[top]
+    scores[row[top], rank[top]] = data[top]
+    return neighbours, scores
+
+
+def top_k_neighbours(matrix, k=TOP_K, block_size=BLOCK_SIZE, n_jobs=1):
+    """Top-k cosine neighbours for every item column of a users x items matrix."""
+    items = _normalised_item_rows(matrix)
+    n_items = items.shape[0]
+    blocks = [(start, min(start + block_size, n_items)) for start in range(0, n_items, block_size)]
+
+    if n_jobs == 1:
+        parts = [_top_k_block(items, start, stop, k) for start, stop in blocks]
+    else:
+        from joblib import Parallel, delayed
+        parts = Parallel(n_jobs=n_jobs)(delayed(_top_k_block)(items, start, stop, k) for start, stop in blocks)
+
+    if not parts:
+        return np.empty((0, k), dtype=np.int32), np.empty((0, k), dtype=np.float32)
+    return np.vstack([p[0] for p in parts]), np.vstack([p[1] for p in parts])
+
+
+def last_item_per_customer(df, items, user_col='Customer ID', item_col='Description'):
+    """Sorted customer ids and the item code of each customer's most recent purchase."""
+    last = (
+        df.sort_values('InvoiceDate', kind='stable')
+          .drop_duplicates(subset=[user_col], keep='last')
+          .sort_values(user_col)
+    )
+    codes = pd.Index(items).get_indexer(last[item_col])
+    return last[user_col].to_numpy(), codes.astype(np.int32)
+
+
+# ---------------- Index ---------------- #
+
+class ItemSimilarityIndex:
+    """Top-K neighbour lists per item plus each customer's last purchased item."""
+
+    def __init__(self, items, neighbours, scores, customers, last_items):
+        self.items = np.asarray(items)
+        self.neighbours = neighbours
+        self.scores = scores
+        self.customers = np.asarray(customers)
+        self.last_items = last_items
+        self._item_codes = {item: code for code, item in enumerate(self.items)}
+
+    @classmethod
+    def build(cls, df, k=TOP_K, block_size=BLOCK_SIZE, n_jobs=1):
+        """df needs Customer ID, Description, InvoiceDate and TotalPrice columns."""
+        matrix, _, items = build_interaction_matrix(df)
+        neighbours, scores = top_k_neighbours(matrix, k=k, block_size=block_size, n_jobs=n_jobs)
+        customers, last_items = last_item_per_customer(df, items)
+        return cls(items, neighbours, scores, customers, last_items)
+
+    def save(self, path=INDEX_FILE):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(path, items=self.items.astype(str), neighbours=self.neighbours, scores=self.scores,
+                 customers=self.customers, last_items=self.last_items)
+        return path
+
+    @classmethod
+    def load(cls, path=INDEX_FILE):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['items'], data['neighbours'], data['scores'],
+                       data['customers'], data['last_items'])
+
+    def __contains__(self, item):
+        return item in self._item_codes
+
+    def similar_items(self, item, top_n=5):
+        """[(item, score), ...] for the top_n most similar items (at most K)."""
+        code = self._item_codes.get(item)
+        if code is None:
+            return []
+        found = self.neighbours[code, :top_n]
+        valid = found >= 0
+        return list(zip(self.items[found[valid]].tolist(), self.scores[code, :top_n][valid].tolist()))
+
+    def last_item(self, customer_id):
+        """Most recently purchased item for a customer, or None if unknown."""
+        pos = np.searchsorted(self.customers, customer_id)
+        if pos >= len(self.customers) or self.customers[pos] != customer_id:
+            return None
+        code = self.last_items[pos]
+        return self.items[code] if code >= 0 else None
+
+
+if __name__ == "__main__":
+    from retail_store import load_transactions
+
+    df = load_transactions(columns=['Customer ID', 'Description', 'Quantity', 'Price', 'InvoiceDate'],
+                           require_customer=True)
+    df['TotalPrice'] = df['Quantity'] * df['Price']
+    index = ItemSimilarityIndex.build(df, n_jobs=-1)
+    print(f"✅ Saved {len(index.items):,} items x top-{index.neighbours.shape[1]} neighbours: {index.save()}")
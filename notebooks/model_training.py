@@ -0,0 +1,313 @@
+# model_training.py
+"""
+Model Training with Parallel Hyperparameter Search
+--------------------------------------------------
+train_promotion_model.py and churn_prediction.ipynb each fit one fixed model.
+This module trains either task by cross-validated search over model families
+and hyperparameters:
+
+  - the dataset is encoded once (OrdinalEncoder on the categorical columns,
+    float32 feature matrix, which is what the tree learners use internally)
+    and the holdout split and stratified CV folds are drawn once; both are
+    cached under TRAIN_CACHE_DIR keyed by a hash of the training columns'
+    contents and the split settings, so re-running on unchanged data skips
+    straight to the search,
+  - every (candidate, fold) fit runs as one joblib task across --jobs cores
+    (each fit single-threaded, so the pool is not oversubscribed),
+  - random forests are warm-started: per fold one forest grows through
+    FOREST_SIZES and is scored at each size instead of refitting from scratch,
+  - on large tables the search runs on a stratified sample of at most
+    SEARCH_ROWS training rows; the winner is refit on the full training split
+    with all cores and scored on the holdout.
+
+The result is saved in the existing {'model', 'encoder', 'features'} joblib
+format (plus version / family / params / metrics keys) as
+models/versions/<model>_<version>.pkl and copied to models/<model>.pkl, which
+scoring.BatchScorer loads. Metrics (search, refit and inference timings,
+holdout score) are appended to models/training_log.jsonl.
+
+    python model_training.py promotion --jobs 8
+    python model_training.py churn --data cltv_dataset.csv --families random_forest
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.metrics import classification_report, get_scorer
+from sklearn.model_selection import ParameterGrid, StratifiedKFold, train_test_split
+from sklearn.preprocessing import OrdinalEncoder
+from sklearn.tree import DecisionTreeClassifier
+
+from instrument import stage
+from schema import read_table
+from scoring import MODEL_DIR
+
+VERSION_DIR = "versions"
+TRAINING_LOG = "training_log.jsonl"
+TRAIN_CACHE_DIR = Path(os.environ.get("RETAIL_TRAIN_CACHE", "./.train_cache"))
+
+N_SPLITS = 5
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+SEARCH_ROWS = 200_000
+LATENCY_ROWS = 200          # single-row predictions timed for the p50 / p99 latency
+
+
+@dataclass
+class Task:
+    name: str
+    data_file: str
+    table: str                      # schema.TABLES contract of data_file
+    features: list
+    label: str
+    model_file: str
+    scoring: str
+    categorical: list = field(default_factory=list)
+
+    def labels(self, df):
+        if self.label == 'Churn' and 'Churn' not in df.columns:
+            # Same definition as churn_prediction.ipynb
+            return (df['Recency'] > 90).astype('int8')
+        return df[self.label]
+
+
+TASKS = {
+    'promotion': Task('promotion', 'promotion_dataset.csv', 'promotion_dataset',
+                      ['CLTV', 'Frequency', 'Recency', 'Churn_Prob', 'Value_Tier', 'At_Risk'],
+                      'Promotion_Class', 'promotion_model.pkl', 'f1_macro', categorical=['Value_Tier']),
+    'churn': Task('churn', 'cltv_dataset.csv', 'cltv_dataset',
+                  ['Frequency', 'Recency', 'Monetary', 'AOV', 'PF', 'CLTV'],
+                  'Churn', 'churn_model.pkl', 'roc_auc'),
+}
+
+# The current production settings are part of each grid, so the search can only match or beat them
+SEARCH_SPACES = {
+    'decision_tree': {'max_depth': [3, 5, 8, None], 'min_samples_leaf': [5, 20, 50]},
+    'random_forest': {'max_depth': [8, 16, None], 'min_samples_leaf': [1, 5, 20]},
+    'hist_gradient_boosting': {'learning_rate': [0.05, 0.1], 'max_leaf_nodes': [15, 31]},
+}
+FOREST_SIZES = [50, 100, 200]     # warm-start steps; n_estimators is searched along these
+
+
+def make_model(family, params, n_jobs=1):
+    if family == 'decision_tree':
+        return DecisionTreeClassifier(random_state=RANDOM_STATE, **params)
+    if family == 'random_forest':
+        return RandomForestClassifier(random_state=RANDOM_STATE, n_jobs=n_jobs, **params)
+    if family == 'hist_gradient_boosting':
+        return HistGradientBoostingClassifier(random_state=RANDOM_STATE, **params)
+    raise ValueError(f"Unknown model family: {family}")
+
+
+# ---------------- Encoded data + folds (cached) ---------------- #
+
+def _data_key(df, task, n_splits, search_rows):
+    h = hashlib.sha256()
+    cols = task.features + ([task.label] if task.label in df.columns else ['Recency'])
+    h.update(pd.util.hash_pandas_object(df[list(dict.fromkeys(cols))], index=False).to_numpy().tobytes())
+    h.update(json.dumps([task.name, task.features, task.categorical, n_splits, search_rows,
+                         TEST_SIZE, RANDOM_STATE]).encode())
+    return h.hexdigest()
+
+
+def prepare(df, task, n_splits=N_SPLITS, search_rows=SEARCH_ROWS, cache_dir=TRAIN_CACHE_DIR):
+    """Encoded float32 X, labels, fitted encoder, holdout split and CV folds; cached by content hash."""
+    key = _data_key(df, task, n_splits, search_rows)
+    path = Path(cache_dir) / f"{task.name}_{key[:16]}.joblib" if cache_dir else None
+    if path is not None and path.exists():
+        prepared = joblib.load(path, mmap_mode='r')
+        prepared['cached'] = True
+        return prepared
+
+    X = df[task.features].copy()
+    y = task.labels(df).to_numpy()
+    keep = ~pd.isna(y)
+    X, y = X[keep], y[keep]
+
+    encoder = None
+    if task.categorical:
+        encoder = OrdinalEncoder()
+        X[task.categorical] = encoder.fit_transform(X[task.categorical])
+    X = X.to_numpy(dtype=np.float32)
+
+    rows = np.arange(len(y))
+    train_idx, test_idx = train_test_split(rows, stratify=y, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+    search_idx = train_idx
+    if search_rows and len(train_idx) > search_rows:
+        search_idx, _ = train_test_split(train_idx, stratify=y[train_idx], train_size=search_rows,
+                                         random_state=RANDOM_STATE)
+    skf = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=RANDOM_STATE)
+    folds = [(search_idx[a], search_idx[b]) for a, b in skf.split(search_idx, y[search_idx])]
+
+    prepared = {'key': key, 'X': X, 'y': y, 'encoder': encoder, 'train_idx': train_idx,
+                'test_idx': test_idx, 'folds': folds}
+    if path is not None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump(prepared, path)
+    prepared['cached'] = False
+    return prepared
+
+
+# ---------------- Search ---------------- #
+
+def candidates(families):
+    return [(family, params) for family in families for params in ParameterGrid(SEARCH_SPACES[family])]
+
+
+def _fit_fold(family, params, X, y, train, test, scoring):
+    """[(params, score, fit_s)] for one candidate on one fold; forests at every FOREST_SIZES step."""
+    scorer = get_scorer(scoring)
+    results = []
+    start = time.perf_counter()
+    if family == 'random_forest':
+        model = make_model(family, dict(params, n_estimators=FOREST_SIZES[0]), n_jobs=1)
+        model.set_params(warm_start=True)
+        for size in FOREST_SIZES:
+            model.set_params(n_estimators=size)
+            model.fit(X[train], y[train])
+            results.append((dict(params, n_estimators=size), scorer(model, X[test], y[test]),
+                            time.perf_counter() - start))
+    else:
+        model = make_model(family, params).fit(X[train], y[train])
+        results.append((dict(params), scorer(model, X[test], y[test]), time.perf_counter() - start))
+    return family, results
+
+
+def search(prepared, task, families=tuple(SEARCH_SPACES), n_jobs=-1):
+    """CV score of every candidate, best first (mean score, then mean fit time)."""
+    X, y = prepared['X'], prepared['y']
+    jobs = [delayed(_fit_fold)(family, params, X, y, train, test, task.scoring)
+            for family, params in candidates(families) for train, test in prepared['folds']]
+    scores = {}
+    for family, results in Parallel(n_jobs=n_jobs)(jobs):
+        for params, score, fit_s in results:
+            key = (family, json.dumps(params, sort_keys=True))
+            scores.setdefault(key, []).append((score, fit_s))
+    table = pd.DataFrame([
+        {'family': family, 'params': params, 'cv_score': np.mean([s for s, _ in runs]),
+         'cv_std': np.std([s for s, _ in runs]), 'fit_s': np.mean([t for _, t in runs])}
+        for (family, params), runs in scores.items()
+    ])
+    return table.sort_values(['cv_score', 'fit_s'], ascending=[False, True]).reset_index(drop=True)
+
+
+# ---------------- Refit, evaluate, save ---------------- #
+
+def inference_latency(model, X, rows=LATENCY_ROWS):
+    """Batch throughput and single-row latency percentiles of model.predict."""
+    start = time.perf_counter()
+    model.predict(X)
+    batch_s = time.perf_counter() - start
+    single = []
+    for i in range(min(rows, len(X))):
+        start = time.perf_counter()
+        model.predict(X[i:i + 1])
+        single.append(time.perf_counter() - start)
+    return {'batch_rows_per_s': round(len(X) / batch_s) if batch_s else None,
+            'single_p50_ms': round(float(np.percentile(single, 50)) * 1000, 3),
+            'single_p99_ms': round(float(np.percentile(single, 99)) * 1000, 3)}
+
+
+def save_bundle(bundle, task, model_dir=MODEL_DIR):
+    """models/versions/<model>_<version>.pkl, copied to models/<model>.pkl; metrics appended to the log."""
+    model_dir = Path(model_dir)
+    version_path = model_dir / VERSION_DIR / f"{Path(task.model_file).stem}_{bundle['version']}.pkl"
+    version_path.parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump(bundle, version_path)
+    shutil.copyfile(version_path, model_dir / task.model_file)
+    with open(model_dir / TRAINING_LOG, 'a', encoding='utf-8') as fh:
+        fh.write(json.dumps({'task': task.name, 'version': bundle['version'], 'family': bundle['family'],
+                             'params': bundle['params'], 'file': str(version_path), **bundle['metrics']}) + '\n')
+    return version_path
+
+
+def train(task, df=None, families=tuple(SEARCH_SPACES), n_jobs=-1, n_splits=N_SPLITS,
+          search_rows=SEARCH_ROWS, cache_dir=TRAIN_CACHE_DIR, model_dir=MODEL_DIR):
+    """Search, refit the best candidate on the training split, evaluate on the holdout and save."""
+    if isinstance(task, str):
+        task = TASKS[task]
+    total_start = time.perf_counter()
+
+    with stage("load_dataset") as s:
+        if df is None:
+            df = read_table(task.data_file, task.table)
+        s.output(df)
+
+    with stage("prepare", inputs=df) as s:
+        start = time.perf_counter()
+        prepared = prepare(df, task, n_splits, search_rows, cache_dir)
+        prepare_s = time.perf_counter() - start
+        s.note(cached=prepared['cached'])
+    X, y = prepared['X'], prepared['y']
+    train_idx, test_idx = prepared['train_idx'], prepared['test_idx']
+
+    with stage("search", inputs=df):
+        start = time.perf_counter()
+        results = search(prepared, task, families, n_jobs)
+        search_s = time.perf_counter() - start
+    best = results.iloc[0]
+    params = json.loads(best['params'])
+
+    with stage("fit", inputs=df):
+        start = time.perf_counter()
+        model = make_model(best['family'], params, n_jobs=n_jobs).fit(X[train_idx], y[train_idx])
+        fit_s = time.perf_counter() - start
+    if hasattr(model, 'n_jobs'):
+        model.set_params(n_jobs=None)     # scoring decides its own parallelism
+
+    with stage("evaluate"):
+        holdout = get_scorer(task.scoring)(model, X[test_idx], y[test_idx])
+        report = classification_report(y[test_idx], model.predict(X[test_idx]))
+        latency = inference_latency(model, X[test_idx])
+
+    metrics = {
+        'rows': int(len(y)), 'search_rows': int(sum(len(test) for _, test in prepared['folds'])),
+        'candidates': int(len(results)), 'folds': len(prepared['folds']), 'cache_hit': prepared['cached'],
+        'scoring': task.scoring, 'cv_score': round(float(best['cv_score']), 4),
+        'holdout_score': round(float(holdout), 4),
+        'prepare_s': round(prepare_s, 3), 'search_s': round(search_s, 3), 'fit_s': round(fit_s, 3),
+        'total_s': round(time.perf_counter() - total_start, 3), **latency,
+    }
+    version = f"{time.strftime('%Y%m%d_%H%M%S')}_{prepared['key'][:8]}"
+    bundle = {'model': model, 'encoder': prepared['encoder'], 'features': list(task.features),
+              'version': version, 'family': best['family'], 'params': params, 'metrics': metrics}
+    with stage("save_model"):
+        path = save_bundle(bundle, task, model_dir)
+    return bundle, results, report, path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cross-validated model search and training.")
+    parser.add_argument("task", choices=list(TASKS))
+    parser.add_argument("--data", help="training table (default: the task's dataset csv)")
+    parser.add_argument("--families", nargs="+", choices=list(SEARCH_SPACES), default=list(SEARCH_SPACES))
+    parser.add_argument("--jobs", type=int, default=-1)
+    parser.add_argument("--folds", type=int, default=N_SPLITS)
+    parser.add_argument("--search-rows", type=int, default=SEARCH_ROWS)
+    parser.add_argument("--model-dir", default=str(MODEL_DIR))
+    parser.add_argument("--no-cache", action="store_true", help="re-encode and re-split even if cached")
+    args = parser.parse_args()
+
+    task = TASKS[args.task]
+    df = read_table(args.data, task.table) if args.data else None
+    bundle, results, report, path = train(task, df, args.families, args.jobs, args.folds, args.search_rows,
+                                          None if args.no_cache else TRAIN_CACHE_DIR, args.model_dir)
+    print(results.head(10).to_string(index=False))
+    print(report)
+    m = bundle['metrics']
+    print(f"✅ {bundle['family']} {bundle['params']}  cv {m['cv_score']}  holdout {m['holdout_score']} "
+          f"({task.scoring})")
+    print(f"   search {m['search_s']}s over {m['candidates']} candidates, refit {m['fit_s']}s, "
+          f"predict {m['batch_rows_per_s']:,} rows/s, single-row p50 {m['single_p50_ms']}ms")
+    print(f"   Saved: {path} -> {Path(args.model_dir) / task.model_file}")
@@ -0,0 +1,364 @@
+# pipeline.py
+"""
+Pipeline Runner
+---------------
+The scripts and notebooks hand off through files (cltv_dataset.csv ->
+cltv_with_churn_risk.csv -> promotion_dataset.csv -> promotion_model.pkl,
+top10_products_monthly.csv -> top10_forecast_action_plan.csv, ...). This
+runner declares every stage with its input and output files and:
+
+  - derives the DAG from the files (a stage depends on whichever stage
+    writes one of its inputs),
+  - fingerprints each stage as a hash of its input file contents, its code
+    (notebook cell sources / script text, plus every local module it imports,
+    directly or through other local modules) and its command,
+  - skips a stage when the fingerprint matches the last successful run and its
+    outputs are still the files that run wrote; a stage that reruns but writes
+    identical outputs does not invalidate anything downstream,
+  - runs independent branches (customer, top items, low sellers, festival)
+    in parallel,
+  - records wall time and peak memory (max RSS of the stage's processes,
+    including the nbconvert kernel) per stage in the state file and appends
+    every run to a JSON-lines log.
+
+Paths are relative to this folder (notebooks/), which is also the working
+directory every stage runs in. Notebooks are executed with nbconvert into
+.pipeline_runs/ so the source notebooks are left untouched.
+
+    python pipeline.py                    # run what changed
+    python pipeline.py --dry-run          # show what would run
+    python pipeline.py --only promotion_model --jobs 4
+    python pipeline.py --force            # rerun everything
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from app_artifacts import APP_TABLES, ARTIFACT_DIR, BUILD_FILE
+from retail_store import MANIFEST, QUARANTINE_FILE, RAW_FILE, STORE_DIR
+from scoring import CHURN_MODEL, CLTV_MODEL, MODEL_DIR, PROMOTION_MODEL
+
+BASE_DIR = Path(__file__).resolve().parent
+STATE_FILE = BASE_DIR / ".pipeline_state.json"
+LOG_FILE = BASE_DIR / "pipeline_log.jsonl"
+RUN_DIR = BASE_DIR / ".pipeline_runs"
+
+STORE_MANIFEST = str(Path(STORE_DIR) / MANIFEST)
+# Models live in the repo-level models/ folder (scoring.MODEL_DIR), not under notebooks/
+CLTV_FILE = str(MODEL_DIR / CLTV_MODEL)
+CHURN_FILE = str(MODEL_DIR / CHURN_MODEL)
+PROMOTION_FILE = str(MODEL_DIR / PROMOTION_MODEL)
+
+
+@dataclass
+class Stage:
+    name: str
+    code: str                       # script or notebook, relative to BASE_DIR
+    inputs: list = field(default_factory=list)
+    outputs: list = field(default_factory=list)
+    args: list = field(default_factory=list)
+
+    def command(self):
+        if self.code.endswith('.ipynb'):
+            return [sys.executable, '-m', 'jupyter', 'nbconvert', '--to', 'notebook', '--execute',
+                    '--output-dir', str(RUN_DIR), '--output', Path(self.code).stem, self.code]
+        return [sys.executable, self.code, *self.args]
+
+
+# ---------------- Stages ---------------- #
+
+STAGES = [
+    # Shared transaction store
+    Stage('store', 'retail_store.py', inputs=[str(RAW_FILE)],
+          outputs=[STORE_MANIFEST, str(Path(STORE_DIR) / QUARANTINE_FILE)]),
+
+    # Customer branch
+    Stage('cltv', 'feature_store.py', inputs=[STORE_MANIFEST, CLTV_FILE],
+          outputs=['cltv_dataset.csv', 'cltv_with_predictions.csv']),
+    # Scoring, top-K and every retention list in one chunked pass (revenue_risk_model.ipynb logic)
+    Stage('churn_risk', 'retention_targeting.py', inputs=['cltv_dataset.csv', CHURN_FILE],
+          outputs=['cltv_with_churn_risk.csv', 'high_risk_customers.csv', 'high_risk_by_segment.csv',
+                   'retention_targets.csv', 'vip_followups.csv', 'urgent_time_campaign.csv',
+                   'monitor_dropoff_customers.csv']),
+    Stage('promotion_dataset', 'build_promotion_dataset.py',
+          inputs=['cltv_with_predictions.csv', 'cltv_with_churn_risk.csv', STORE_MANIFEST],
+          outputs=['promotion_dataset.csv']),
+    Stage('promotion_model', 'train_promotion_model.py', inputs=['promotion_dataset.csv'],
+          outputs=[PROMOTION_FILE]),
+    Stage('messaging_schedule', 'messaging_schedule.ipynb', inputs=['cltv_with_churn_risk.csv', STORE_MANIFEST],
+          outputs=['messaging_schedule.csv']),
+    Stage('hourly_triggers', 'promotion_trigger_analysis.ipynb',
+          inputs=['cltv_with_predictions.csv', STORE_MANIFEST], outputs=['promotion_hourly_triggers.csv']),
+    Stage('trigger_cube', 'trigger_cube.py', inputs=['cltv_with_predictions.csv', STORE_MANIFEST],
+          outputs=['trigger_cube.npz']),
+    Stage('rfm_segments', 'segmentation.py', inputs=[STORE_MANIFEST], outputs=['rfm_segments.csv'], args=['rfm']),
+    Stage('behavior_segments', 'segmentation.py', inputs=[STORE_MANIFEST], outputs=['behavioral_segments.csv'],
+          args=['behavior']),
+
+    # Top items branch
+    Stage('top_items', 'top_items_analysis.ipynb', inputs=[STORE_MANIFEST],
+          outputs=['outputs_top_items/top10_products_monthly.csv', 'outputs_top_items/top10_action_plan_base.csv']),
+    Stage('top_items_forecast', 'top_items_forecast.ipynb',
+          inputs=['outputs_top_items/top10_products_monthly.csv', 'outputs_top_items/top10_action_plan_base.csv'],
+          outputs=['outputs_top_items_forecast/top10_forecast.csv',
+                   'outputs_top_items_forecast/top10_forecast_action_plan.csv']),
+
+    # Low sellers branch
+    Stage('low_sellers', 'low_sellers_analysis.ipynb', inputs=[STORE_MANIFEST],
+          outputs=['outputs_low_sellers/bottom10_products.csv', 'outputs_low_sellers/bottom10_products_monthly.csv',
+                   'outputs_low_sellers/bottom10_features.csv']),
+    Stage('clearance', 'clearance_discount_model.ipynb', inputs=['outputs_low_sellers/bottom10_features.csv'],
+          outputs=['outputs_low_sellers/clearance_recommendations.csv']),
+
+    # Festival branch
+    Stage('festival', 'festival_product_insight.py', inputs=[STORE_MANIFEST, 'festival_calendar.json'],
+          outputs=['seasonal_index.npz', 'festival_top_products.csv']),
+
+    # Streamlit app artifacts (precomputed tables + model predictions, so the apps start without building them)
+    Stage('app_artifacts', 'app_artifacts.py',
+          inputs=[str(source) for source, _, _ in APP_TABLES.values()] + [PROMOTION_FILE],
+          outputs=[str(ARTIFACT_DIR / BUILD_FILE)]),
+]
+
+
+def upstream(stages):
+    """stage name -> set of stage names producing its inputs."""
+    producers = {out: s.name for s in stages for out in s.outputs}
+    return {s.name: {producers[i] for i in s.inputs if i in producers and producers[i] != s.name}
+            for s in stages}
+
+
+def with_upstream(stages, names):
+    """The named stages plus everything they depend on."""
+    deps = upstream(stages)
+    wanted, todo = set(), list(names)
+    while todo:
+        name = todo.pop()
+        if name not in wanted:
+            wanted.add(name)
+            todo.extend(deps[name])
+    return [s for s in stages if s.name in wanted]
+
+
+# ---------------- Fingerprints ---------------- #
+
+class FileHasher:
+    """Content hashes, memoised by (size, mtime) so unchanged files are not re-read."""
+
+    def __init__(self, memo=None):
+        self.memo = memo or {}
+
+    def __call__(self, path):
+        path = Path(path) if Path(path).is_absolute() else BASE_DIR / path
+        if not path.exists():
+            return None
+        stat = path.stat()
+        stamp = [stat.st_size, stat.st_mtime_ns]
+        cached = self.memo.get(str(path))
+        if cached and cached['stamp'] == stamp:
+            return cached['hash']
+        h = hashlib.sha256()
+        with open(path, 'rb') as fh:
+            for block in iter(lambda: fh.read(1 << 20), b''):
+                h.update(block)
+        self.memo[str(path)] = {'stamp': stamp, 'hash': h.hexdigest()}
+        return h.hexdigest()
+
+
+IMPORT_RE = re.compile(r"^\s*(?:from\s+(\w+)[\w.]*\s+import\b|import\s+([\w.,\s]+?)\s*(?:#.*)?$)", re.M)
+
+
+def code_text(code):
+    """Notebook cell sources (not outputs) or script text."""
+    path = BASE_DIR / code
+    if code.endswith('.ipynb'):
+        cells = json.loads(path.read_text(encoding='utf-8'))['cells']
+        return '\n'.join(''.join(c['source']) for c in cells if c['cell_type'] == 'code')
+    return path.read_text(encoding='utf-8')
+
+
+def local_imports(text):
+    """Modules of this folder imported anywhere in text (import x / from x import y, also inside functions)."""
+    names = set()
+    for from_name, import_names in IMPORT_RE.findall(text):
+        if from_name:
+            names.add(from_name)
+        else:
+            names.update(n.split()[0].split('.')[0] for n in import_names.split(',') if n.strip())
+    return {f"{name}.py" for name in names if (BASE_DIR / f"{name}.py").exists()}
+
+
+def code_files(stage):
+    """The stage's script / notebook plus every local module it reaches through imports."""
+    files, todo = [], [stage.code]
+    while todo:
+        code = todo.pop()
+        if code in files:
+            continue
+        files.append(code)
+        todo.extend(sorted(local_imports(code_text(code)) - set(files)))
+    return [stage.code] + sorted(files[1:])
+
+
+def code_hash(stage):
+    """Hash of the stage's code and of the local modules it imports (editing promo_rules.py reruns its users)."""
+    h = hashlib.sha256()
+    for code in code_files(stage):
+        h.update(f"{code}\n{code_text(code)}\n".encode('utf-8'))
+    return h.hexdigest()
+
+
+def fingerprint(stage, file_hash):
+    h = hashlib.sha256()
+    h.update(code_hash(stage).encode())
+    h.update(json.dumps(stage.args).encode())
+    for path in stage.inputs:
+        h.update(f"{path}={file_hash(path)}".encode())
+    return h.hexdigest()
+
+
+def is_current(stage, record, fp, file_hash):
+    if not record or record.get('status') != 'ok' or record.get('fingerprint') != fp:
+        return False
+    return all(file_hash(out) is not None and file_hash(out) == record['outputs'].get(out)
+               for out in stage.outputs)
+
+
+# ---------------- Execution ---------------- #
+
+def _measure(result_file, cmd):
+    """Child-process entry point: run cmd, then record the peak RSS of its process tree."""
+    completed = subprocess.run(cmd, cwd=BASE_DIR)
+    peak_mb = None
+    try:
+        import resource
+        # ru_maxrss covers every waited-for descendant (nbconvert's kernel too); KiB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        peak_mb = peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        pass
+    Path(result_file).write_text(json.dumps({'returncode': completed.returncode, 'peak_rss_mb': peak_mb}))
+    return completed.returncode
+
+
+def run_stage(stage):
+    """(status, wall seconds, peak RSS MB) for one stage, run in its own measuring process."""
+    RUN_DIR.mkdir(exist_ok=True)
+    fd, result_file = tempfile.mkstemp(suffix='.json', dir=RUN_DIR)
+    os.close(fd)
+    start = time.perf_counter()
+    log_path = RUN_DIR / f"{stage.name}.log"
+    with open(log_path, 'w') as log:
+        subprocess.run([sys.executable, __file__, '--measure', result_file, '--', *stage.command()],
+                       cwd=BASE_DIR, stdout=log, stderr=subprocess.STDOUT)
+    wall = time.perf_counter() - start
+    try:
+        result = json.loads(Path(result_file).read_text())
+    except (OSError, ValueError):
+        result = {'returncode': 1, 'peak_rss_mb': None}
+    os.remove(result_file)
+    missing = [out for out in stage.outputs if not (BASE_DIR / out).exists()]
+    ok = result['returncode'] == 0 and not missing
+    return ('ok' if ok else 'failed'), wall, result['peak_rss_mb']
+
+
+def load_state():
+    if STATE_FILE.exists():
+        return json.loads(STATE_FILE.read_text())
+    return {'stages': {}, 'files': {}}
+
+
+def save_state(state):
+    STATE_FILE.write_text(json.dumps(state, indent=2))
+
+
+def run_pipeline(stages=STAGES, jobs=4, force=False, dry_run=False):
+    """Run stale stages in dependency order, independent ones in parallel. Returns per-stage results."""
+    state = load_state()
+    file_hash = FileHasher(state.get('files'))
+    deps = upstream(stages)
+    by_name = {s.name: s for s in stages}
+    pending = {s.name for s in stages}
+    results, running = {}, {}
+    # With RETAIL_PROFILE set, every stage's instrument.py records share one run id
+    os.environ.setdefault("RETAIL_PROFILE_RUN", f"pipeline_{time.strftime('%Y%m%d_%H%M%S')}")
+
+    def ready(name):
+        return all(d in results for d in deps[name] if d in by_name)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            for name in sorted(n for n in pending if ready(n)):
+                pending.discard(name)
+                stage = by_name[name]
+                if any(results[d]['status'] in ('failed', 'blocked') for d in deps[name] if d in by_name):
+                    results[name] = {'stage': name, 'status': 'blocked', 'wall_s': 0.0, 'peak_rss_mb': None}
+                    continue
+                fp = fingerprint(stage, file_hash)
+                if not force and is_current(stage, state['stages'].get(name), fp, file_hash):
+                    results[name] = {'stage': name, 'status': 'skipped', 'wall_s': 0.0, 'peak_rss_mb': None}
+                    continue
+                if dry_run:
+                    # Assume it will run; downstream fingerprints are re-checked on the real run
+                    results[name] = {'stage': name, 'status': 'would run', 'wall_s': 0.0, 'peak_rss_mb': None}
+                    continue
+                print(f"▶ {name}: {stage.code}")
+                running[pool.submit(run_stage, stage)] = (name, fp)
+
+            if not running:
+                if pending and not any(ready(n) for n in pending):
+                    raise RuntimeError(f"Stages with unsatisfiable dependencies: {sorted(pending)}")
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, fp = running.pop(future)
+                status, wall, peak = future.result()
+                stage = by_name[name]
+                record = {'stage': name, 'status': status, 'wall_s': round(wall, 3),
+                          'peak_rss_mb': round(peak, 1) if peak is not None else None,
+                          'finished': time.strftime('%Y-%m-%dT%H:%M:%S')}
+                results[name] = record
+                if status == 'ok':
+                    state['stages'][name] = {**record, 'fingerprint': fp,
+                                             'outputs': {out: file_hash(out) for out in stage.outputs}}
+                else:
+                    state['stages'].pop(name, None)
+                with open(LOG_FILE, 'a') as log:
+                    log.write(json.dumps(record) + '\n')
+                print(f"{'✅' if status == 'ok' else '❌'} {name}: {status} in {wall:.1f}s")
+
+    state['files'] = file_hash.memo
+    if not dry_run:
+        save_state(state)
+    return [results[s.name] for s in stages if s.name in results]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == '--measure':
+        sys.exit(_measure(sys.argv[2], sys.argv[4:]))
+
+    parser = argparse.ArgumentParser(description="Run the retail pipeline, skipping up-to-date stages.")
+    parser.add_argument("--only", nargs="+", choices=[s.name for s in STAGES],
+                        help="run these stages (and whatever they depend on)")
+    parser.add_argument("--jobs", type=int, default=4)
+    parser.add_argument("--force", action="store_true")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    selected = with_upstream(STAGES, args.only) if args.only else STAGES
+    results = run_pipeline(selected, jobs=args.jobs, force=args.force, dry_run=args.dry_run)
+
+    print(f"\n{'Stage':<22}{'Status':<12}{'Wall (s)':>10}{'Peak MB':>10}")
+    for r in results:
+        peak = f"{r['peak_rss_mb']:.0f}" if r['peak_rss_mb'] is not None else '-'
+        print(f"{r['stage']:<22}{r['status']:<12}{r['wall_s']:>10.1f}{peak:>10}")
@@ -0,0 +1,355 @@
+# prediction_service.py
+"""
+Online Prediction Service
+-------------------------
+A local asyncio HTTP service (standard library only, no web framework) for
+real-time campaign triggers. The promotion and churn models are loaded once
+through scoring.BatchScorer, together with the customer feature table
+(promotion_dataset.csv, indexed by Customer_ID).
+
+  - Concurrent single-customer requests are collected into micro-batches
+    (up to --max-batch requests, or whatever arrived within --max-wait-ms of
+    the first one) and scored with one vectorized predict / predict_proba per
+    batch, off the event loop in a worker thread. Requests for the same key
+    that are already queued share one prediction.
+  - Results are kept in an LRU cache keyed by (customer, feature version).
+    The feature version is the model files' and customer table's
+    (size, mtime) stamp, or, for features posted with the request, the
+    caller's "feature_version" (else a hash of the posted values).
+
+Endpoints (JSON in / out):
+
+    GET  /predict?customer_id=12347                stored features
+    POST /predict  {"customer_id": 12347, "features": {...}, "feature_version": "v7"}
+    GET  /health
+    GET  /stats                                    batch sizes, cache hit rate
+
+    python prediction_service.py --port 8765
+    python ../benchmarks/load_test_service.py --url http://127.0.0.1:8765
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from schema import read_table
+from scoring import CHURN_MODEL, MODEL_DIR, OUTPUT_COLUMNS, PROMOTION_MODEL, BatchScorer
+
+CUSTOMER_FILE = "promotion_dataset.csv"
+HOST = "127.0.0.1"
+PORT = int(os.environ.get("RETAIL_SERVICE_PORT", 8765))
+SERVICE_MODELS = ['churn', 'promotion']
+MAX_BATCH = 256
+MAX_WAIT_MS = 2.0
+CACHE_SIZE = 100_000
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+def file_version(paths):
+    """Short hash of the files' (size, mtime) stamps; changes whenever a model or table is rewritten."""
+    h = hashlib.sha256()
+    for path in paths:
+        path = Path(path)
+        stat = path.stat() if path.exists() else None
+        h.update(f"{path.name}:{stat.st_size if stat else 0}:{stat.st_mtime_ns if stat else 0}".encode())
+    return h.hexdigest()[:12]
+
+
+class LRUCache:
+    """Most recently used predictions, evicting the least recently used beyond maxsize."""
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.data.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        self.data[key] = value
+        self.data.move_to_end(key)
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+
+class MicroBatcher:
+    """Queues single requests and hands them to score_batch(items) in batches, one batch at a time."""
+
+    def __init__(self, score_batch, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.score_batch = score_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+        self.pending = {}           # key -> future, so duplicate in-flight requests share one prediction
+        self.batches = 0
+        self.batched_items = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, key, item):
+        future = self.pending.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self.pending[key] = future
+            await self.queue.put((key, item, future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self.queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # Whatever else is already queued goes along without further waiting
+        while len(batch) < self.max_batch and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            try:
+                results = await loop.run_in_executor(None, self.score_batch, [item for _, item, _ in batch])
+            except Exception as exc:
+                results = [exc] * len(batch)
+            self.batches += 1
+            self.batched_items += len(batch)
+            for (key, _, future), result in zip(batch, results):
+                self.pending.pop(key, None)
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+
+class PredictionService:
+    """Models + customer table loaded once; micro-batched, LRU-cached predictions over HTTP."""
+
+    def __init__(self, model_dir=MODEL_DIR, customer_file=CUSTOMER_FILE, models=SERVICE_MODELS,
+                 max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, cache_size=CACHE_SIZE):
+        self.scorer = BatchScorer(model_dir)
+        # Serve whichever of the requested models are on disk (score() rejects unloaded ones)
+        self.models = [m for m in models if m in self.scorer.models]
+        # Columns posted features must carry (outputs of models served alongside, e.g. Churn_Prob, excepted)
+        outputs = {OUTPUT_COLUMNS[m] for m in self.models}
+        self.required = list(dict.fromkeys(c for m in self.models for c in self.scorer.features[m]
+                                           if c not in outputs))
+        self.customers = read_table(customer_file, 'promotion_dataset').drop_duplicates('Customer_ID')
+        self.customers = self.customers.set_index('Customer_ID', drop=False)
+        self.version = file_version([Path(model_dir) / PROMOTION_MODEL, Path(model_dir) / CHURN_MODEL,
+                                     customer_file])
+        self.cache = LRUCache(cache_size)
+        self.batcher = MicroBatcher(self.score_batch, max_batch, max_wait_ms)
+        self.requests = 0
+        self.started = time.time()
+
+    # ---------------- Scoring ---------------- #
+
+    def _records(self, frame):
+        out = self.scorer.score(frame, self.models)
+        columns = [OUTPUT_COLUMNS[m] for m in self.models if OUTPUT_COLUMNS[m] in out.columns]
+        return out[columns].astype(object).to_dict('records')
+
+    def score_batch(self, items):
+        """Predictions for [(customer_id, features or None)]; stored and posted features scored separately."""
+        results = [None] * len(items)
+        stored = [i for i, (_, features) in enumerate(items) if features is None]
+        posted = [i for i, (_, features) in enumerate(items) if features is not None]
+
+        if stored:
+            ids = pd.Index([items[i][0] for i in stored])
+            found = ids.isin(self.customers.index)
+            for i in (i for i, ok in zip(stored, found) if not ok):
+                results[i] = KeyError(f"Unknown customer: {items[i][0]}")
+            rows = [i for i, ok in zip(stored, found) if ok]
+            if rows:
+                frame = self.customers.loc[[items[i][0] for i in rows]]
+                for i, result in zip(rows, self._score_rows(frame, [items[i][0] for i in rows])):
+                    results[i] = result
+        if posted:
+            frame = pd.DataFrame([dict(items[i][1], Customer_ID=items[i][0]) for i in posted])
+            for i, result in zip(posted, self._score_rows(frame, [items[i][0] for i in posted])):
+                results[i] = result
+        return results
+
+    def _score_rows(self, frame, customer_ids):
+        """
+        Records for the rows of frame (stored or posted features), scored as one frame.
+        If that fails (e.g. an unknown Value_Tier), rows are rescored one by one so
+        only the bad ones get an error (ValueError -> 400) and the rest of the
+        micro-batch is served.
+        """
+        try:
+            return self._records(frame)
+        except Exception:
+            results = []
+            for j, customer_id in enumerate(customer_ids):
+                try:
+                    results.append(self._records(frame.iloc[[j]])[0])
+                except Exception as exc:
+                    results.append(ValueError(f"Invalid features for customer {customer_id}: {exc}"))
+            return results
+
+    async def predict(self, customer_id, features=None, feature_version=None):
+        if features is None:
+            version = self.version
+        else:
+            if not isinstance(features, dict):
+                raise ValueError("features must be a JSON object")
+            missing = [c for c in self.required if c not in features]
+            if missing:
+                raise ValueError(f"features missing required columns {missing}")
+            version = feature_version or hashlib.sha256(
+                json.dumps(features, sort_keys=True, default=str).encode()).hexdigest()[:12]
+            version = f"{self.version}:{version}"
+        key = (customer_id, version)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return dict(cached, customer_id=customer_id, feature_version=version, cached=True)
+        result = await self.batcher.submit(key, (customer_id, features))
+        if not isinstance(result, dict):
+            raise ValueError(f"No prediction for customer {customer_id}")
+        self.cache.put(key, result)
+        return dict(result, customer_id=customer_id, feature_version=version, cached=False)
+
+    def stats(self):
+        batches = self.batcher.batches
+        lookups = self.cache.hits + self.cache.misses
+        return {
+            'requests': self.requests,
+            'uptime_s': round(time.time() - self.started, 1),
+            'batches': batches,
+            'mean_batch_size': round(self.batcher.batched_items / batches, 2) if batches else 0,
+            'cache_size': len(self.cache.data),
+            'cache_hit_rate': round(self.cache.hits / lookups, 4) if lookups else 0,
+            'feature_version': self.version,
+        }
+
+    # ---------------- HTTP ---------------- #
+
+    async def route(self, method, target, body):
+        url = urlsplit(target)
+        if url.path == '/health':
+            return 200, {'status': 'ok', 'models': sorted(self.scorer.models)}
+        if url.path == '/stats':
+            return 200, self.stats()
+        if url.path != '/predict':
+            return 404, {'error': f"No route: {url.path}"}
+
+        if method == 'GET':
+            query = parse_qs(url.query)
+            payload = {'customer_id': query.get('customer_id', [None])[0]}
+        elif method == 'POST':
+            try:
+                payload = json.loads(body or b'{}')
+            except ValueError as exc:   # JSONDecodeError / UnicodeDecodeError
+                return 400, {'error': f"Malformed JSON body: {exc}"}
+            if not isinstance(payload, dict):
+                return 400, {'error': "Request body must be a JSON object"}
+        else:
+            return 405, {'error': f"Method not allowed: {method}"}
+        if payload.get('customer_id') is None:
+            return 400, {'error': "customer_id is required"}
+        try:
+            customer_id = int(payload['customer_id'])
+        except (TypeError, ValueError):
+            return 400, {'error': f"Invalid customer_id: {payload['customer_id']}"}
+
+        self.requests += 1
+        try:
+            return 200, await self.predict(customer_id, payload.get('features'), payload.get('feature_version'))
+        except KeyError as exc:
+            return 404, {'error': exc.args[0]}
+        except ValueError as exc:
+            return 400, {'error': str(exc)}
+
+    async def handle(self, reader, writer):
+        """One keep-alive HTTP/1.1 connection."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length') or 0))
+
+                try:
+                    status, payload = await self.route(method, target, body)
+                except Exception as exc:
+                    status, payload = 500, {'error': f"{type(exc).__name__}: {exc}"}
+                data = json.dumps(payload, default=str).encode()
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}"
+                    f"\r\n\r\n".encode() + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=HOST, port=PORT):
+        self.batcher.start()
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"✅ Serving {', '.join(sorted(self.scorer.models))} for {len(self.customers):,} customers "
+              f"on http://{host}:{port} (feature version {self.version})", flush=True)
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-batching promotion / churn prediction service.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--model-dir", default=str(MODEL_DIR))
+    parser.add_argument("--customers", default=CUSTOMER_FILE, help="customer feature table (promotion_dataset)")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE, help="0 disables the LRU cache")
+    args = parser.parse_args()
+
+    service = PredictionService(args.model_dir, args.customers, max_batch=args.max_batch,
+                                max_wait_ms=args.max_wait_ms, cache_size=args.cache_size)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,236 @@
+# promo_rules.py
+"""
+Vectorized Business Rules
+-------------------------
+Column-wise versions of the rule functions that used to run through
+DataFrame.apply(axis=1):
+
+  - value_tier / promotion_class / suggested_offer_text   (build_promotion_dataset.py)
+  - clearance_discount / project_revenue / clearance_strategy  (clearance_planner.py)
+  - festival_tag                                          (festival_product_insight.py)
+  - trigger_class                                         (promotion_trigger_analysis.ipynb,
+                                                           trigger_cube.py)
+  - retention_flags                                       (revenue_risk_model.ipynb,
+                                                           retention_targeting.py)
+
+Each function takes a DataFrame (or Series) and returns whole columns, and
+produces exactly the values the original row-wise functions produced.
+"""
+
+import numpy as np
+import pandas as pd
+
+# ---------------- Promotion rules ---------------- #
+
+SEGMENT_TO_TIER = {
+    'A': 'Top', 'TOP': 'Top', 'HIGHVALUE': 'Top', 'TOP_CUSTOMER': 'Top',
+    'B': 'High', 'HIGH': 'High',
+    'C': 'Medium', 'MEDIUM': 'Medium',
+}
+
+# (tier) -> (class if at risk, class if not at risk)
+TIER_PROMOTIONS = {
+    'Top': ('VIP_LOYALTY', 'VIP_LOYALTY'),
+    'High': ('HIGH_VALUE_SAVE', 'UPSWING_UPSELL'),
+    'Medium': ('MID_SAVE', 'CROSS_SELL'),
+    'Low': ('WINBACK', 'LIGHT_NURTURE'),
+}
+DEFAULT_PROMOTION = 'LIGHT_NURTURE'
+
+OFFER_TEXT = {
+    'VIP_LOYALTY': 'Early access + exclusive bundle',
+    'UPSWING_UPSELL': 'Bundle offer on premium related item',
+    'HIGH_VALUE_SAVE': 'Personalized 15% retention voucher',
+    'CROSS_SELL': 'Add complementary product recommendation',
+    'MID_SAVE': 'Limited 10% coupon + loyalty enrollment',
+    'WINBACK': 'Reactivate: 20% comeback code',
+    'LIGHT_NURTURE': 'Low-cost email drip series'
+}
+
+
+def _segment_text(df):
+    """CLTV_Segment, falling back to CLTV_Segment_Label where the segment is absent/empty."""
+    empty = pd.Series('', index=df.index, dtype=object)
+    seg = df['CLTV_Segment'] if 'CLTV_Segment' in df.columns else None
+    label = df['CLTV_Segment_Label'] if 'CLTV_Segment_Label' in df.columns else empty
+    if seg is None:
+        seg = label
+    else:
+        # Only None/'' fall back; NaN is kept, as the old `row.get(...) or ...` treated it as truthy
+        values = seg.to_numpy(dtype=object)
+        blank = (values == '') | (values == None)  # noqa: E711 (elementwise None check)
+        seg = pd.Series(np.where(blank, label.to_numpy(dtype=object), values), index=df.index)
+    return seg.astype(str).str.upper()
+
+
+def value_tier(df):
+    """Top / High / Medium / Low tier from the CLTV segment code."""
+    return _segment_text(df).map(SEGMENT_TO_TIER).fillna('Low')
+
+
+def promotion_class(df, tier_col='Value_Tier', risk_col='At_Risk'):
+    """Rule-based Promotion_Class from value tier and at-risk flag."""
+    tier = df[tier_col]
+    at_risk = df[risk_col].astype(bool).to_numpy()
+    conditions, choices = [], []
+    for name, (if_risk, if_safe) in TIER_PROMOTIONS.items():
+        is_tier = (tier == name).to_numpy()
+        conditions += [is_tier & at_risk, is_tier]
+        choices += [if_risk, if_safe]
+    return pd.Series(np.select(conditions, choices, default=DEFAULT_PROMOTION), index=df.index)
+
+
+def suggested_offer_text(promo_class):
+    return promo_class.map(OFFER_TEXT)
+
+
+# ---------------- Clearance rules ---------------- #
+
+BASE_MARGIN = 0.30
+ELASTICITY = -1.2
+MAX_DISCOUNT = 0.60
+
+REVENUE_COLUMNS = ['Avg_Price_Est', 'Discounted_Price', 'Projected_Units', 'Current_Revenue',
+                   'Projected_Revenue', 'Revenue_Lift', 'Current_Gross_Profit',
+                   'Projected_Gross_Profit', 'Gross_Profit_Delta']
+
+
+def round_like_python(values, ndigits=2):
+    """
+    Vectorized equivalent of the builtin round(x, ndigits).
+
+    np.round scales by 10**ndigits in floating point, which occasionally lands on
+    the other side of .5 from the exact value. Here the scaling error is recovered
+    exactly (Dekker product) so ties are decided on the true binary value, the way
+    round() does it.
+    """
+    x = np.asarray(values, dtype=np.float64)
+    scale = 10.0 ** ndigits
+    with np.errstate(invalid='ignore', over='ignore'):
+        p = x * scale
+        c = 134217729.0 * x
+        hi = c - (c - x)
+        lo = x - hi
+        err = (hi * scale - p) + lo * scale
+        r = np.rint(p)
+        d = p - r
+        r = r + np.where((d == 0.5) & (err > 0), 1.0, 0.0) - np.where((d == -0.5) & (err < 0), 1.0, 0.0)
+        out = r / scale
+    return np.where(np.isfinite(p), out, x)
+
+
+def clearance_discount(feat):
+    """Adj_Discount: tier by zero-sales ratio, +5% if stale, +5% if volatile, capped at 60%."""
+    zero_ratio = feat['Zero_Sales_Ratio'].to_numpy(dtype=float)
+    base = np.select([zero_ratio > 0.9, zero_ratio > 0.7], [0.50, 0.40], default=0.30)
+    cv = feat['CV_Monthly_Quantity'].to_numpy(dtype=float)
+    adj = base + np.where(feat['Last_Sale_Months_Ago'].to_numpy(dtype=float) > 6, 0.05, 0.0)
+    adj = adj + np.where(~np.isnan(cv) & (cv > 1.0), 0.05, 0.0)
+    return pd.Series(np.minimum(adj, MAX_DISCOUNT), index=feat.index)
+
+
+def price_estimate(feat):
+    """(Avg_Monthly_Quantity, Avg_Price_Est) arrays: monthly value per active month over monthly units."""
+    avg_qty = feat['Avg_Monthly_Quantity'].to_numpy(dtype=float)
+    months = feat['Months_Active'].to_numpy(dtype=float)
+    total_value = feat['Total_Value'].to_numpy(dtype=float)
+    return avg_qty, (total_value / np.maximum(months, 1)) / np.maximum(avg_qty, 1)
+
+
+def project_revenue(feat, discount_col='Adj_Discount', elasticity=ELASTICITY, base_margin=BASE_MARGIN):
+    """Price, units, revenue and gross-profit projection at the given discount (REVENUE_COLUMNS)."""
+    avg_qty, avg_price_est = price_estimate(feat)
+    discount = feat[discount_col].to_numpy(dtype=float)
+
+    discounted_price = avg_price_est * (1 - discount)
+    demand_mult = 1 + abs(elasticity) * discount
+    projected_units = np.maximum(avg_qty * demand_mult, avg_qty + 1)
+    current_rev = avg_qty * avg_price_est
+    proj_rev = projected_units * discounted_price
+    current_gp = current_rev * base_margin
+    proj_gp = proj_rev * base_margin
+
+    values = [avg_price_est, discounted_price, projected_units, current_rev, proj_rev,
+              proj_rev - current_rev, current_gp, proj_gp, proj_gp - current_gp]
+    return pd.DataFrame({col: round_like_python(v, 2) for col, v in zip(REVENUE_COLUMNS, values)},
+                        index=feat.index)
+
+
+def clearance_strategy(feat):
+    discontinue = (feat['Zero_Sales_Ratio'] > 0.9) & (feat['Last_Sale_Months_Ago'] >= 9)
+    bundle = (feat['Revenue_Lift'] < 0) & (feat['Gross_Profit_Delta'] < 0)
+    return pd.Series(np.select([discontinue, bundle], ["Discontinue", "Bundle / Placement Test"],
+                               default="Clearance Discount"), index=feat.index)
+
+
+# ---------------- Hourly trigger rules ---------------- #
+
+HOT_QUANTILE = 0.80
+WARM_QUANTILE = 0.50
+
+
+def trigger_class(orders, keys):
+    """
+    HOT_HOUR / WARM_HOUR / COLD_HOUR against the 80th / 50th percentile of orders
+    within each slice (rows sharing keys); one groupby quantile instead of
+    groupby().apply(classify_triggers).
+    """
+    grouped = orders.groupby([keys[c] for c in keys] if isinstance(keys, pd.DataFrame) else keys, observed=True)
+    hot = grouped.transform('quantile', HOT_QUANTILE).to_numpy()
+    warm = grouped.transform('quantile', WARM_QUANTILE).to_numpy()
+    values = orders.to_numpy()
+    return pd.Series(np.select([values >= hot, values >= warm], ['HOT_HOUR', 'WARM_HOUR'], default='COLD_HOUR'),
+                     index=orders.index)
+
+
+# ---------------- Retention rules ---------------- #
+
+RETENTION_RISK = 3000          # Revenue_Risk above which a retention offer is made
+VIP_CLTV = 3000
+VIP_CHURN_PROB = 0.8
+TIME_TRIGGER_RECENCY = 90      # days
+DROPOFF_MAX_FREQUENCY = 2
+URGENT_MIN_CLTV = 1000         # urgent_time_campaign: time trigger with CLTV above this
+
+RETENTION_FLAGS = ['Retention_Offer_Flag', 'VIP_Service_Flag', 'Time_Based_Trigger', 'Potential_DropOff']
+
+
+def retention_flags(df):
+    """The four retention action flags (0/1, uint8) as boolean masks over whole columns."""
+    cltv = df['CLTV'].to_numpy()
+    recency = df['Recency'].to_numpy()
+    masks = [
+        df['Revenue_Risk'].to_numpy() > RETENTION_RISK,
+        (cltv > VIP_CLTV) & (df['Churn_Prob'].to_numpy() > VIP_CHURN_PROB),
+        recency > TIME_TRIGGER_RECENCY,
+        (df['Frequency'].to_numpy() <= DROPOFF_MAX_FREQUENCY) & (recency > TIME_TRIGGER_RECENCY),
+    ]
+    return pd.DataFrame({name: mask.astype(np.uint8) for name, mask in zip(RETENTION_FLAGS, masks)},
+                        index=df.index)
+
+
+# ---------------- Festival rules ---------------- #
+
+CHRISTMAS_KEYWORDS = ['CHRISTMAS', 'XMAS']
+
+# Festival calendar (seasonal_index.py; festival_calendar.json adds or overrides entries):
+#   windows    sales windows ['MM-DD', 'MM-DD'] recurring every year, or
+#              ['YYYY-MM-DD', 'YYYY-MM-DD'] for one year only
+#   keywords   products whose description contains any of these ([] = every product)
+#   exclude    ... minus those containing any of these
+#   promotion  recommended promotion window shown in festival_promo_gui.py
+FESTIVAL_CALENDAR = {
+    'Christmas': {'windows': [['12-01', '12-31']], 'keywords': CHRISTMAS_KEYWORDS, 'exclude': [],
+                  'promotion': ['12-01', '01-01']},
+    'Diwali': {'windows': [['10-01', '11-30']], 'keywords': [], 'exclude': CHRISTMAS_KEYWORDS,
+               'promotion': ['10-01', '10-31']},
+}
+
+
+def festival_tag(description, month):
+    """'Christmas' for Christmas items sold in December, 'Diwali' for other items in Oct/Nov, else None."""
+    has_keyword = description.str.contains('|'.join(CHRISTMAS_KEYWORDS), regex=True, na=False).to_numpy()
+    month = month.to_numpy()
+    tags = np.select([has_keyword & (month == 12), np.isin(month, [10, 11]) & ~has_keyword],
+                     ['Christmas', 'Diwali'], default=None)
+    return pd.Series(tags, index=description.index, dtype=object)
@@ -1,31 +1,31 @@
 # promotion_recommender.py
-import pandas as pd
-import numpy as np
 import streamlit as st
-import joblib
-
-PROMO_DATA = "promotion_dataset.csv"
-MODEL_FILE = "models/promotion_model.pkl"
+from app_artifacts import open_table
+from instrument import stage
 
 st.set_page_config(page_title="Promotion Recommender", layout="wide")
 st.title("🎯 Customer Promotion Recommender")
 
-@st.cache_data
-def load_data():
-    return pd.read_csv(PROMO_DATA)
+@st.cache_resource
+def load_table():
+    # Memory-mapped Arrow copy of promotion_dataset.csv, indexed by Customer_ID, with the
+    # model's Predicted_Promotion_Class precomputed by the build step (python app_artifacts.py)
+    return open_table("promotion")
 
 @st.cache_resource
-def load_model():
-    bundle = joblib.load(MODEL_FILE)
-    return bundle['model'], bundle['encoder'], bundle['features']
+def load_scorer():
+    # Only needed when the artifact has no precomputed predictions; sklearn/joblib are
+    # imported here, not at startup
+    from scoring import BatchScorer
+    return BatchScorer().attach(load_table().frame(), key='Customer_ID')
 
-data = load_data()
-model, encoder, features = load_model()
+table = load_table()
 
-customer_ids = sorted(data['Customer_ID'].unique())
+customer_ids = table.keys.tolist()   # already sorted and unique
 selected_id = st.selectbox("Select Customer ID", customer_ids)
 
-cust = data[data['Customer_ID'] == selected_id].iloc[0]
+with stage("lookup_customer"):
+    cust = table.row(selected_id)
 
 st.subheader("Customer Snapshot")
 c1, c2, c3, c4, c5 = st.columns(5)
@@ -37,12 +37,11 @@ c5.metric("At Risk?", "Yes" if cust['At_Risk'] else "No")
 
 st.write(f"**Last Product Purchased:** {cust.get('Last_Product', 'N/A')}")
 
-# Prepare row for model
-X_row = cust[features].to_frame().T.copy()
-# Encode Value_Tier
-X_row[['Value_Tier']] = encoder.transform(X_row[['Value_Tier']])
-
-pred_class = model.predict(X_row)[0]
+# Model prediction (precomputed offline; live batched scorer only as a fallback)
+with stage("predict_promotion"):
+    pred_class = cust.get('Predicted_Promotion_Class')
+    if not isinstance(pred_class, str):
+        pred_class = load_scorer().predict_many([selected_id], models=['promotion'])['Predicted_Promotion_Class'].iloc[0]
 
 st.subheader("🔮 Promotion Recommendation")
 colA, colB = st.columns(2)
@@ -67,7 +66,7 @@ explanations = {
 st.info(explanations.get(pred_class, "Promotion logic applied."))
 
 # Manual override
-override = st.selectbox("Manual Override (optional)", ["--"] + list(sorted(data['Promotion_Class'].unique())))
+override = st.selectbox("Manual Override (optional)", ["--"] + table.unique('Promotion_Class'))
 if override != "--":
     st.success(f"Override selected: {override}")
 
@@ -80,4 +79,4 @@ if st.button("Download This Recommendation"):
 
 # Bulk export
 if st.button("Export All Recommendations"):
-    st.download_button("Download promotion_dataset.csv", data.to_csv(index=False), file_name="promotion_dataset.csv")
+    st.download_button("Download promotion_dataset.csv", table.frame().to_csv(index=False), file_name="promotion_dataset.csv")
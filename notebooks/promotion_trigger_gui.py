@@ -1,58 +1,84 @@
 # promotion_trigger_gui.py
-import pandas as pd
 import streamlit as st
-import matplotlib.pyplot as plt
+from pathlib import Path
+from app_artifacts import SEGMENT_TIERS, open_table
+from instrument import stage
+from trigger_cube import CUBE_FILE, WEEKDAYS, TriggerCube
 
-DATA_FILE = r"E:\c drive\project\notebooks\promotion_hourly_triggers.csv"
+TIER_ORDER = ['Top', 'High', 'Medium', 'Low']
 
 st.set_page_config(page_title="Promotion Hourly Triggers", layout="wide")
 st.title("⏰ Customer Promotion Trigger Planner")
 
-@st.cache_data
-def load_data():
-    df = pd.read_csv(DATA_FILE)
-
-    # Map A/B/C/D to Top/High/Medium/Low
-    segment_map = {
-        'A': 'Top',
-        'B': 'High',
-        'C': 'Medium',
-        'D': 'Low'
-    }
-    if 'CLTV_Segment_Label' in df.columns:
-        df['CLTV_Segment_Label'] = df['CLTV_Segment_Label'].replace(segment_map)
-    elif 'CLTV_Segment' in df.columns:
-        df['CLTV_Segment_Label'] = df['CLTV_Segment'].map(segment_map)
-    else:
-        st.warning("CLTV_Segment or CLTV_Segment_Label column not found in the dataset!")
-    
-    return df
+@st.cache_resource
+def load_table():
+    # promotion_hourly_triggers.csv with A/B/C/D already mapped to Top/High/Medium/Low
+    # by the build step (python app_artifacts.py), indexed by segment
+    return open_table("hourly_triggers")
+
+@st.cache_resource
+def load_cube():
+    # Segment x hour x weekday x country x month pre-aggregates (python trigger_cube.py);
+    # each slice below is a NumPy roll-up of this cube, not a pass over raw orders
+    return TriggerCube.load(CUBE_FILE) if Path(CUBE_FILE).exists() else None
 
-df = load_data()
+table = load_table()
 
-segments = df['CLTV_Segment_Label'].dropna().unique()
+segments = sorted(table.keys.tolist(), key=lambda s: TIER_ORDER.index(s) if s in TIER_ORDER else len(TIER_ORDER))
 selected_segment = st.selectbox("Select CLTV Segment", segments)
 
-segment_data = df[df['CLTV_Segment_Label'] == selected_segment]
+with stage("lookup_segment") as s:
+    segment_data = s.output(table.rows(selected_segment))
 
 # Show best hours
 best_hours = segment_data[segment_data['Trigger_Class'] == "HOT_HOUR"]['Hour'].tolist()
 st.success(f"**Best Promotion Hours for {selected_segment}:** {best_hours}")
 
-# Plot hourly activity
-fig, ax = plt.subplots(figsize=(8, 4))
-ax.bar(segment_data['Hour'], segment_data['Total_Orders'], color='skyblue')
-for idx, row in segment_data.iterrows():
-    if row['Trigger_Class'] == "HOT_HOUR":
-        ax.text(row['Hour'], row['Total_Orders'] + 0.5, '🔥', ha='center')
-ax.set_xlabel("Hour of Day")
-ax.set_ylabel("Total Orders")
-ax.set_title(f"Hourly Orders - {selected_segment}")
-st.pyplot(fig)
+# Plot hourly activity (built-in chart, HOT hours coloured; no matplotlib import on startup)
+st.caption(f"Hourly Orders - {selected_segment}")
+st.bar_chart(segment_data, x='Hour', y='Total_Orders', color='Trigger_Class',
+             x_label="Hour of Day", y_label="Total Orders")
+
+if st.checkbox("Show annotated (matplotlib) chart"):
+    # Plotting library is only imported when this chart is asked for
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(8, 4))
+    ax.bar(segment_data['Hour'], segment_data['Total_Orders'], color='skyblue')
+    for idx, row in segment_data.iterrows():
+        if row['Trigger_Class'] == "HOT_HOUR":
+            ax.text(row['Hour'], row['Total_Orders'] + 0.5, '🔥', ha='center')
+    ax.set_xlabel("Hour of Day")
+    ax.set_ylabel("Total Orders")
+    ax.set_title(f"Hourly Orders - {selected_segment}")
+    st.pyplot(fig)
+
+cube = load_cube()
+if cube is not None:
+    st.subheader("Drill Down by Weekday / Country / Month")
+    d1, d2, d3 = st.columns(3)
+    weekdays = d1.multiselect("Weekday", list(range(7)), format_func=lambda d: WEEKDAYS[d])
+    countries = d2.multiselect("Country", cube.axes['Country'].tolist())
+    months = d3.multiselect("Month", cube.axes['Month'].tolist())
+
+    segment_code = {tier: code for code, tier in SEGMENT_TIERS.items()}.get(selected_segment, selected_segment)
+    where = {'CLTV_Segment_Label': segment_code}
+    for dim, values in (('Weekday', weekdays), ('Country', countries), ('Month', months)):
+        if values:
+            where[dim] = values
+    with stage("cube_slice") as s:
+        sliced = s.output(cube.query(['Hour'], where))
+
+    if sliced.empty:
+        st.info("No orders in this slice.")
+    else:
+        st.success(f"**HOT hours in this slice:** {sliced.loc[sliced['Trigger_Class'] == 'HOT_HOUR', 'Hour'].tolist()}")
+        st.bar_chart(sliced, x='Hour', y='Total_Orders', color='Trigger_Class',
+                     x_label="Hour of Day", y_label="Total Orders")
 
 # Download option
 st.download_button(
     "Download Full Trigger Plan CSV",
-    df.to_csv(index=False),
+    table.frame().to_csv(index=False),
     file_name="promotion_hourly_triggers.csv"
 )
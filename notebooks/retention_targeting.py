@@ -0,0 +1,156 @@
+# retention_targeting.py
+"""
+Retention Targeting
+-------------------
+revenue_risk_model.ipynb scores Revenue_Risk = CLTV x Churn_Prob, sorts the
+whole table for its top 15, then builds each action list with its own
+Series.apply / row-wise apply pass. This module regenerates everything in one
+scan over the customer table, chunk by chunk:
+
+  - Churn_Prob from the churn model (scoring.BatchScorer, vectorized per
+    chunk) unless the table already carries it, and Revenue_Risk,
+  - the four action flags as boolean masks (promo_rules.retention_flags),
+    folded into one bit per targeting list, so every list is read off the
+    same pass,
+  - the top-K customers by Revenue_Risk overall and per CLTV_Segment, kept
+    as bounded candidate sets merged chunk by chunk with argpartition
+    (group_agg.group_top_k), never sorting the whole table.
+
+Outputs (same files and columns as the notebook, plus the per-segment top-K):
+
+    cltv_with_churn_risk.csv        every customer with Churn_Prob / Revenue_Risk
+    high_risk_customers.csv         top TOP_K by Revenue_Risk
+    high_risk_by_segment.csv        top TOP_K per CLTV_Segment
+    retention_targets.csv / vip_followups.csv / urgent_time_campaign.csv /
+    monitor_dropoff_customers.csv   the targeting lists (with the flag columns)
+
+    python retention_targeting.py                       # score with models/churn_model.pkl
+    python retention_targeting.py --input cltv_with_churn_risk.csv --top-k 50
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from group_agg import group_top_k
+from instrument import stage
+from promo_rules import RETENTION_FLAGS, URGENT_MIN_CLTV, retention_flags
+from schema import read_table, write_table
+
+INPUT_FILE = "cltv_dataset.csv"
+RISK_FILE = "cltv_with_churn_risk.csv"
+HIGH_RISK_FILE = "high_risk_customers.csv"
+SEGMENT_RISK_FILE = "high_risk_by_segment.csv"
+SEGMENT_COLUMN = 'CLTV_Segment'
+TOP_K = 15
+CHUNK_SIZE = 500_000
+
+# Targeting list -> bit in the per-customer list mask
+TARGET_LISTS = ['retention_targets.csv', 'vip_followups.csv', 'urgent_time_campaign.csv',
+                'monitor_dropoff_customers.csv']
+
+
+def list_bits(df, flags):
+    """One uint8 per row with bit i set when the row belongs to TARGET_LISTS[i]."""
+    masks = [
+        flags['Retention_Offer_Flag'].to_numpy() == 1,
+        flags['VIP_Service_Flag'].to_numpy() == 1,
+        (flags['Time_Based_Trigger'].to_numpy() == 1) & (df['CLTV'].to_numpy() > URGENT_MIN_CLTV),
+        flags['Potential_DropOff'].to_numpy() == 1,
+    ]
+    bits = np.zeros(len(df), dtype=np.uint8)
+    for i, mask in enumerate(masks):
+        bits |= mask.astype(np.uint8) << i
+    return bits
+
+
+def _merge_top(candidates, positions, keys, risk, k):
+    """Top-k candidate positions after adding one chunk's; candidates stay in row order for tie-breaks."""
+    positions = np.sort(np.concatenate([candidates, positions]))
+    return positions[group_top_k(None if keys is None else keys[positions], risk[positions], k)]
+
+
+def target(cltv, scorer=None, top_k=TOP_K, chunk_size=CHUNK_SIZE, segment_col=SEGMENT_COLUMN):
+    """
+    (scored table, {list file: rows}, top-K overall, top-K per segment) in one
+    chunked pass; scorer (a BatchScorer with the churn model) re-scores Churn_Prob.
+    """
+    cltv = cltv.reset_index(drop=True)
+    if scorer is None and 'Churn_Prob' not in cltv.columns:
+        raise ValueError("No Churn_Prob column and no churn model to score it with.")
+
+    n = len(cltv)
+    churn = np.empty(n) if scorer is not None else cltv['Churn_Prob'].to_numpy(dtype=np.float64)
+    risk = np.empty(n)
+    flags = np.empty((n, len(RETENTION_FLAGS)), dtype=np.uint8)
+    bits = np.empty(n, dtype=np.uint8)
+    segments = cltv[segment_col].astype(str).to_numpy() if segment_col in cltv.columns else None
+    top_all = np.array([], dtype=np.int64)
+    top_segment = np.array([], dtype=np.int64)
+
+    for start in range(0, n, chunk_size):
+        chunk = cltv.iloc[start:start + chunk_size]
+        stop = start + len(chunk)
+        if scorer is not None:
+            churn[start:stop] = scorer.score(chunk, models=['churn'])['Churn_Prob'].to_numpy()
+        risk[start:stop] = chunk['CLTV'].to_numpy(dtype=np.float64) * churn[start:stop]
+
+        view = chunk.assign(Churn_Prob=churn[start:stop], Revenue_Risk=risk[start:stop])
+        chunk_flags = retention_flags(view)
+        flags[start:stop] = chunk_flags.to_numpy()
+        bits[start:stop] = list_bits(view, chunk_flags)
+
+        # Bounded candidate sets: previous top-K + this chunk's top-K
+        local = np.arange(start, stop)
+        top_all = _merge_top(top_all, local[group_top_k(None, risk[start:stop], top_k)], None, risk, top_k)
+        if segments is not None:
+            chunk_top = local[group_top_k(segments[start:stop], risk[start:stop], top_k)]
+            top_segment = _merge_top(top_segment, chunk_top, segments, risk, top_k)
+
+    scored = cltv.assign(Churn_Prob=churn, Revenue_Risk=risk)
+    actions = pd.concat([scored, pd.DataFrame(flags, columns=RETENTION_FLAGS)], axis=1)
+    lists = {name: actions.iloc[np.flatnonzero(bits & (1 << i))] for i, name in enumerate(TARGET_LISTS)}
+    return scored, lists, scored.iloc[top_all], scored.iloc[top_segment]
+
+
+def write_outputs(scored, lists, high_risk, segment_risk):
+    write_table(scored, RISK_FILE, 'cltv_with_churn_risk')
+    write_table(high_risk, HIGH_RISK_FILE, 'cltv_with_churn_risk')
+    write_table(segment_risk, SEGMENT_RISK_FILE, 'cltv_with_churn_risk')
+    for name, rows in lists.items():
+        write_table(rows, name, 'retention_actions')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Revenue risk scoring and retention targeting lists.")
+    parser.add_argument("--input", default=INPUT_FILE)
+    parser.add_argument("--model-dir", help="churn model folder (default: scoring.MODEL_DIR); "
+                                            "--no-rescore keeps the input's Churn_Prob")
+    parser.add_argument("--no-rescore", action="store_true")
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    with stage("load_customers") as s:
+        cltv = s.output(read_table(args.input))
+    scorer = None
+    if not args.no_rescore:
+        from scoring import MODEL_DIR, BatchScorer
+        scorer = BatchScorer(args.model_dir or MODEL_DIR)
+        if 'churn' not in scorer.models:
+            raise ValueError(f"No churn model in {scorer.model_dir}; use --no-rescore to keep Churn_Prob.")
+
+    start = time.perf_counter()
+    with stage("target", inputs=cltv) as s:
+        scored, lists, high_risk, segment_risk = target(cltv, scorer, args.top_k, args.chunk_size)
+        s.output(scored)
+    elapsed = time.perf_counter() - start
+    with stage("write_outputs", inputs=scored):
+        write_outputs(scored, lists, high_risk, segment_risk)
+
+    print(f"✅ {len(scored):,} customers scored and targeted in {elapsed:.2f}s")
+    for name, rows in lists.items():
+        print(f"- {name}: {len(rows):,}")
+    print(f"- {HIGH_RISK_FILE}: top {len(high_risk)}, {SEGMENT_RISK_FILE}: {len(segment_risk)} rows")
@@ -0,0 +1,209 @@
+# schema.py
+"""
+Compact Column Schema for the Customer and Product Tables
+---------------------------------------------------------
+The CSV hand-off tables (cltv_dataset.csv, cltv_with_predictions.csv,
+cltv_with_churn_risk.csv, messaging_schedule.csv, promotion_dataset.csv, ...)
+used to come back from read_csv as float64 Customer_IDs, object strings for
+every tier / class / description and int64 0/1 flags.
+
+COLUMN_TYPES declares one compact dtype per column name, wherever it appears:
+
+    Customer_ID                       int32
+    counts (Frequency, Recency, ...)  int32
+    0/1 flags (At_Risk, ...)          uint8
+    hour / weekday / cluster          uint8
+    probabilities (Churn_Prob)        float32
+    tiers, classes, descriptions      category
+    dates                             datetime64
+
+Money columns and model input features (Monetary, AOV, PF, CLTV, ...) stay
+float64 so model scores do not move. An integer column that has missing or
+fractional values is kept as float32 instead of failing.
+
+TABLES declares each table's column contract (required columns, unique key);
+read_table() / write_table() apply the dtypes and check the contract, raising
+ValueError with every problem found instead of failing later on a KeyError.
+
+    df = read_table("promotion_dataset.csv", "promotion_dataset")
+    write_table(dataset, "promotion_dataset.csv", "promotion_dataset")
+
+Report the memory saving for a CSV:
+    python schema.py promotion_dataset.csv promotion_dataset
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+# ---------------- Column dtypes ---------------- #
+
+INT_COLUMNS = {
+    'Customer_ID': 'int32',
+    'Frequency': 'int32',
+    'Recency': 'int32',
+    'Days_Since_Last_Purchase': 'int32',
+    'Tenure_Days': 'int32',
+    'Invoices': 'int32',
+    'Quantity': 'int32',
+    'Total_Orders': 'int32',
+    'At_Risk': 'uint8',
+    'Retention_Offer_Flag': 'uint8',
+    'VIP_Service_Flag': 'uint8',
+    'Time_Based_Trigger': 'uint8',
+    'Potential_DropOff': 'uint8',
+    'Preferred_Hour': 'uint8',
+    'Preferred_Weekday': 'uint8',
+    'Hour': 'uint8',
+    'Weekday': 'uint8',
+    'BehaviorCluster': 'uint8',
+}
+FLOAT32_COLUMNS = ['Churn_Prob', 'Zero_Sales_Ratio', 'CV_Monthly_Quantity']
+FLOAT64_COLUMNS = ['Monetary', 'AOV', 'PF', 'ProfitMargin', 'CLTV', 'Predicted_CLTV', 'Revenue_Risk',
+                   'Total_Revenue', 'Total_Value', 'Month_Value', 'Month_Quantity']
+CATEGORY_COLUMNS = ['CLTV_Segment', 'CLTV_Segment_Label', 'Value_Tier', 'Promotion_Class',
+                    'Predicted_Promotion_Class', 'Suggested_Offer_Text', 'Description', 'Last_Product',
+                    'Festival', 'Trigger_Class', 'Strategy', 'Country']
+DATE_COLUMNS = ['Last_Purchase_Date', 'First_Purchase_Date', 'YearMonth']
+
+COLUMN_TYPES = {
+    **INT_COLUMNS,
+    **{c: 'float32' for c in FLOAT32_COLUMNS},
+    **{c: 'float64' for c in FLOAT64_COLUMNS},
+    **{c: 'category' for c in CATEGORY_COLUMNS},
+    **{c: 'datetime64[ns]' for c in DATE_COLUMNS},
+}
+
+# Allowed [low, high] per column (None = open)
+RANGES = {
+    'Churn_Prob': (0, 1),
+    'At_Risk': (0, 1),
+    'Retention_Offer_Flag': (0, 1),
+    'VIP_Service_Flag': (0, 1),
+    'Time_Based_Trigger': (0, 1),
+    'Potential_DropOff': (0, 1),
+    'Preferred_Hour': (0, 23),
+    'Hour': (0, 23),
+    'Preferred_Weekday': (0, 6),
+    'Weekday': (0, 6),
+    'Frequency': (0, None),
+    'Monetary': (0, None),
+}
+
+# ---------------- Table contracts ---------------- #
+
+CLTV_COLUMNS = ['Customer_ID', 'Frequency', 'Recency', 'Monetary', 'AOV', 'PF', 'ProfitMargin',
+                'CLTV', 'CLTV_Segment']
+RISK_COLUMNS = CLTV_COLUMNS + ['Churn_Prob', 'Revenue_Risk']
+
+# name -> (required columns, unique key or None)
+TABLES = {
+    'cltv_dataset': (CLTV_COLUMNS, 'Customer_ID'),
+    'cltv_with_predictions': (CLTV_COLUMNS + ['Predicted_CLTV'], 'Customer_ID'),
+    'cltv_with_churn_risk': (RISK_COLUMNS, 'Customer_ID'),
+    'retention_actions': (RISK_COLUMNS + ['Retention_Offer_Flag', 'VIP_Service_Flag',
+                                          'Time_Based_Trigger', 'Potential_DropOff'], 'Customer_ID'),
+    'messaging_schedule': (RISK_COLUMNS + ['Preferred_Hour', 'Preferred_Weekday'], 'Customer_ID'),
+    'promotion_dataset': (['Customer_ID', 'CLTV', 'Frequency', 'Recency', 'Churn_Prob', 'Value_Tier',
+                           'At_Risk', 'Promotion_Class', 'Suggested_Offer_Text'], 'Customer_ID'),
+    'promotion_hourly_triggers': (['CLTV_Segment_Label', 'Hour', 'Total_Orders', 'Total_Revenue',
+                                   'Trigger_Class'], None),
+    'products_monthly': (['Description', 'YearMonth', 'Month_Quantity', 'Month_Value'], None),
+    'festival_top_products': (['Festival', 'Description', 'Quantity'], None),
+}
+
+
+# ---------------- Casting ---------------- #
+
+def _to_int(values, dtype):
+    """Declared integer dtype, or float32 when values are missing / fractional / out of range."""
+    values = pd.to_numeric(values, errors='coerce')
+    info = np.iinfo(dtype)
+    whole = values.notna().all() and (values == np.round(values)).all()
+    if whole and (len(values) == 0 or (values.min() >= info.min and values.max() <= info.max)):
+        return values.astype(dtype)
+    return values.astype('float32')
+
+
+def cast_column(values, dtype):
+    if dtype == 'category':
+        return values if isinstance(values.dtype, pd.CategoricalDtype) else values.astype('category')
+    if dtype.startswith('datetime'):
+        return pd.to_datetime(values, errors='coerce')
+    if dtype in ('int32', 'uint8'):
+        return _to_int(values, dtype)
+    return pd.to_numeric(values, errors='coerce').astype(dtype)
+
+
+def apply_schema(df):
+    """df with every declared column cast to its compact dtype (undeclared columns untouched)."""
+    df = df.copy()
+    for col in df.columns.intersection(list(COLUMN_TYPES)):
+        df[col] = cast_column(df[col], COLUMN_TYPES[col])
+    return df
+
+
+# ---------------- Contracts ---------------- #
+
+def contract_problems(df, table):
+    """List of contract violations (missing columns, null / duplicate keys, out-of-range values)."""
+    required, key = TABLES[table]
+    problems = []
+    missing = [c for c in required if c not in df.columns]
+    if missing:
+        problems.append(f"missing columns {missing}")
+    if key and key in df.columns:
+        if df[key].isna().any():
+            problems.append(f"{df[key].isna().sum()} rows without {key}")
+        if df[key].duplicated().any():
+            problems.append(f"{df[key].duplicated().sum()} duplicate {key} values")
+    for col, (low, high) in RANGES.items():
+        if col not in df.columns:
+            continue
+        values = pd.to_numeric(df[col], errors='coerce')
+        bad = (values < low) if low is not None else pd.Series(False, index=df.index)
+        if high is not None:
+            bad |= values > high
+        if bad.any():
+            problems.append(f"{bad.sum()} {col} values outside [{low}, {high}]")
+    return problems
+
+
+def validate(df, table):
+    problems = contract_problems(df, table)
+    if problems:
+        raise ValueError(f"{table}: " + "; ".join(problems))
+    return df
+
+
+# ---------------- I/O ---------------- #
+
+def read_table(path, table=None, **kwargs):
+    """read_csv with compact dtypes (categoricals parsed directly) and, given a table name, its contract checked."""
+    dtype = {c: 'category' for c in CATEGORY_COLUMNS}
+    dtype.update(kwargs.pop('dtype', {}))
+    df = apply_schema(pd.read_csv(path, dtype=dtype, **kwargs))
+    return validate(df, table) if table else df
+
+
+def write_table(df, path, table=None, **kwargs):
+    """Check the contract and write df as CSV in the compact schema (IDs and flags as integers)."""
+    df = apply_schema(df)
+    if table:
+        validate(df, table)
+    df.to_csv(path, index=False, **kwargs)
+    return df
+
+
+def memory_mb(df):
+    return df.memory_usage(deep=True).sum() / 2**20
+
+
+if __name__ == "__main__":
+    path, table = sys.argv[1], (sys.argv[2] if len(sys.argv) > 2 else None)
+    raw = pd.read_csv(path)
+    compact = read_table(path, table)
+    print(f"default dtypes: {memory_mb(raw):.2f} MB")
+    print(f"compact schema: {memory_mb(compact):.2f} MB  ({memory_mb(raw) / memory_mb(compact):.1f}x smaller)")
+    print(compact.dtypes.to_string())
@@ -0,0 +1,216 @@
+# scoring.py
+"""
+Batch Scoring for the Promotion, Churn and CLTV Models
+------------------------------------------------------
+Loads models/promotion_model.pkl, churn_model.pkl and cltv_model.pkl once
+and scores whole customer tables with one vectorized predict per chunk
+(optionally chunks are spread over a process pool, each worker loading the
+models once).
+
+Outputs are written back as columns:
+    Predicted_CLTV            (cltv_model)
+    Churn_Prob                (churn_model, probability of class 1)
+    Predicted_Promotion_Class (promotion_model bundle)
+
+Apps use BatchScorer.predict_many(customer_ids) instead of building one-row
+frames per Streamlit rerun.
+
+Nightly re-score:
+    python scoring.py promotion_dataset.csv promotion_scored.csv --jobs 4
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# The repo-level models/ folder, wherever the caller runs from (the pipeline runs in notebooks/)
+MODEL_DIR = Path(os.environ.get("RETAIL_MODEL_DIR", Path(__file__).resolve().parent.parent / "models"))
+PROMOTION_MODEL = "promotion_model.pkl"
+CHURN_MODEL = "churn_model.pkl"
+CLTV_MODEL = "cltv_model.pkl"
+MODEL_FILES = {'promotion': PROMOTION_MODEL, 'churn': CHURN_MODEL, 'cltv': CLTV_MODEL}
+
+# Fallback feature lists for models saved without feature_names_in_
+CHURN_FEATURES = ['Frequency', 'Recency', 'Monetary', 'AOV', 'PF', 'CLTV']
+CLTV_FEATURES = ['Frequency', 'Recency', 'Monetary', 'AOV', 'PF', 'ProfitMargin']
+
+OUTPUT_COLUMNS = {
+    'cltv': 'Predicted_CLTV',
+    'churn': 'Churn_Prob',
+    'promotion': 'Predicted_Promotion_Class',
+}
+CHUNK_SIZE = 250_000
+
+
+def _features(model, fallback):
+    names = getattr(model, 'feature_names_in_', None)
+    return list(names) if names is not None else list(fallback)
+
+
+def _load_model(path, fallback):
+    """(model, features) from a bare estimator or a {'model', 'encoder', 'features'} bundle (model_training.py)."""
+    model = joblib.load(path)
+    if isinstance(model, dict):
+        return model['model'], list(model['features'])
+    return model, _features(model, fallback)
+
+
+def _inputs(model, X):
+    """X as the model was fitted: a DataFrame for named-feature models, else a float32 matrix."""
+    if hasattr(model, 'feature_names_in_'):
+        return X
+    return X.to_numpy(dtype=np.float32)
+
+
+class BatchScorer:
+    """All three models, loaded once, scoring DataFrames in vectorized batches."""
+
+    def __init__(self, model_dir=MODEL_DIR):
+        self.model_dir = Path(model_dir)
+        self.models = {}
+        self.features = {}
+
+        path = self.model_dir / CLTV_MODEL
+        if path.exists():
+            self.models['cltv'], self.features['cltv'] = _load_model(path, CLTV_FEATURES)
+
+        path = self.model_dir / CHURN_MODEL
+        if path.exists():
+            self.models['churn'], self.features['churn'] = _load_model(path, CHURN_FEATURES)
+
+        path = self.model_dir / PROMOTION_MODEL
+        if path.exists():
+            bundle = joblib.load(path)
+            self.models['promotion'] = bundle['model']
+            self.promotion_encoder = bundle['encoder']
+            self.features['promotion'] = list(bundle['features'])
+
+        self._table = None
+        self._key = None
+        self._scored = None
+
+    # ---------------- Batch scoring ---------------- #
+
+    def _can_score(self, name, columns):
+        return name in self.models and set(self.features[name]) <= set(columns)
+
+    def _check(self, name, columns):
+        """ValueError unless model `name` is loaded and every feature it needs is in columns."""
+        if name not in self.models:
+            raise ValueError(f"{name} model not loaded: {self.model_dir / MODEL_FILES[name]} not found")
+        missing = [c for c in self.features[name] if c not in set(columns)]
+        if missing:
+            raise ValueError(f"{name} model needs columns {missing}")
+
+    def score(self, df, models=None):
+        """
+        Prediction columns for every row of df (index preserved). models=None
+        scores whichever loaded models df has the features for; models named
+        explicitly must be loaded and scorable (ValueError otherwise).
+        """
+        wanted = list(OUTPUT_COLUMNS) if models is None else list(models)
+        if models is not None:
+            unknown = [m for m in wanted if m not in OUTPUT_COLUMNS]
+            if unknown:
+                raise ValueError(f"Unknown models {unknown}; choose from {list(OUTPUT_COLUMNS)}")
+            for name in ('cltv', 'churn'):
+                if name in wanted:
+                    self._check(name, df.columns)
+            if 'promotion' in wanted:
+                # Churn_Prob may come from the churn model scored in the same call
+                self._check('promotion', list(df.columns) + (['Churn_Prob'] if 'churn' in wanted else []))
+        out = pd.DataFrame(index=df.index)
+
+        if 'cltv' in wanted and self._can_score('cltv', df.columns):
+            out[OUTPUT_COLUMNS['cltv']] = self.models['cltv'].predict(
+                _inputs(self.models['cltv'], df[self.features['cltv']]))
+
+        if 'churn' in wanted and self._can_score('churn', df.columns):
+            out[OUTPUT_COLUMNS['churn']] = self.models['churn'].predict_proba(
+                _inputs(self.models['churn'], df[self.features['churn']]))[:, 1]
+
+        if 'promotion' in wanted and 'promotion' in self.models:
+            X = df.copy()
+            if 'Churn_Prob' not in X.columns and OUTPUT_COLUMNS['churn'] in out.columns:
+                X['Churn_Prob'] = out[OUTPUT_COLUMNS['churn']]
+            if self._can_score('promotion', X.columns):
+                X = X[self.features['promotion']].copy()
+                X[['Value_Tier']] = self.promotion_encoder.transform(X[['Value_Tier']])
+                out[OUTPUT_COLUMNS['promotion']] = self.models['promotion'].predict(
+                    _inputs(self.models['promotion'], X))
+        return out
+
+    def score_table(self, df, models=None, chunk_size=CHUNK_SIZE, n_jobs=1):
+        """df with prediction columns added, scored chunk by chunk (n_jobs > 1 uses a process pool)."""
+        chunks = [df.iloc[start:start + chunk_size] for start in range(0, len(df), chunk_size)]
+        if n_jobs == 1 or len(chunks) <= 1:
+            parts = [self.score(chunk, models) for chunk in chunks]
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                     initargs=(str(self.model_dir),)) as pool:
+                parts = list(pool.map(_score_chunk, chunks, [models] * len(chunks)))
+
+        scored = df.copy()
+        if parts:
+            predictions = pd.concat(parts)
+            for col in predictions.columns:
+                scored[col] = predictions[col]
+        return scored
+
+    # ---------------- In-process lookups ---------------- #
+
+    def attach(self, customers, key='Customer_ID'):
+        """Register the customer table predict_many() looks ids up in."""
+        self._key = key
+        self._table = customers.drop_duplicates(subset=key).set_index(key, drop=False)
+        self._scored = pd.DataFrame(index=self._table.index[:0])
+        return self
+
+    def predict_many(self, customer_ids, models=None):
+        """Predictions for a list of customer ids; unseen ids are scored together in one batch."""
+        if self._table is None:
+            raise ValueError("Call attach(customer_table) before predict_many().")
+        ids = pd.Index(np.atleast_1d(customer_ids))
+        missing = ids.difference(self._scored.index).intersection(self._table.index)
+        if len(missing):
+            fresh = self.score(self._table.loc[missing], models)
+            self._scored = pd.concat([self._scored, fresh]) if len(self._scored) else fresh
+        return self._scored.reindex(ids)
+
+
+# ---------------- Process pool workers ---------------- #
+
+_worker_scorer = None
+
+
+def _init_worker(model_dir):
+    global _worker_scorer
+    _worker_scorer = BatchScorer(model_dir)
+
+
+def _score_chunk(chunk, models):
+    return _worker_scorer.score(chunk, models)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a customer table with the saved models.")
+    parser.add_argument("input_csv")
+    parser.add_argument("output_csv")
+    parser.add_argument("--models", nargs="+", choices=list(OUTPUT_COLUMNS), default=None)
+    parser.add_argument("--model-dir", default=str(MODEL_DIR))
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--jobs", type=int, default=1)
+    args = parser.parse_args()
+
+    from schema import read_table, write_table
+
+    table = read_table(args.input_csv)
+    scorer = BatchScorer(args.model_dir)
+    result = scorer.score_table(table, models=args.models, chunk_size=args.chunk_size, n_jobs=args.jobs)
+    write_table(result, args.output_csv)
+    print(f"✅ Scored {len(result):,} rows -> {args.output_csv}")
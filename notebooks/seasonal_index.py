@@ -0,0 +1,303 @@
+# seasonal_index.py
+"""
+Seasonal Demand Index
+---------------------
+festival_product_insight.py used to stream the 2009-2010 sheet and tag every
+line with hard-coded CHRISTMAS / XMAS keywords and months, and
+festival_promo_gui.py hard-coded the promotion windows. This module scans the
+store (all sheets) once into a per-product x calendar-week index:
+
+    Quantity / Sales_Value    scipy.sparse CSR, one row per Description,
+                              one column per week bin
+
+A week bin is a Monday-to-Sunday week, split at the 1st of a month when the
+month starts mid-week, so month-aligned festival windows are resolved
+exactly; other windows are resolved by each bin's first day.
+
+Festivals come from the calendar (promo_rules.FESTIVAL_CALENDAR, plus any
+entries in festival_calendar.json): date windows and keyword / exclude sets.
+Keywords are matched once over the index's product axis (vectorized
+str.contains), windows over its week axis, so top_n(festival) is two masks
+and one sparse product, answered without reading transactions. New festivals
+or years need only a calendar entry; refresh_index() folds in new store months
+(the newest indexed month is re-read, since it may have been incomplete).
+
+    python seasonal_index.py                              # build / refresh, top 10 per festival
+    python seasonal_index.py --festival Christmas --years 2010 --top 20
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from group_agg import group_top_k
+from instrument import instrumented
+from promo_rules import FESTIVAL_CALENDAR
+from retail_store import CHUNK_ROWS, STORE_DIR, iter_transactions, list_months
+from streaming import fold, merge_sums
+
+INDEX_FILE = "seasonal_index.npz"
+CALENDAR_FILE = Path(os.environ.get("RETAIL_FESTIVAL_CALENDAR", "festival_calendar.json"))
+INDEX_COLUMNS = ['InvoiceDate', 'Description', 'Quantity', 'Price']
+MEASURES = ['Quantity', 'Sales_Value']
+TOP_N = 10
+
+
+# ---------------- Calendar ---------------- #
+
+def load_calendar(path=CALENDAR_FILE):
+    """promo_rules.FESTIVAL_CALENDAR with the entries of the calendar file (if any) added or replaced."""
+    calendar = {name: dict(spec) for name, spec in FESTIVAL_CALENDAR.items()}
+    if path and Path(path).exists():
+        calendar.update(json.loads(Path(path).read_text()))
+    for name, spec in calendar.items():
+        if not spec.get('windows'):
+            raise ValueError(f"Festival {name}: no date windows")
+        for window in spec['windows'] + [spec.get('promotion') or spec['windows'][0]]:
+            if len(window) != 2 or any(len(day) not in (5, 10) for day in window):
+                raise ValueError(f"Festival {name}: windows must be ['MM-DD', 'MM-DD'] or "
+                                 f"['YYYY-MM-DD', 'YYYY-MM-DD'], got {window}")
+    return calendar
+
+
+def _month_day(days):
+    """MMDD integers of datetime64[D] values."""
+    dates = pd.DatetimeIndex(days)
+    return np.asarray(dates.month * 100 + dates.day)
+
+
+def in_windows(days, windows):
+    """Mask of the datetime64[D] days that fall in any window (inclusive; 'MM-DD' windows may wrap the year)."""
+    days = np.asarray(days, dtype='datetime64[D]')
+    month_day = _month_day(days)
+    mask = np.zeros(len(days), dtype=bool)
+    for start, end in windows:
+        if len(start) == 10:
+            mask |= (days >= np.datetime64(start)) & (days <= np.datetime64(end))
+        else:
+            low, high = int(start.replace('-', '')), int(end.replace('-', ''))
+            mask |= ((month_day >= low) & (month_day <= high)) if low <= high else \
+                ((month_day >= low) | (month_day <= high))
+    return mask
+
+
+def _pattern(words):
+    return '|'.join(re.escape(str(word).upper()) for word in words)
+
+
+def keyword_mask(descriptions, keywords=(), exclude=()):
+    """Products whose (upper-case) description contains any keyword ([] = all) and no exclude word."""
+    descriptions = pd.Series(descriptions, dtype='string')
+    mask = np.ones(len(descriptions), dtype=bool)
+    if keywords:
+        mask &= descriptions.str.contains(_pattern(keywords), regex=True, na=False).to_numpy(dtype=bool)
+    if exclude:
+        mask &= ~descriptions.str.contains(_pattern(exclude), regex=True, na=False).to_numpy(dtype=bool)
+    return mask
+
+
+def _day_label(day):
+    return pd.Timestamp(day).strftime('%d %B %Y') if len(day) == 10 else \
+        pd.Timestamp(f"2000-{day}").strftime('%d %B')
+
+
+def promotion_period(spec):
+    """
+    Recommended promotion window as text: the calendar's 'promotion' window,
+    else the 1st of the month before the first sales window to its end.
+    """
+    if spec.get('promotion'):
+        start, end = spec['promotion']
+    else:
+        start, end = spec['windows'][0]
+        first = (pd.Timestamp(start if len(start) == 10 else f"2000-{start}").to_period('M') - 1).start_time
+        start = first.strftime('%Y-%m-%d' if len(start) == 10 else '%m-%d')
+    return f"{_day_label(start)} to {_day_label(end)}"
+
+
+# ---------------- Build ---------------- #
+
+def week_bin(dates):
+    """First day of each date's week bin: its Monday, or the 1st when the month began later that week."""
+    day = dates.dt.normalize()
+    monday = day - pd.to_timedelta(day.dt.dayofweek, unit='D')
+    first = day - pd.to_timedelta(day.dt.day - 1, unit='D')
+    return monday.where(monday >= first, first)
+
+
+def index_partial(chunk):
+    """Quantity and Sales_Value per (Description, Week)."""
+    df = pd.DataFrame({
+        'Description': chunk['Description'].astype(str),
+        'Week': week_bin(chunk['InvoiceDate']),
+        'Quantity': chunk['Quantity'].astype('int64'),
+        'Sales_Value': chunk['Quantity'] * chunk['Price'],
+    })
+    return df.groupby(['Description', 'Week'], as_index=False).sum()
+
+
+def _csr(values, rows, cols, shape):
+    return sparse.coo_matrix((values, (rows, cols)), shape=shape).tocsr()
+
+
+class SeasonalIndex:
+    """Per-product x week-bin Quantity / Sales_Value with festival queries."""
+
+    def __init__(self, products, weeks, quantity, sales, months):
+        self.products = np.asarray(products).astype(str)
+        self.weeks = np.asarray(weeks, dtype='datetime64[D]')
+        self.quantity = sparse.csr_matrix(quantity)
+        self.sales = sparse.csr_matrix(sales)
+        self.months = sorted(months)
+        self._codes = {product: code for code, product in enumerate(self.products)}
+
+    @classmethod
+    def from_cells(cls, cells, months):
+        """Index from a long (Description, Week, Quantity, Sales_Value) table."""
+        products, rows = np.unique(cells['Description'].to_numpy(dtype=str), return_inverse=True)
+        weeks, cols = np.unique(cells['Week'].to_numpy(dtype='datetime64[D]'), return_inverse=True)
+        shape = (len(products), len(weeks))
+        return cls(products, weeks, _csr(cells['Quantity'].to_numpy(dtype=np.int64), rows, cols, shape),
+                   _csr(cells['Sales_Value'].to_numpy(dtype=np.float64), rows, cols, shape), months)
+
+    def cells(self):
+        """The non-empty cells as a long (Description, Week, Quantity, Sales_Value) table."""
+        q = self.quantity.tocoo()
+        return pd.DataFrame({
+            'Description': self.products[q.row],
+            'Week': self.weeks[q.col].astype('datetime64[ns]'),
+            'Quantity': q.data,
+            'Sales_Value': np.asarray(self.sales[q.row, q.col]).ravel(),
+        })
+
+    def save(self, path=INDEX_FILE):
+        arrays = {}
+        for name, matrix in (('quantity', self.quantity), ('sales', self.sales)):
+            arrays.update({f"{name}_data": matrix.data, f"{name}_indices": matrix.indices,
+                           f"{name}_indptr": matrix.indptr})
+        np.savez(path, products=self.products, weeks=self.weeks, months=np.asarray(self.months, dtype=str),
+                 **arrays)
+        return Path(path)
+
+    @classmethod
+    def load(cls, path=INDEX_FILE):
+        with np.load(path, allow_pickle=False) as data:
+            shape = (len(data['products']), len(data['weeks']))
+            matrices = [sparse.csr_matrix((data[f"{name}_data"], data[f"{name}_indices"], data[f"{name}_indptr"]),
+                                          shape=shape) for name in ('quantity', 'sales')]
+            return cls(data['products'], data['weeks'], *matrices, data['months'].tolist())
+
+    # ---------------- Queries ---------------- #
+
+    def week_mask(self, windows, years=None):
+        """Week bins whose first day falls in one of the windows (and, given years, in one of those years)."""
+        mask = in_windows(self.weeks, windows)
+        if years:
+            mask &= np.isin(pd.DatetimeIndex(self.weeks).year, [int(y) for y in years])
+        return mask
+
+    def totals(self, weeks):
+        """(Quantity, Sales_Value) per product summed over the selected week bins."""
+        return self.quantity @ weeks.astype(np.int64), self.sales @ weeks.astype(np.float64)
+
+    def top_n(self, festival, n=TOP_N, years=None, calendar=None, measure='Quantity'):
+        """Top n products of one festival (keywords x windows) by measure, largest first."""
+        calendar = calendar or load_calendar()
+        if festival not in calendar:
+            raise ValueError(f"Unknown festival: {festival} (calendar has {sorted(calendar)})")
+        spec = calendar[festival]
+        quantity, sales = self.totals(self.week_mask(spec['windows'], years))
+        candidates = np.flatnonzero(keyword_mask(self.products, spec.get('keywords', []), spec.get('exclude', []))
+                                    & (quantity > 0))
+        values = (quantity if measure == 'Quantity' else sales)[candidates]
+        top = candidates[group_top_k(None, values, n)]
+        return pd.DataFrame({'Festival': festival, 'Description': self.products[top],
+                             'Quantity': quantity[top], 'Sales_Value': sales[top].round(2)})
+
+    def top_table(self, n=TOP_N, years=None, calendar=None):
+        """top_n() of every calendar festival (festival_top_products.csv layout, festivals in name order)."""
+        calendar = calendar or load_calendar()
+        parts = [self.top_n(festival, n, years, calendar) for festival in sorted(calendar)]
+        return pd.concat(parts, ignore_index=True)
+
+    def weekly(self, products):
+        """Quantity per week bin (rows) for the given products (columns)."""
+        products = [p for p in products if p in self._codes]
+        rows = self.quantity[[self._codes[p] for p in products]].toarray().T
+        return pd.DataFrame(rows, index=pd.DatetimeIndex(self.weeks, name='Week'), columns=products)
+
+    def demand_index(self, products=None):
+        """
+        Seasonal demand index per product x ISO week of year: mean quantity in
+        that week across years over the product's mean weekly quantity
+        (1.0 = an average week).
+        """
+        codes = np.arange(len(self.products)) if products is None else [self._codes[p] for p in products]
+        dates = pd.DatetimeIndex(self.weeks)
+        week_of_year = dates.isocalendar().week.to_numpy(dtype=np.int64) - 1
+        mondays = dates - pd.to_timedelta(dates.dayofweek, unit='D')
+        # week bins of the same calendar week add up; count each calendar week once
+        first_bin = ~pd.Index(mondays).duplicated()
+        per_week = self.quantity[codes] @ sparse.csr_matrix(
+            (np.ones(len(dates)), (np.arange(len(dates)), week_of_year)), shape=(len(dates), 53))
+        weeks_seen = np.bincount(week_of_year[first_bin], minlength=53)
+        mean = per_week.toarray() / np.maximum(weeks_seen, 1)
+        overall = np.asarray(self.quantity[codes].sum(axis=1)).ravel() / max(int(first_bin.sum()), 1)
+        index = mean / np.where(overall > 0, overall, np.nan)[:, None]
+        return pd.DataFrame(index, index=self.products[codes], columns=np.arange(1, 54))
+
+
+@instrumented()
+def refresh_index(path=INDEX_FILE, store_dir=STORE_DIR, rebuild=False, chunk_rows=CHUNK_ROWS):
+    """Index with every store month folded in: new months plus the newest indexed one are (re)read."""
+    months = list_months(store_dir)
+    index = None if rebuild or not Path(path).exists() else SeasonalIndex.load(path)
+    if index is not None and not set(index.months) <= set(months):
+        index = None        # store was rebuilt with different months
+    folded = index.months if index is not None else []
+    redo = sorted(set(months) - set(folded) | set(folded[-1:]))
+    if index is not None and not redo:
+        return index
+
+    chunks = iter_transactions(columns=INDEX_COLUMNS, chunk_rows=chunk_rows, months=redo, store_dir=store_dir)
+    cells = fold(index_partial, merge_sums(['Description', 'Week']), chunks)
+    if index is not None:
+        kept = index.cells()
+        kept = kept[~kept['Week'].dt.strftime('%Y-%m').isin(redo)]
+        cells = kept if cells is None else pd.concat([kept, cells], ignore_index=True)
+    if cells is None:
+        cells = pd.DataFrame(columns=['Description', 'Week'] + MEASURES)
+    index = SeasonalIndex.from_cells(cells, sorted(set(folded) | set(redo)))
+    index.save(path)
+    print(f"Folded {len(redo)} month(s) into the seasonal index: "
+          f"{len(index.products):,} products x {len(index.weeks)} weeks")
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build / query the per-product x week seasonal demand index.")
+    parser.add_argument("--index", default=INDEX_FILE)
+    parser.add_argument("--calendar", default=str(CALENDAR_FILE))
+    parser.add_argument("--rebuild", action="store_true", help="rescan the whole store")
+    parser.add_argument("--festival", help="one festival (default: every calendar festival)")
+    parser.add_argument("--years", nargs="+", type=int)
+    parser.add_argument("--top", type=int, default=TOP_N)
+    args = parser.parse_args()
+
+    calendar = load_calendar(args.calendar)
+    index = refresh_index(args.index, rebuild=args.rebuild)
+    start = time.perf_counter()
+    if args.festival:
+        result = index.top_n(args.festival, args.top, args.years, calendar)
+    else:
+        result = index.top_table(args.top, args.years, calendar)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(result.to_string(index=False))
+    print(f"✅ {len(result)} rows from the index in {elapsed:.1f}ms")
@@ -0,0 +1,236 @@
+# segmentation.py
+"""
+Mini-Batch Customer Segmentation
+--------------------------------
+eda_segmentation.ipynb fits nine full KMeans models one after another for its
+elbow sweep, and behavioral_clustering.ipynb refits KMeans on every run. This
+module keeps both segmentations as persisted models:
+
+    rfm        Recency / Frequency / Monetary from the feature store,
+               StandardScaler-scaled                       (eda_segmentation.ipynb)
+    behavior   mean order Hour and most frequent Weekday per customer,
+               unscaled                                    (behavioral_clustering.ipynb)
+
+  - evaluate_k() fits MiniBatchKMeans for every candidate k in parallel
+    (joblib, one k per core) on a subsample of at most EVAL_ROWS customers and
+    reports inertia, silhouette (on SILHOUETTE_ROWS of them) and fit time,
+  - fit() trains MiniBatchKMeans on all customers and saves
+    models/segments_<name>.pkl as {'model', 'scaler', 'features', ...}
+    (the scaler is None for unscaled features),
+  - assign() labels new or updated customers against the saved centroids in
+    chunks, without refitting, so cluster numbers stay stable day to day.
+
+Behavioural features are streamed from the store (per-customer hour sums and
+weekday counts merged chunk by chunk), never loading every line at once.
+
+    python segmentation.py rfm --evaluate 1-9        # elbow table
+    python segmentation.py rfm --fit --k 4           # (re)train and save
+    python segmentation.py behavior                  # assign with the saved model
+"""
+
+import argparse
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.metrics import silhouette_score
+from sklearn.preprocessing import StandardScaler
+
+from instrument import instrumented, stage
+from retail_store import CHUNK_ROWS, STORE_DIR, iter_transactions
+from scoring import MODEL_DIR
+from streaming import fold, merge_sums
+
+RANDOM_STATE = 42
+BATCH_SIZE = 4096
+EVAL_ROWS = 100_000
+SILHOUETTE_ROWS = 5_000
+ASSIGN_CHUNK = 1_000_000
+
+
+@dataclass
+class Segmentation:
+    name: str
+    features: list
+    k: int
+    scale: bool
+    label: str
+    out_file: str
+
+    @property
+    def model_file(self):
+        return f"segments_{self.name}.pkl"
+
+
+SEGMENTATIONS = {
+    'rfm': Segmentation('rfm', ['Recency', 'Frequency', 'Monetary'], 4, True, 'Cluster', 'rfm_segments.csv'),
+    'behavior': Segmentation('behavior', ['Hour', 'Weekday'], 3, False, 'BehaviorCluster',
+                             'behavioral_segments.csv'),
+}
+
+
+# ---------------- Features ---------------- #
+
+def rfm_features(features=None):
+    """Customer ID / Recency / Frequency / Monetary from the feature store (as eda_segmentation.ipynb)."""
+    if features is None:
+        from feature_store import refresh_features
+        features = refresh_features()
+    return pd.DataFrame({
+        'Customer ID': features['Customer_ID'],
+        'Recency': features['Days_Since_Last_Purchase'],
+        'Frequency': features['Invoices'],
+        'Monetary': features['Monetary'],
+    })
+
+
+def behavior_partial(chunk):
+    """Per customer: line count, sum of order hours and lines per weekday."""
+    weekday = chunk['InvoiceDate'].dt.dayofweek.to_numpy()
+    df = pd.DataFrame({'Customer ID': chunk['Customer ID'], 'Lines': 1,
+                       'Hour_Sum': chunk['InvoiceDate'].dt.hour.astype('int64')})
+    for day in range(7):
+        df[f'Weekday_{day}'] = (weekday == day).astype('int64')
+    return df.groupby('Customer ID', as_index=False).sum()
+
+
+@instrumented()
+def behavior_features(chunk_rows=CHUNK_ROWS, store_dir=STORE_DIR):
+    """Mean line Hour and modal Weekday (smallest on ties) per customer, streamed from the store."""
+    chunks = iter_transactions(columns=['Customer ID', 'InvoiceDate'], chunk_rows=chunk_rows,
+                               require_customer=True, store_dir=store_dir)
+    totals = fold(behavior_partial, merge_sums(['Customer ID']), chunks)
+    counts = totals[[f'Weekday_{day}' for day in range(7)]].to_numpy()
+    return pd.DataFrame({
+        'Customer ID': totals['Customer ID'],
+        'Hour': totals['Hour_Sum'] / totals['Lines'],
+        'Weekday': counts.argmax(axis=1),      # first maximum = smallest weekday, like group_mode
+    })
+
+
+FEATURE_BUILDERS = {'rfm': rfm_features, 'behavior': behavior_features}
+
+
+# ---------------- Model ---------------- #
+
+def _matrix(df, seg, scaler=None):
+    X = df[seg.features].to_numpy(dtype=np.float64)
+    return scaler.transform(X) if scaler is not None else X
+
+
+def _fit_k(X, k, silhouette_rows):
+    start = time.perf_counter()
+    model = MiniBatchKMeans(n_clusters=k, batch_size=BATCH_SIZE, n_init=3, random_state=RANDOM_STATE).fit(X)
+    fit_s = time.perf_counter() - start
+    silhouette = np.nan
+    if 1 < k < len(X):
+        silhouette = silhouette_score(X, model.labels_, sample_size=min(silhouette_rows, len(X)),
+                                      random_state=RANDOM_STATE)
+    return {'k': k, 'inertia': model.inertia_, 'silhouette': silhouette, 'fit_s': fit_s}
+
+
+def evaluate_k(df, seg, ks=range(1, 10), sample_rows=EVAL_ROWS, n_jobs=-1):
+    """Inertia / silhouette / fit time per candidate k, fitted in parallel on a subsample."""
+    if isinstance(seg, str):
+        seg = SEGMENTATIONS[seg]
+    sample = df.sample(n=sample_rows, random_state=RANDOM_STATE) if len(df) > sample_rows else df
+    X = _matrix(sample, seg)
+    if seg.scale:
+        X = StandardScaler().fit_transform(X)
+    rows = Parallel(n_jobs=n_jobs)(delayed(_fit_k)(X, k, SILHOUETTE_ROWS) for k in ks)
+    return pd.DataFrame(rows)
+
+
+def elbow_k(evaluation):
+    """k at the elbow: the point farthest from the line joining the first and last inertia."""
+    k = evaluation['k'].to_numpy(dtype=float)
+    inertia = evaluation['inertia'].to_numpy(dtype=float)
+    if len(k) < 3:
+        return int(k[-1])
+    x = (k - k[0]) / (k[-1] - k[0])
+    y = (inertia - inertia[-1]) / max(inertia[0] - inertia[-1], 1e-12)
+    return int(k[np.argmax(np.abs(x + y - 1))])
+
+
+def fit(df, seg, k=None, model_dir=MODEL_DIR):
+    """Train MiniBatchKMeans on every customer in df and save the bundle; returns it."""
+    if isinstance(seg, str):
+        seg = SEGMENTATIONS[seg]
+    scaler = StandardScaler().fit(df[seg.features].to_numpy(dtype=np.float64)) if seg.scale else None
+    X = _matrix(df, seg, scaler)
+    start = time.perf_counter()
+    model = MiniBatchKMeans(n_clusters=k or seg.k, batch_size=BATCH_SIZE, n_init=3,
+                            random_state=RANDOM_STATE).fit(X)
+    bundle = {'model': model, 'scaler': scaler, 'features': list(seg.features),
+              'version': time.strftime('%Y%m%d_%H%M%S'), 'customers': int(len(df)),
+              'inertia': float(model.inertia_), 'fit_s': round(time.perf_counter() - start, 3)}
+    Path(model_dir).mkdir(parents=True, exist_ok=True)
+    joblib.dump(bundle, Path(model_dir) / seg.model_file)
+    return bundle
+
+
+def load(seg, model_dir=MODEL_DIR):
+    if isinstance(seg, str):
+        seg = SEGMENTATIONS[seg]
+    return joblib.load(Path(model_dir) / seg.model_file)
+
+
+def assign(df, seg, bundle=None, model_dir=MODEL_DIR, chunk_size=ASSIGN_CHUNK):
+    """Cluster of every row of df against the saved centroids (no refit), as a Series."""
+    if isinstance(seg, str):
+        seg = SEGMENTATIONS[seg]
+    bundle = bundle or load(seg, model_dir)
+    labels = np.empty(len(df), dtype=np.int32)
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start:start + chunk_size]
+        labels[start:start + chunk_size] = bundle['model'].predict(_matrix(chunk, seg, bundle['scaler']))
+    return pd.Series(labels, index=df.index, name=seg.label)
+
+
+def _parse_ks(text):
+    if '-' in text:
+        low, high = text.split('-')
+        return list(range(int(low), int(high) + 1))
+    return [int(k) for k in text.split(',')]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mini-batch k-means RFM / behavioural segmentation.")
+    parser.add_argument("segmentation", choices=list(SEGMENTATIONS))
+    parser.add_argument("--evaluate", metavar="KS", help="candidate k values, e.g. 1-9 or 3,4,5")
+    parser.add_argument("--fit", action="store_true", help="retrain even if a saved model exists")
+    parser.add_argument("--k", type=int)
+    parser.add_argument("--jobs", type=int, default=-1)
+    parser.add_argument("--model-dir", default=str(MODEL_DIR))
+    parser.add_argument("--out", help="segments csv (default: the segmentation's output file)")
+    args = parser.parse_args()
+
+    seg = SEGMENTATIONS[args.segmentation]
+    with stage(f"{seg.name}_features") as s:
+        data = s.output(FEATURE_BUILDERS[seg.name]())
+
+    if args.evaluate:
+        with stage("evaluate_k", inputs=data):
+            evaluation = evaluate_k(data, seg, _parse_ks(args.evaluate), n_jobs=args.jobs)
+        print(evaluation.round(4).to_string(index=False))
+        print(f"✅ Elbow at k={elbow_k(evaluation)}")
+    else:
+        model_path = Path(args.model_dir) / seg.model_file
+        if args.fit or not model_path.exists():
+            with stage("fit", inputs=data):
+                bundle = fit(data, seg, args.k, args.model_dir)
+            print(f"✅ Trained k={bundle['model'].n_clusters} on {bundle['customers']:,} customers "
+                  f"in {bundle['fit_s']}s -> {model_path}")
+        else:
+            bundle = load(seg, args.model_dir)
+        with stage("assign", inputs=data) as s:
+            data[seg.label] = s.output(assign(data, seg, bundle))
+        out = args.out or seg.out_file
+        data.to_csv(out, index=False)
+        print(f"✅ {len(data):,} customers segmented (model {bundle['version']}) -> {out}")
+        print(data[seg.label].value_counts().sort_index().to_string())
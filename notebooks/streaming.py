@@ -0,0 +1,151 @@
+# streaming.py
+"""
+Streaming Partial Aggregates
+----------------------------
+Chunked versions of the aggregations that used to need the whole transaction
+history in one DataFrame. Each stage is a pair of functions:
+
+    partial(chunk) -> small DataFrame keyed by the group columns
+    merge(a, b)    -> the same DataFrame for the lines of a and b together
+
+fold() reads the store chunk by chunk (retail_store.iter_transactions) and
+merges every partial into a running total, so peak memory is one chunk plus
+the aggregate (customers, products x months, ...) however many years of
+history the store holds. Invoice counts rely on iter_transactions' chunk
+contract (an invoice is never split across chunks).
+
+Stages:
+  - customer RFM state          feature_store.month_aggregates / merge_aggregates
+  - hourly trigger counts       hourly_partial      (promotion_trigger_analysis.ipynb)
+  - festival quantity sums      festival_partial    (month-tagged; festival_product_insight.py
+                                                     now uses seasonal_index.py)
+  - monthly product series      monthly_partial     (top_items_analysis.ipynb,
+                                                     low_sellers_analysis.ipynb)
+"""
+
+import pandas as pd
+
+from instrument import instrumented
+from retail_store import CHUNK_ROWS, STORE_DIR, iter_transactions
+from promo_rules import festival_tag
+
+HOURLY_COLUMNS = ['Invoice', 'InvoiceDate', 'Price', 'Customer ID']
+FESTIVAL_COLUMNS = ['InvoiceDate', 'Description', 'Quantity']
+MONTHLY_COLUMNS = ['Invoice', 'Description', 'Quantity', 'InvoiceDate', 'Price']
+
+
+def fold(partial, merge, chunks):
+    """Merge partial(chunk) of every chunk into one aggregate (None if there were no chunks)."""
+    total = None
+    for chunk in chunks:
+        part = partial(chunk)
+        total = part if total is None else merge(total, part)
+    return total
+
+
+def merge_sums(keys):
+    """merge() for partials whose value columns are all additive."""
+    def merge(a, b):
+        return pd.concat([a, b], ignore_index=True).groupby(keys, as_index=False, observed=True).sum()
+    return merge
+
+
+# ---------------- Hourly triggers ---------------- #
+
+def hourly_partial(chunk, segments):
+    """Orders and revenue per (CLTV_Segment_Label, Hour); segments maps Customer_ID -> CLTV_Segment_Label."""
+    df = chunk.rename(columns={'Customer ID': 'Customer_ID'}).merge(segments, on='Customer_ID', how='left')
+    df['Hour'] = df['InvoiceDate'].dt.hour
+    return (
+        df.groupby(['CLTV_Segment_Label', 'Hour'])
+          .agg(Total_Orders=('Invoice', 'nunique'),
+               Total_Revenue=('Price', 'sum'))
+          .reset_index()
+    )
+
+
+@instrumented()
+def hourly_orders(segments, chunk_rows=CHUNK_ROWS, store_dir=STORE_DIR):
+    keys = ['CLTV_Segment_Label', 'Hour']
+    chunks = iter_transactions(columns=HOURLY_COLUMNS, chunk_rows=chunk_rows, require_customer=True,
+                               store_dir=store_dir)
+    hourly = fold(lambda chunk: hourly_partial(chunk, segments), merge_sums(keys), chunks)
+    return hourly.sort_values(keys).reset_index(drop=True)
+
+
+# ---------------- Festival quantities ---------------- #
+
+def festival_partial(chunk):
+    """Quantity per (Festival, Description) for festival-tagged lines."""
+    description = chunk['Description'].astype(str)     # normalised (upper-case) by the store
+    festival = festival_tag(description, chunk['InvoiceDate'].dt.month)
+    tagged = festival.notnull()
+    return (
+        pd.DataFrame({'Festival': festival[tagged], 'Description': description[tagged],
+                      'Quantity': chunk['Quantity'][tagged]})
+        .groupby(['Festival', 'Description'])['Quantity']
+        .sum()
+        .reset_index()
+    )
+
+
+@instrumented()
+def festival_quantities(sheets=None, chunk_rows=CHUNK_ROWS, store_dir=STORE_DIR):
+    keys = ['Festival', 'Description']
+    chunks = iter_transactions(columns=FESTIVAL_COLUMNS, chunk_rows=chunk_rows, sheets=sheets,
+                               store_dir=store_dir)
+    totals = fold(festival_partial, merge_sums(keys), chunks)
+    return totals.sort_values(keys).reset_index(drop=True)
+
+
+# ---------------- Monthly product series ---------------- #
+
+def monthly_partial(chunk):
+    """
+    Per (YearMonth, Description): Month_Value, Month_Quantity, Orders, plus
+    Price_Sum / Lines so product-level Avg_Price can be rebuilt after merging.
+    """
+    df = pd.DataFrame({
+        'YearMonth': chunk['InvoiceDate'].dt.to_period('M').dt.to_timestamp(),
+        'Description': chunk['Description'],
+        'Invoice': chunk['Invoice'],
+        'Quantity': chunk['Quantity'],
+        'Price': chunk['Price'],
+        'SalesValue': chunk['Quantity'] * chunk['Price'],
+    })
+    return (
+        df.groupby(['YearMonth', 'Description'])
+          .agg(Month_Value=('SalesValue', 'sum'),
+               Month_Quantity=('Quantity', 'sum'),
+               Orders=('Invoice', 'nunique'),
+               Price_Sum=('Price', 'sum'),
+               Lines=('Price', 'size'))
+          .reset_index()
+    )
+
+
+@instrumented()
+def monthly_product_series(start=None, end=None, chunk_rows=CHUNK_ROWS, store_dir=STORE_DIR):
+    """Monthly series for every product between start and end (inclusive InvoiceDate bounds)."""
+    keys = ['YearMonth', 'Description']
+    chunks = iter_transactions(columns=MONTHLY_COLUMNS, chunk_rows=chunk_rows, start=start, end=end,
+                               store_dir=store_dir)
+    monthly = fold(monthly_partial, merge_sums(keys), chunks)
+    if monthly is None:
+        return pd.DataFrame(columns=keys + ['Month_Value', 'Month_Quantity', 'Orders', 'Price_Sum', 'Lines'])
+    return monthly.sort_values(keys).reset_index(drop=True)
+
+
+def product_totals(monthly):
+    """Total_Value, Total_Quantity, Orders and Avg_Price per product from monthly_product_series()."""
+    totals = (
+        monthly.groupby('Description')
+        .agg(Total_Value=('Month_Value', 'sum'),
+             Total_Quantity=('Month_Quantity', 'sum'),
+             Orders=('Orders', 'sum'),
+             Price_Sum=('Price_Sum', 'sum'),
+             Lines=('Lines', 'sum'))
+        .reset_index()
+    )
+    totals['Avg_Price'] = totals['Price_Sum'] / totals['Lines']
+    return totals.drop(columns=['Price_Sum', 'Lines'])
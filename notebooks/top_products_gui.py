@@ -1,21 +1,28 @@
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+from app_artifacts import open_table
+from instrument import stage
+
+# set_page_config must be the first Streamlit call, before the tables are opened
+st.set_page_config(page_title="Top Products Planning", layout="wide")
+
+@st.cache_resource
+def load_tables():
+    # Memory-mapped artifacts indexed by Description, built offline (python app_artifacts.py)
+    # and opened once per server process
+    return open_table("top_products_plan"), open_table("top_products_monthly")
 
 # Load the forecast action plan
-forecast_file = r"E:\c drive\project\notebooks\outputs_top_items_forecast\top10_forecast_action_plan.csv"
-df = pd.read_csv(forecast_file)
+plan_table, monthly_table = load_tables()
 
-st.set_page_config(page_title="Top Products Planning", layout="wide")
 st.title("📦 Top Products Forecast & Planning")
 
 # Dropdown for product selection
-product_list = df['Description'].tolist()
+product_list = plan_table.keys.tolist()
 selected_product = st.selectbox("Select a Product:", product_list)
 
 # Get product details
-product_data = df[df['Description'] == selected_product].iloc[0]
+with stage("lookup_plan"):
+    product_data = plan_table.row(selected_product)
 
 # Show key metrics
 col1, col2, col3 = st.columns(3)
@@ -25,17 +32,23 @@ col3.metric("Promo Month", product_data['Promo_Preparation_Month_Name'])
 
 st.write("---")
 
-# Load monthly history to plot trend
-monthly_file = r"E:\c drive\project\notebooks\outputs_top_items\top10_products_monthly.csv"
-df_monthly = pd.read_csv(monthly_file, parse_dates=['YearMonth'])
-
-product_history = df_monthly[df_monthly['Description'] == selected_product]
+# Monthly history to plot trend (only this product's rows are read)
+with stage("lookup_history") as s:
+    product_history = s.output(monthly_table.rows(selected_product))
 
 st.subheader("📈 Monthly Sales Trend")
-fig, ax = plt.subplots(figsize=(10, 5))
-sns.lineplot(data=product_history, x='YearMonth', y='Month_Quantity', marker='o', ax=ax)
-plt.title(f"Monthly Quantity - {selected_product}")
-plt.xlabel("Month")
-plt.ylabel("Quantity Sold")
-st.pyplot(fig)
-
+# Streamlit's built-in chart: no matplotlib/seaborn import on the first render
+st.caption(f"Monthly Quantity - {selected_product}")
+st.line_chart(product_history, x='YearMonth', y='Month_Quantity', x_label="Month", y_label="Quantity Sold")
+
+if st.checkbox("Show detailed (matplotlib) chart"):
+    # Plotting libraries are only imported when this chart is asked for
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    fig, ax = plt.subplots(figsize=(10, 5))
+    sns.lineplot(data=product_history, x='YearMonth', y='Month_Quantity', marker='o', ax=ax)
+    plt.title(f"Monthly Quantity - {selected_product}")
+    plt.xlabel("Month")
+    plt.ylabel("Quantity Sold")
+    st.pyplot(fig)
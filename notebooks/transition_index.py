@@ -0,0 +1,198 @@
+# transition_index.py
+"""
+Product Transition Index
+------------------------
+Vectorized replacement for the per-customer Python loop and defaultdict in
+next_product_prediction.ipynb.
+
+  - Descriptions are encoded as integer codes and lines are sorted by
+    (Customer ID, InvoiceDate); consecutive pairs come from the code array
+    shifted by one row (within the same customer) and are
+    counted into a sparse From x To COO/CSR matrix.
+  - The top-K successors of every item are picked in one pass over the CSR
+    data (sorted by row and descending count), not by filtering per item.
+  - The index (item labels, count matrix, top-K successor codes/counts and
+    each customer's last item) is saved as a compact .npz that
+    predict_next_item() loads in milliseconds.
+  - update() folds in new invoice months: each customer's last known item is
+    chained to their first new purchase, so counts equal a full rebuild.
+
+Build the index:
+    python transition_index.py
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+INDEX_FILE = Path("./outputs_recommendations/transition_index.npz")
+TOP_K = 10
+NO_TRANSITION = "No strong transition found"
+
+
+def _sorted_lines(df, user_col, item_col):
+    return df.sort_values([user_col, 'InvoiceDate'], kind='stable')[[user_col, 'InvoiceDate', item_col]]
+
+
+def _pair_counts(from_codes, to_codes, n_items):
+    counts = sparse.coo_matrix(
+        (np.ones(len(from_codes), dtype=np.int64), (from_codes, to_codes)),
+        shape=(n_items, n_items)
+    )
+    return counts.tocsr()  # duplicate pairs are summed here
+
+
+def _top_successors(counts, k):
+    """(codes, counts) arrays of shape (n_items, k), ranked by descending count (ties by code)."""
+    coo = counts.tocoo()
+    order = np.lexsort((coo.col, -coo.data, coo.row))
+    row, col, data = coo.row[order], coo.col[order], coo.data[order]
+    rank = np.arange(len(row)) - np.searchsorted(row, row)
+    top = rank < k
+
+    successors = np.full((counts.shape[0], k), -1, dtype=np.int32)
+    successor_counts = np.zeros((counts.shape[0], k), dtype=np.int64)
+    successors[row[top], rank[top]] = col[top]
+    successor_counts[row[top], rank[top]] = data[top]
+    return successors, successor_counts
+
+
+class TransitionIndex:
+    """Item -> next-item transition counts with top-K successor lists."""
+
+    def __init__(self, items, counts, customers, last_codes, last_dates, k=TOP_K):
+        self.items = np.asarray(items).astype(str)
+        self.counts = counts.tocsr()
+        self.customers = np.asarray(customers)
+        self.last_codes = np.asarray(last_codes, dtype=np.int32)
+        self.last_dates = np.asarray(last_dates, dtype='datetime64[ns]')
+        self.k = k
+        self._item_codes = {item: code for code, item in enumerate(self.items)}
+        self.successors, self.successor_counts = _top_successors(self.counts, k)
+
+    # ---------------- Build / update ---------------- #
+
+    @classmethod
+    def build(cls, df, k=TOP_K, user_col='Customer ID', item_col='Description'):
+        """df needs Customer ID, InvoiceDate and Description columns."""
+        lines = _sorted_lines(df, user_col, item_col)
+        codes, items = pd.factorize(lines[item_col], sort=True)
+        users = lines[user_col].to_numpy()
+
+        same_customer = users[1:] == users[:-1]
+        counts = _pair_counts(codes[:-1][same_customer], codes[1:][same_customer], len(items))
+
+        is_last = np.append(~same_customer, True)
+        return cls(items, counts, users[is_last], codes[is_last],
+                   lines['InvoiceDate'].to_numpy()[is_last], k=k)
+
+    def update(self, new_df, user_col='Customer ID', item_col='Description'):
+        """Fold in lines from new invoice months (all later than the indexed history)."""
+        lines = _sorted_lines(new_df, user_col, item_col)
+        if lines.empty:
+            return self
+
+        # Extend the vocabulary; existing codes never change
+        labels = lines[item_col].astype(str).to_numpy()
+        codes = pd.Index(self.items).get_indexer(labels)
+        unseen = pd.unique(labels[codes < 0])
+        if len(unseen):
+            codes[codes < 0] = len(self.items) + pd.Index(unseen).get_indexer(labels[codes < 0])
+            items = np.concatenate([self.items, unseen.astype(str)])
+        else:
+            items = self.items
+        n_items = len(items)
+
+        users = lines[user_col].to_numpy()
+        same_customer = users[1:] == users[:-1]
+        from_codes = [codes[:-1][same_customer]]
+        to_codes = [codes[1:][same_customer]]
+
+        # Chain each returning customer's previous last item to their first new item
+        is_first = np.insert(~same_customer, 0, True)
+        first_users, first_codes = users[is_first], codes[is_first]
+        if len(self.customers):
+            pos = np.searchsorted(self.customers, first_users).clip(max=len(self.customers) - 1)
+            known = self.customers[pos] == first_users
+        else:
+            pos = np.zeros(len(first_users), dtype=np.int64)
+            known = np.zeros(len(first_users), dtype=bool)
+        from_codes.append(self.last_codes[pos[known]])
+        to_codes.append(first_codes[known])
+
+        counts = self.counts.copy()
+        counts.resize((n_items, n_items))
+        counts = counts + _pair_counts(np.concatenate(from_codes), np.concatenate(to_codes), n_items)
+
+        # Merge per-customer last item state
+        is_last = np.append(~same_customer, True)
+        state = pd.DataFrame({'customer': self.customers, 'code': self.last_codes, 'date': self.last_dates})
+        fresh = pd.DataFrame({'customer': users[is_last], 'code': codes[is_last].astype(np.int32),
+                              'date': lines['InvoiceDate'].to_numpy()[is_last]})
+        state = (pd.concat([state, fresh], ignore_index=True)
+                   .drop_duplicates(subset='customer', keep='last')
+                   .sort_values('customer'))
+
+        self.__init__(items, counts, state['customer'].to_numpy(), state['code'].to_numpy(),
+                      state['date'].to_numpy(), k=self.k)
+        return self
+
+    # ---------------- Persistence ---------------- #
+
+    def save(self, path=INDEX_FILE):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(path, items=self.items, indptr=self.counts.indptr, indices=self.counts.indices,
+                 data=self.counts.data, customers=self.customers, last_codes=self.last_codes,
+                 last_dates=self.last_dates, successors=self.successors,
+                 successor_counts=self.successor_counts)
+        return path
+
+    @classmethod
+    def load(cls, path=INDEX_FILE):
+        """Load a saved index without recomputing successor lists."""
+        with np.load(path, allow_pickle=False) as data:
+            index = cls.__new__(cls)
+            index.items = data['items']
+            n_items = len(index.items)
+            index.counts = sparse.csr_matrix((data['data'], data['indices'], data['indptr']),
+                                             shape=(n_items, n_items))
+            index.customers = data['customers']
+            index.last_codes = data['last_codes']
+            index.last_dates = data['last_dates']
+            index.successors = data['successors']
+            index.successor_counts = data['successor_counts']
+        index.k = index.successors.shape[1]
+        index._item_codes = {item: code for code, item in enumerate(index.items)}
+        return index
+
+    # ---------------- Queries ---------------- #
+
+    def top_successors(self, current, top_n=5):
+        """[(next_item, count), ...] for the most frequent items bought right after `current`."""
+        code = self._item_codes.get(current)
+        if code is None:
+            return []
+        found = self.successors[code, :top_n]
+        valid = found >= 0
+        return list(zip(self.items[found[valid]].tolist(),
+                        self.successor_counts[code, :top_n][valid].tolist()))
+
+    def predict_next_item(self, current):
+        successors = self.top_successors(current, 1)
+        return successors[0][0] if successors else NO_TRANSITION
+
+    def to_frame(self):
+        """From / To / Count table (the old product_transitions.csv layout)."""
+        coo = self.counts.tocoo()
+        return pd.DataFrame({'From': self.items[coo.row], 'To': self.items[coo.col], 'Count': coo.data})
+
+
+if __name__ == "__main__":
+    from retail_store import load_transactions
+
+    df = load_transactions(columns=['Customer ID', 'InvoiceDate', 'Description'], require_customer=True)
+    index = TransitionIndex.build(df)
+    print(f"✅ Saved {index.counts.nnz:,} transitions over {len(index.items):,} items: {index.save()}")
@@ -0,0 +1,211 @@
+# trigger_cube.py
+"""
+Hourly Trigger Cube
+-------------------
+promotion_trigger_analysis.ipynb only aggregates orders into
+CLTV_Segment x Hour. This builder pre-aggregates the transaction store once
+into a dense cube over
+
+    CLTV_Segment_Label x Hour (0-23) x Weekday (0=Mon) x Country x Month (1-12)
+
+with three additive measures per cell:
+
+    Total_Orders     distinct invoices, each counted in the cell of its first
+                     line (chunks never split an invoice, see iter_transactions)
+    Total_Revenue    sum of line Price, as in promotion_hourly_triggers.csv
+    Sales_Value      sum of Quantity * Price
+
+The store is streamed chunk by chunk (streaming.fold) and saved as one .npz
+of axis labels + one array per measure. TriggerCube.query(by, where) answers
+any slice with NumPy takes and sums over the cube axes (no raw rows), and
+classifies HOT / WARM / COLD hours per slice with promo_rules.trigger_class.
+cube.query(['CLTV_Segment_Label', 'Hour']) reproduces the old trigger table.
+
+    python trigger_cube.py                                          # build
+    python trigger_cube.py --by Hour --where CLTV_Segment_Label=A Country="United Kingdom" Weekday=5,6
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from instrument import instrumented, stage
+from promo_rules import trigger_class
+from retail_store import CHUNK_ROWS, STORE_DIR, iter_transactions
+from schema import read_table
+from streaming import fold, merge_sums
+
+CLTV_FILE = "cltv_with_predictions.csv"
+CUBE_FILE = "trigger_cube.npz"
+
+DIMENSIONS = ['CLTV_Segment_Label', 'Hour', 'Weekday', 'Country', 'Month']
+MEASURES = ['Total_Orders', 'Total_Revenue', 'Sales_Value']
+FIXED_AXES = {'Hour': np.arange(24), 'Weekday': np.arange(7), 'Month': np.arange(1, 13)}
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+CUBE_COLUMNS = ['Invoice', 'InvoiceDate', 'Price', 'Quantity', 'Customer ID', 'Country']
+
+
+# ---------------- Build ---------------- #
+
+def cube_partial(chunk, segments):
+    """Measures per (segment, hour, weekday, country, month) cell; segments maps Customer_ID -> label."""
+    df = chunk.rename(columns={'Customer ID': 'Customer_ID'}).merge(segments, on='Customer_ID', how='left')
+    date = df['InvoiceDate']
+    cells = pd.DataFrame({
+        'CLTV_Segment_Label': df['CLTV_Segment_Label'],
+        'Hour': date.dt.hour.astype('int8'),
+        'Weekday': date.dt.dayofweek.astype('int8'),
+        'Country': df['Country'].astype(str),
+        'Month': date.dt.month.astype('int8'),
+        'Total_Revenue': df['Price'],
+        'Sales_Value': df['Quantity'] * df['Price'],
+    })
+    sums = cells.groupby(DIMENSIONS, observed=True)[['Total_Revenue', 'Sales_Value']].sum()
+    # First line of each invoice, so orders per cell is a plain count
+    orders = cells[~df['Invoice'].duplicated().to_numpy()].groupby(DIMENSIONS, observed=True).size()
+    return sums.assign(Total_Orders=orders).reset_index()[DIMENSIONS + MEASURES]
+
+
+class TriggerCube:
+    """Dense measure arrays over DIMENSIONS, with slice / roll-up queries."""
+
+    def __init__(self, axes, measures):
+        self.axes = {dim: np.asarray(axes[dim]) for dim in DIMENSIONS}
+        self.measures = {m: np.asarray(measures[m]) for m in MEASURES}
+        self._positions = {dim: {v: i for i, v in enumerate(labels.tolist())} for dim, labels in self.axes.items()}
+
+    @classmethod
+    def from_cells(cls, cells):
+        """Cube from a long (DIMENSIONS + MEASURES) table of non-empty cells."""
+        axes, codes = {}, []
+        for dim in DIMENSIONS:
+            if dim in FIXED_AXES:
+                axes[dim] = FIXED_AXES[dim]
+                codes.append(cells[dim].to_numpy(dtype=np.int64) - FIXED_AXES[dim][0])
+            else:
+                code, labels = pd.factorize(cells[dim].astype(str), sort=True)
+                axes[dim] = np.asarray(labels, dtype=str)
+                codes.append(code)
+        shape = tuple(len(axes[dim]) for dim in DIMENSIONS)
+        measures = {}
+        for m in MEASURES:
+            arr = np.zeros(shape, dtype=np.int32 if m == 'Total_Orders' else np.float64)
+            np.add.at(arr, tuple(codes), cells[m].to_numpy())
+            measures[m] = arr
+        return cls(axes, measures)
+
+    def save(self, path=CUBE_FILE):
+        np.savez(path, **{f"axis_{dim}": labels for dim, labels in self.axes.items()}, **self.measures)
+        return Path(path)
+
+    @classmethod
+    def load(cls, path=CUBE_FILE):
+        with np.load(path, allow_pickle=False) as data:
+            return cls({dim: data[f"axis_{dim}"] for dim in DIMENSIONS}, {m: data[m] for m in MEASURES})
+
+    @property
+    def shape(self):
+        return self.measures['Total_Orders'].shape
+
+    # ---------------- Queries ---------------- #
+
+    def _positions_of(self, dim, values):
+        """Axis positions of the wanted values (strings from the CLI / widgets are cast to the axis dtype)."""
+        if dim not in self.axes:
+            raise ValueError(f"Unknown cube dimension: {dim}")
+        values = values if isinstance(values, (list, tuple, set, np.ndarray)) else [values]
+        cast = self.axes[dim].dtype.type
+        return sorted({self._positions[dim][cast(v)] for v in values if cast(v) in self._positions[dim]})
+
+    def query(self, by=('CLTV_Segment_Label', 'Hour'), where=None, classify=True):
+        """
+        Measures rolled up to the `by` dimensions over the cells matching `where`
+        ({dim: value or [values]}); only combinations with orders are returned.
+        With classify, Trigger_Class is HOT/WARM/COLD by Total_Orders among the
+        Hour rows of each slice (all other `by` columns), or over all rows if
+        Hour is not in `by`.
+        """
+        by = list(by)
+        unknown = [dim for dim in by if dim not in self.axes]
+        if unknown:
+            raise ValueError(f"Unknown cube dimensions: {unknown}")
+        selected = {dim: self._positions_of(dim, values) for dim, values in (where or {}).items()}
+        labels = {dim: self.axes[dim][selected[dim]] if dim in selected else self.axes[dim] for dim in by}
+        keep = tuple(DIMENSIONS.index(dim) for dim in by)
+        drop = tuple(i for i in range(len(DIMENSIONS)) if i not in keep)
+
+        rolled = {}
+        for m, arr in self.measures.items():
+            for dim, idx in selected.items():
+                arr = np.take(arr, idx, axis=DIMENSIONS.index(dim))
+            rolled[m] = arr.sum(axis=drop)
+        # sum() keeps the remaining axes in DIMENSIONS order; put them in `by` order
+        order = np.argsort(np.argsort(keep))
+        rolled = {m: np.transpose(arr, order) if arr.ndim > 1 else arr for m, arr in rolled.items()}
+
+        grid = np.indices(rolled['Total_Orders'].shape).reshape(len(by), -1) if by else np.zeros((0, 1), int)
+        out = pd.DataFrame({dim: labels[dim][grid[i]] for i, dim in enumerate(by)})
+        for m in MEASURES:
+            out[m] = np.ravel(rolled[m])
+        out = out[out['Total_Orders'] > 0].reset_index(drop=True)
+
+        if classify and len(out):
+            slice_cols = [dim for dim in by if dim != 'Hour'] if 'Hour' in by else []
+            keys = out[slice_cols] if slice_cols else pd.Series(0, index=out.index)
+            out['Trigger_Class'] = trigger_class(out['Total_Orders'], keys)
+        return out
+
+
+@instrumented()
+def build_cube(segments, chunk_rows=CHUNK_ROWS, store_dir=STORE_DIR):
+    """TriggerCube over every customer-attributed line in the store."""
+    chunks = iter_transactions(columns=CUBE_COLUMNS, chunk_rows=chunk_rows, require_customer=True,
+                               store_dir=store_dir)
+    cells = fold(lambda chunk: cube_partial(chunk, segments), merge_sums(DIMENSIONS), chunks)
+    if cells is None:
+        cells = pd.DataFrame(columns=DIMENSIONS + MEASURES)
+    return TriggerCube.from_cells(cells)
+
+
+def load_segments(cltv_file=CLTV_FILE):
+    cltv = read_table(cltv_file)
+    cltv.columns = cltv.columns.str.replace(' ', '_')
+    label = 'CLTV_Segment_Label' if 'CLTV_Segment_Label' in cltv.columns else 'CLTV_Segment'
+    return cltv[['Customer_ID', label]].rename(columns={label: 'CLTV_Segment_Label'})
+
+
+def _parse_where(items):
+    where = {}
+    for item in items or []:
+        dim, _, values = item.partition('=')
+        where[dim] = values.split(',')
+    return where
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the segment x hour x weekday x country x month cube.")
+    parser.add_argument("--cltv", default=CLTV_FILE, help="customer table with CLTV_Segment(_Label)")
+    parser.add_argument("--cube", default=CUBE_FILE)
+    parser.add_argument("--by", nargs="+", help="query instead of build: roll up to these dimensions")
+    parser.add_argument("--where", nargs="+", help="filters, e.g. Country=France Weekday=5,6")
+    args = parser.parse_args()
+
+    if args.by:
+        cube = TriggerCube.load(args.cube)
+        start = time.perf_counter()
+        result = cube.query(args.by, _parse_where(args.where))
+        elapsed = (time.perf_counter() - start) * 1000
+        print(result.to_string(index=False))
+        print(f"✅ {len(result):,} rows in {elapsed:.1f}ms")
+    else:
+        with stage("load_segments") as s:
+            segments = s.output(load_segments(args.cltv))
+        cube = build_cube(segments)
+        with stage("write_cube"):
+            path = cube.save(args.cube)
+        cells = int((cube.measures['Total_Orders'] > 0).sum())
+        print(f"✅ Cube saved: {path} (shape {cube.shape}, {cells:,} non-empty cells, "
+              f"{path.stat().st_size / 1e6:.1f} MB)")
@@ -0,0 +1,219 @@
+# test_promo_rules.py
+"""
+Equivalence tests: every vectorized rule in promo_rules.py against the
+row-wise function it replaced (copied verbatim below from
+build_promotion_dataset.py, clearance_planner.py and
+festival_product_insight.py as they were before vectorization).
+
+    python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "notebooks"))
+from promo_rules import (BASE_MARGIN, ELASTICITY, REVENUE_COLUMNS, clearance_discount,  # noqa: E402
+                         clearance_strategy, festival_tag, project_revenue, promotion_class,
+                         suggested_offer_text, value_tier)
+
+
+# ---------------- Original row-wise rules ---------------- #
+
+def map_value(row):
+    seg = str(row.get('CLTV_Segment') or row.get('CLTV_Segment_Label') or "").upper()
+    # Accept variants
+    if seg in ['A','TOP','HIGHVALUE','TOP_CUSTOMER']: return 'Top'
+    if seg in ['B','HIGH']: return 'High'
+    if seg in ['C','MEDIUM']: return 'Medium'
+    return 'Low'
+
+
+def assign_promo(row):
+    tier = row['Value_Tier']
+    at_risk = row['At_Risk']
+
+    if tier == 'Top':
+        return 'VIP_LOYALTY'
+    if tier == 'High':
+        return 'HIGH_VALUE_SAVE' if at_risk else 'UPSWING_UPSELL'
+    if tier == 'Medium':
+        return 'MID_SAVE' if at_risk else 'CROSS_SELL'
+    if tier == 'Low':
+        return 'WINBACK' if at_risk else 'LIGHT_NURTURE'
+    return 'LIGHT_NURTURE'
+
+
+OFFER_TEXT = {
+    'VIP_LOYALTY': 'Early access + exclusive bundle',
+    'UPSWING_UPSELL': 'Bundle offer on premium related item',
+    'HIGH_VALUE_SAVE': 'Personalized 15% retention voucher',
+    'CROSS_SELL': 'Add complementary product recommendation',
+    'MID_SAVE': 'Limited 10% coupon + loyalty enrollment',
+    'WINBACK': 'Reactivate: 20% comeback code',
+    'LIGHT_NURTURE': 'Low-cost email drip series'
+}
+
+
+def discount_logic(row):
+    if row['Zero_Sales_Ratio'] > 0.9:
+        base_discount = 0.50
+    elif row['Zero_Sales_Ratio'] > 0.7:
+        base_discount = 0.40
+    else:
+        base_discount = 0.30
+    adj = base_discount
+    if row['Last_Sale_Months_Ago'] > 6:
+        adj += 0.05
+    if pd.notnull(row['CV_Monthly_Quantity']) and row['CV_Monthly_Quantity'] > 1.0:
+        adj += 0.05
+    return min(adj, 0.60)
+
+
+def compute_rev(row):
+    avg_price_est = (row['Total_Value'] / max(row['Months_Active'], 1)) / max(row['Avg_Monthly_Quantity'], 1)
+    discounted_price = avg_price_est * (1 - row['Adj_Discount'])
+    demand_mult = 1 + abs(ELASTICITY) * row['Adj_Discount']
+    projected_units = max(row['Avg_Monthly_Quantity'] * demand_mult,
+                          row['Avg_Monthly_Quantity'] + 1)
+    current_rev = row['Avg_Monthly_Quantity'] * avg_price_est
+    proj_rev = projected_units * discounted_price
+    current_gp = current_rev * BASE_MARGIN
+    proj_gp = proj_rev * BASE_MARGIN
+    return pd.Series({
+        'Avg_Price_Est': round(avg_price_est, 2),
+        'Discounted_Price': round(discounted_price, 2),
+        'Projected_Units': round(projected_units, 2),
+        'Current_Revenue': round(current_rev, 2),
+        'Projected_Revenue': round(proj_rev, 2),
+        'Revenue_Lift': round(proj_rev - current_rev, 2),
+        'Current_Gross_Profit': round(current_gp, 2),
+        'Projected_Gross_Profit': round(proj_gp, 2),
+        'Gross_Profit_Delta': round(proj_gp - current_gp, 2)
+    })
+
+
+def strategy(row):
+    if row['Zero_Sales_Ratio'] > 0.9 and row['Last_Sale_Months_Ago'] >= 9:
+        return "Discontinue"
+    if row['Revenue_Lift'] < 0 and row['Gross_Profit_Delta'] < 0:
+        return "Bundle / Placement Test"
+    return "Clearance Discount"
+
+
+def assign_festival(row):
+    desc = row['Description']
+    month = row['Month']
+
+    if any(x in desc for x in ['CHRISTMAS', 'XMAS']) and month == 12:
+        return 'Christmas'
+    elif month in [10, 11] and not any(x in desc for x in ['CHRISTMAS', 'XMAS']):
+        return 'Diwali'
+    else:
+        return None
+
+
+# ---------------- Fixtures ---------------- #
+
+SEGMENTS = ['A', 'a', 'B', 'C', 'D', 'TOP', 'top', 'HighValue', 'TOP_CUSTOMER', 'HIGH', 'MEDIUM', 'LOW',
+            'Top ', 'X', '', None, np.nan]
+
+
+@pytest.fixture
+def segments():
+    """Every pairing of segment / label values, including None, NaN and ''."""
+    pairs = [(s, l) for s in SEGMENTS for l in SEGMENTS]
+    return pd.DataFrame(pairs, columns=['CLTV_Segment', 'CLTV_Segment_Label'], dtype=object)
+
+
+@pytest.fixture
+def clearance():
+    """
+    Random clearance features plus every threshold value of the rules. The
+    Description column matters: it makes apply(axis=1) rows object dtype, so the
+    original functions saw Python floats and rounded with the builtin round().
+    """
+    rng = np.random.default_rng(0)
+    n = 5_000
+    feat = pd.DataFrame({
+        'Description': [f"PRODUCT {i}" for i in range(n)],
+        'Zero_Sales_Ratio': rng.choice([0.0, 0.5, 0.7, 0.7000001, 0.9, 0.9000001, 1.0], n),
+        'Last_Sale_Months_Ago': rng.choice([0, 6, 6.5, 7, 8.99, 9, 12], n).astype(float),
+        'CV_Monthly_Quantity': rng.choice([np.nan, 0.0, 1.0, 1.0000001, 2.5], n),
+        'Avg_Monthly_Quantity': np.round(rng.choice([0.0, 0.5, 1.0, 3.0], n) + rng.gamma(1.0, 20.0, n)
+                                         * rng.integers(0, 2, n), 3),
+        'Months_Active': rng.integers(0, 13, n).astype(float),
+        'Total_Value': np.round(rng.gamma(1.5, 300.0, n), 2),
+    })
+    feat['Adj_Discount'] = feat.apply(discount_logic, axis=1)
+    return feat
+
+
+# ---------------- Promotion rules ---------------- #
+
+def test_value_tier_matches_map_value(segments):
+    expected = segments.apply(map_value, axis=1)
+    pd.testing.assert_series_equal(value_tier(segments), expected, check_names=False)
+
+
+@pytest.mark.parametrize('column', ['CLTV_Segment', 'CLTV_Segment_Label'])
+def test_value_tier_with_one_segment_column(segments, column):
+    df = segments[[column]].drop_duplicates().reset_index(drop=True)
+    expected = df.apply(map_value, axis=1)
+    pd.testing.assert_series_equal(value_tier(df), expected, check_names=False)
+
+
+def test_promotion_class_matches_assign_promo():
+    tiers = ['Top', 'High', 'Medium', 'Low', 'Other', None]
+    df = pd.DataFrame([(t, r) for t in tiers for r in [0, 1, True, False]], columns=['Value_Tier', 'At_Risk'])
+    expected = df.apply(assign_promo, axis=1)
+    pd.testing.assert_series_equal(promotion_class(df), expected, check_names=False, check_dtype=False)
+
+
+def test_suggested_offer_text_matches_map():
+    classes = pd.Series(list(OFFER_TEXT) + ['UNKNOWN'])
+    pd.testing.assert_series_equal(suggested_offer_text(classes), classes.map(OFFER_TEXT))
+
+
+# ---------------- Clearance rules ---------------- #
+
+def test_clearance_discount_matches_discount_logic(clearance):
+    np.testing.assert_array_equal(clearance_discount(clearance).to_numpy(), clearance['Adj_Discount'].to_numpy())
+
+
+def test_project_revenue_matches_compute_rev(clearance):
+    expected = clearance.apply(compute_rev, axis=1)
+    result = project_revenue(clearance)
+    assert list(result.columns) == REVENUE_COLUMNS
+    # Bit-identical, including the builtin round()'s half-way cases
+    np.testing.assert_array_equal(result[REVENUE_COLUMNS].to_numpy(), expected[REVENUE_COLUMNS].to_numpy())
+
+
+def test_clearance_strategy_matches_strategy(clearance):
+    feat = pd.concat([clearance, clearance.apply(compute_rev, axis=1)], axis=1)
+    # Exact boundaries of the lift / delta checks
+    feat.loc[:9, ['Revenue_Lift', 'Gross_Profit_Delta']] = [[0.0, -0.01], [-0.01, 0.0], [-0.01, -0.01],
+                                                             [0.0, 0.0], [np.nan, -1], [-1, np.nan],
+                                                             [0.01, -1], [-1, 0.01], [-5, -5], [5, 5]]
+    expected = feat.apply(strategy, axis=1)
+    pd.testing.assert_series_equal(clearance_strategy(feat), expected, check_names=False, check_dtype=False)
+
+
+# ---------------- Festival rules ---------------- #
+
+DESCRIPTIONS = ['CHRISTMAS TREE', 'XMAS LIGHTS', 'PAPER CHAIN KIT 50\'S CHRISTMAS ', 'SET OF 3 XMAS BAUBLES',
+                'CHRISTMASXMAS', 'MERRYXMASS CARD', 'christmas tree', 'Xmas Card', 'CHRIST MAS',
+                'X-MAS STAR', 'WHITE HANGING HEART', '', 'XMA', 'CHRISTMA']
+
+
+def test_festival_tag_matches_assign_festival():
+    df = pd.DataFrame([(d, m) for d in DESCRIPTIONS for m in range(1, 13)], columns=['Description', 'Month'])
+    expected = df.apply(assign_festival, axis=1)
+    result = festival_tag(df['Description'], df['Month'])
+    # apply() returns NaN where assign_festival returned None; both are "no festival"
+    as_tags = lambda tags: [tag if pd.notna(tag) else None for tag in tags]
+    assert as_tags(result) == as_tags(expected)
+    assert result.notna().sum() > 0